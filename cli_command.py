@@ -1,71 +1,97 @@
+import os
 import sys
+import json
+import socket
 import argparse
 
-import jarvis as core
+BASE = os.path.dirname(os.path.abspath(__file__))
+CONFIG_PATH = os.path.join(BASE, "config.json")
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8765
+# Written by the daemon at start (see jarvis.write_daemon_token)
+DAEMON_TOKEN_PATH = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".config"),
+                                 "Jarvis", "daemon.token")
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("command", nargs="?")
-    parser.add_argument("--wake", action="store_true")
-    args = parser.parse_args()
+def daemon_port() -> int:
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            return int(json.load(f).get("daemon_port", DAEMON_PORT))
+    except Exception:
+        return DAEMON_PORT
+
+
+def daemon_token() -> str:
+    try:
+        with open(DAEMON_TOKEN_PATH, "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def daemon_request(request: dict, timeout: float = 120.0):
+    """Send one request to a running Jarvis daemon. Returns its reply, or None if none is running."""
+    try:
+        sock = socket.create_connection((DAEMON_HOST, daemon_port()), timeout=1.0)
+    except OSError:
+        return None
+    request = dict(request, token=daemon_token())
+    # Once connected the daemon owns the request; never fall back and run it twice
+    try:
+        with sock:
+            sock.settimeout(timeout)
+            sock.sendall((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as f:
+                line = f.readline()
+        return json.loads(line.decode("utf-8")) if line else {"ok": False, "error": "No reply from daemon"}
+    except (OSError, ValueError) as e:
+        return {"ok": False, "error": f"Daemon request failed: {e}"}
+
+
+def run_in_process(args) -> int:
+    # No daemon: pay the full startup cost here
+    import jarvis as core
 
     core.load_env_if_available()
-    cfg = core.load_json(core.CONFIG_PATH, {})
-    custom_cmds = core.load_json(core.CUSTOM_CMDS_PATH, {})
+    cfg = core.RUNTIME.config
     logger = core.init_logging()
     engine = core.init_tts(cfg)
-    ai_model = core.init_ai(cfg)
-    try:
-        core.CURRENT_CFG.clear()
-        if isinstance(cfg, dict):
-            core.CURRENT_CFG.update(cfg)
-    except Exception:
-        pass
 
     if args.wake:
-        try:
-            if cfg.get("persona_enabled") and cfg.get("play_wake_chime"):
-                import winsound
-                winsound.Beep(1200, 90)
-        except Exception:
-            pass
-        reply = (cfg.get("wake_reply") or "Yes?") if cfg.get("persona_enabled") else "Yes?"
-        core.speak(engine, reply)
-        return 0
+        core.speak_wake_reply(engine, cfg)
+    else:
+        core.run_oneshot_command(engine, cfg, core.RUNTIME.ai_model(), core.RUNTIME.custom_cmds, args.command.strip(), logger)
+    # speech is queued; finish it before the process exits
+    core.wait_speech_idle(engine)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", nargs="?")
+    parser.add_argument("--wake", action="store_true")
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--no-daemon", action="store_true", help="run in this process even if a daemon is running")
+    args = parser.parse_args()
+
+    if args.status:
+        reply = daemon_request({"type": "status"}, timeout=5.0)
+        print(json.dumps(reply) if reply else "Jarvis daemon is not running")
+        return 0 if reply else 1
 
     text = (args.command or "").strip()
-    if not text:
+    if not args.wake and not text:
         print("No command provided", file=sys.stderr)
         return 1
 
-    intent, arg = core.parse_intent(text, custom_cmds)
-
-    action_intents = {
-        "open_app", "open_browser", "open_site",
-        "close_app", "close_browser",
-        "search_web", "search_youtube", "time", "date",
-        "volume", "brightness", "media",
-        "remind_in", "remind_at",
-        "calc", "convert", "date_of_week",
-        # window and input control
-        "win_minimize", "win_restore", "win_close", "win_switch",
-        "type_text", "press_key", "scroll", "screenshot",
-        "greet", "exit",
-        # communications
-        "call", "message", "email",
-        # protocols and extras
-        "protocol_stealth", "protocol_house_party", "protocol_clean_slate",
-        "translate", "wiki", "weather",
-        "unknown_open", "unknown_close", "prompt_open",
-    }
-
-    handled = False
-    if cfg.get("ai_default_mode", True) and intent not in action_intents:
-        handled = core.ai_or_search(engine, cfg, ai_model, text, logger)
-    if not handled:
-        core.execute_intent(engine, intent, arg)
-    return 0
+    request = {"type": "wake"} if args.wake else {"type": "command", "text": text}
+    reply = None if args.no_daemon else daemon_request(request)
+    if reply is not None:
+        if not reply.get("ok"):
+            print(reply.get("error") or "Command failed", file=sys.stderr)
+            return 1
+        return 0
+    return run_in_process(args)
 
 
 if __name__ == "__main__":
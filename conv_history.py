@@ -0,0 +1,149 @@
+"""
+Append-only conversation history (JSON Lines).
+
+Jarvis appends one JSON object per line to logs/conv-history.jsonl from a
+background flush thread, so recording a turn never rereads or rewrites the
+file. The file is rotated by size and age (conv-history.jsonl.1, .2, ...).
+read_tail() returns the last entries by reading backwards from the end of the
+file (and on into the rotated ones), so the GUI doesn't parse the whole history. Standard library only, so
+gui.py can import it without loading the assistant.
+"""
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import List, Dict, Any
+
+
+class ConvHistoryWriter:
+    def __init__(self, path: str, max_bytes: int = 5 * 1024 * 1024, max_age_days: float = 30,
+                 backup_count: int = 3, flush_interval: float = 1.0, batch_size: int = 64,
+                 max_pending: int = 10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._pending: List[str] = []
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._size = None
+        self._started = None
+        self._thread = threading.Thread(target=self._run, name="conv-history", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def append(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            self._pending.append(line)
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+
+    def flush(self):
+        with self._io_lock:
+            with self._lock:
+                lines, self._pending = self._pending, []
+            if not lines:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._rotate_if_needed()
+                data = ("\n".join(lines) + "\n").encode("utf-8")
+                with open(self.path, "ab") as f:
+                    f.write(data)
+                self._size += len(data)
+                if self._started is None:
+                    self._started = time.time()
+            except Exception as e:
+                # keep the lines for the next flush, ahead of anything appended meanwhile,
+                # but only up to max_pending so a disk that stays broken can't eat memory
+                with self._lock:
+                    self._pending[:0] = lines
+                    dropped = len(self._pending) - self.max_pending
+                    if dropped > 0:
+                        del self._pending[:dropped]
+                self._size = None
+                if dropped > 0:
+                    logging.getLogger("jarvis").warning(
+                        f"Conversation history: dropped {dropped} oldest unwritten entries ({e})")
+
+    def _file_start_time(self):
+        """Timestamp of the first entry in the current file (its age for rotation)."""
+        try:
+            with open(self.path, "rb") as f:
+                first = json.loads(f.readline().decode("utf-8"))
+            return datetime.fromisoformat(first["ts"]).timestamp()
+        except Exception:
+            return os.path.getmtime(self.path) if os.path.exists(self.path) else None
+
+    def _rotate_if_needed(self):
+        if self._size is None:
+            self._size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            self._started = self._file_start_time() if self._size else None
+        too_big = self._size >= self.max_bytes
+        too_old = self._started is not None and self.max_age > 0 and time.time() - self._started >= self.max_age
+        if not self._size or not (too_big or too_old):
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._size = 0
+        self._started = None
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+def _read_tail_lines(path: str, limit: int, block_size: int) -> List[bytes]:
+    """Last `limit` complete lines of one file; [] if it can't be read."""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while pos > 0 and data.count(b"\n") <= limit:
+                step = min(block_size, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+    except Exception:
+        return []
+    lines = data.splitlines()
+    if pos > 0:
+        lines = lines[1:]  # first line may be cut in half
+    return lines[-limit:] if limit > 0 else []
+
+
+def read_tail(path: str, limit: int = 50, block_size: int = 8192) -> List[Dict[str, Any]]:
+    """Return the last `limit` entries of a JSONL file, reading backwards from the end.
+    When the current file holds fewer, the rest comes from its rotated files (.1, .2, ...).
+    """
+    lines: List[bytes] = []
+    candidate = path
+    i = 0
+    while len(lines) < limit and (i == 0 or os.path.exists(candidate)):
+        lines = _read_tail_lines(candidate, limit - len(lines), block_size) + lines
+        i += 1
+        candidate = f"{path}.{i}"
+    out = []
+    for raw in lines:
+        try:
+            out.append(json.loads(raw.decode("utf-8")))
+        except Exception:
+            continue
+    return out
@@ -8,10 +8,14 @@ import argparse
 
 import PySimpleGUI as sg
 
+from cli_command import daemon_request
+from conv_history import read_tail
+
 BASE = Path(__file__).parent
 LOG_DIR = BASE / 'logs'
 LOG_FILE = LOG_DIR / 'jarvis.log'
-CONV_HISTORY = LOG_DIR / 'conv-history.json'
+CONV_HISTORY = LOG_DIR / 'conv-history.jsonl'
+LEGACY_CONV_HISTORY = LOG_DIR / 'conv-history.json'
 JARVIS_SCRIPT = str(BASE / 'jarvis.py')
 CLI_SCRIPT = str(BASE / 'cli_command.py')
 
@@ -56,10 +60,13 @@ def read_logs_tail(max_chars=4000):
 
 
 def read_history_tail():
+    if CONV_HISTORY.exists():
+        return read_tail(str(CONV_HISTORY), limit=50)
+    # older Jarvis versions wrote a single JSON array
     try:
-        if not CONV_HISTORY.exists():
+        if not LEGACY_CONV_HISTORY.exists():
             return []
-        data = json.loads(CONV_HISTORY.read_text(encoding='utf-8'))
+        data = json.loads(LEGACY_CONV_HISTORY.read_text(encoding='utf-8'))
         if not isinstance(data, list):
             return []
         return data[-50:]
@@ -68,6 +75,9 @@ def read_history_tail():
 
 
 def run_oneoff_command(text: str):
+    # Prefer the running Jarvis (warm engine/AI); only spawn a one-off process if none answers
+    if daemon_request({"type": "command", "text": text}) is not None:
+        return
     try:
         python = get_python_exe()
         # Run as a one-off so it speaks and exits
@@ -77,6 +87,8 @@ def run_oneoff_command(text: str):
 
 
 def wake_once():
+    if daemon_request({"type": "wake"}) is not None:
+        return
     try:
         python = get_python_exe()
         subprocess.run([python, CLI_SCRIPT, "--wake"], cwd=str(BASE))
@@ -2,6 +2,12 @@ import os
 import time
 import json
 import threading
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait as wait_futures
+import queue
+import heapq
+import itertools
+import copy
+import contextlib
 import re
 import subprocess
 import webbrowser
@@ -13,11 +19,20 @@ import winsound
 import pyttsx3
 import speech_recognition as sr
 from urllib.parse import quote
-import requests
 from typing import List, Dict, Any
 import smtplib
 from email.mime.text import MIMEText
 import sys
+import socketserver
+import importlib
+import random
+import atexit
+import secrets
+import hmac
+from collections import OrderedDict, deque
+
+from conv_history import ConvHistoryWriter, read_tail
+from tracing import Tracer, Turn, percentile
 
 try:
     from dotenv import load_dotenv
@@ -25,48 +40,102 @@ except Exception:
     load_dotenv = None
 
 try:
-    from vosk import Model, KaldiRecognizer
+    import audioop  # used for streaming energy checks (audioop-lts on 3.13+)
 except Exception:
-    Model = None  # optional
-    KaldiRecognizer = None
+    audioop = None
 
 try:
     import keyboard  # global hotkey
 except Exception:
     keyboard = None
 
-try:
-    import pywhatkit as kit
-except Exception:
-    kit = None
 
-try:
-    from comtypes import CLSCTX_ALL
-    from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-except Exception:
-    AudioUtilities = None
-    IAudioEndpointVolume = None
-    CLSCTX_ALL = None
+# Seconds spent importing each lazily loaded backend (see import_time_report)
+IMPORT_TIMES: Dict[str, float] = {}
+IMPORT_FAILED = set()
+_LAZY_MISSING = object()
 
-try:
-    import screen_brightness_control as sbc
-except Exception:
-    sbc = None
 
-try:
-    import google.generativeai as genai
-except Exception:
-    genai = None
+class LazyImport:
+    """Optional module (or module attribute) that is only imported on first use.
 
-try:
-    import pyautogui  # optional input/window control
-except Exception:
-    pyautogui = None
+    Falsy when the import fails, so `if kit:` style availability checks work
+    unchanged; attribute access and calls are forwarded to the real object.
+    """
 
-try:
-    import pygetwindow as gw  # optional precise window control
-except Exception:
-    gw = None
+    def __init__(self, module: str, attr: str = None):
+        self._module = module
+        self._attr = attr
+        self._obj = _LAZY_MISSING
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._obj is _LAZY_MISSING:
+            with self._lock:
+                if self._obj is _LAZY_MISSING:
+                    started = time.perf_counter()
+                    try:
+                        obj = importlib.import_module(self._module)
+                        if self._attr:
+                            obj = getattr(obj, self._attr)
+                    except Exception:
+                        obj = None
+                        IMPORT_FAILED.add(self._module)
+                    IMPORT_TIMES.setdefault(self._module, time.perf_counter() - started)
+                    self._obj = obj
+        return self._obj
+
+    def __bool__(self):
+        return self.load() is not None
+
+    def __getattr__(self, name):
+        obj = self.load()
+        if obj is None:
+            raise AttributeError(f"optional module {self._module} is not available")
+        return getattr(obj, name)
+
+    def __call__(self, *args, **kwargs):
+        obj = self.load()
+        if obj is None:
+            raise RuntimeError(f"optional module {self._module} is not available")
+        return obj(*args, **kwargs)
+
+
+# Heavy/optional backends: each loads when the intent that needs it first runs
+requests = LazyImport("requests")
+Model = LazyImport("vosk", "Model")
+KaldiRecognizer = LazyImport("vosk", "KaldiRecognizer")
+kit = LazyImport("pywhatkit")
+CLSCTX_ALL = LazyImport("comtypes", "CLSCTX_ALL")
+AudioUtilities = LazyImport("pycaw.pycaw", "AudioUtilities")
+IAudioEndpointVolume = LazyImport("pycaw.pycaw", "IAudioEndpointVolume")
+sbc = LazyImport("screen_brightness_control")
+genai = LazyImport("google.generativeai")
+pyautogui = LazyImport("pyautogui")  # optional input/window control
+gw = LazyImport("pygetwindow")  # optional precise window control
+np = LazyImport("numpy")  # optional; vectorizes the VAD frame energies
+
+LAZY_BACKENDS = {
+    "requests": requests, "vosk": Model, "pywhatkit": kit, "comtypes": CLSCTX_ALL,
+    "pycaw": AudioUtilities, "screen_brightness_control": sbc,
+    "google.generativeai": genai, "pyautogui": pyautogui, "pygetwindow": gw, "numpy": np,
+}
+
+
+def import_time_report(load_all: bool = False) -> List[str]:
+    """Per-module import cost of the lazy backends, slowest first.
+    With load_all, every backend is imported now so the full cold-start cost is shown.
+    """
+    if load_all:
+        for lazy in LAZY_BACKENDS.values():
+            lazy.load()
+    lines = []
+    for name, secs in sorted(IMPORT_TIMES.items(), key=lambda kv: kv[1], reverse=True):
+        lines.append(f"{secs * 1000:8.1f} ms  {name}" + ("  (unavailable)" if name in IMPORT_FAILED else ""))
+    not_loaded = [name for name, lazy in LAZY_BACKENDS.items() if lazy._module not in IMPORT_TIMES]
+    if not_loaded:
+        lines.append("not loaded: " + ", ".join(sorted(not_loaded)))
+    return lines
 
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.json")
@@ -74,8 +143,17 @@ CUSTOM_CMDS_PATH = os.path.join(os.path.dirname(__file__), "custom_commands.json
 LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
 LOG_FILE = os.path.join(LOG_DIR, "jarvis.log")
 REMINDERS_PATH = os.path.join(os.path.dirname(__file__), "reminders.json")
-CONV_HISTORY_PATH = os.path.join(LOG_DIR, "conv-history.json")
+CONV_HISTORY_PATH = os.path.join(LOG_DIR, "conv-history.jsonl")
+TRACE_PATH = os.path.join(LOG_DIR, "trace.jsonl")
 CONTACTS_PATH = os.path.join(os.path.dirname(__file__), "contacts.json")
+RESPONSE_CACHE_PATH = os.path.join(os.path.dirname(__file__), "cache", "responses.json")
+
+# Local daemon socket (see serve_daemon); loopback only
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8765
+# Secret every daemon request must carry; rewritten at each start, readable only by this user
+DAEMON_TOKEN_PATH = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".config"),
+                                 "Jarvis", "daemon.token")
 
 # Global runtime config reference (set in main)
 CURRENT_CFG: Dict[str, Any] = {}
@@ -187,8 +265,6 @@ def load_env_if_available():
         pass
 
 
-SPEAK_LOCK = threading.Lock()
-
 def safe_print(text: str):
     try:
         print(text)
@@ -206,23 +282,196 @@ def safe_print(text: str):
                 pass
 
 
-def speak(engine: pyttsx3.Engine, text: str):
-    # Serialize TTS to avoid 'run loop already started'
-    with SPEAK_LOCK:
+# Lower number speaks first; equal priorities keep their order
+SPEECH_PRIORITY_ALARM = 0
+SPEECH_PRIORITY_NORMAL = 5
+
+
+class SpeechWorker:
+    """Owns a pyttsx3 engine and speaks queued utterances on its own thread.
+
+    say() returns a concurrent.futures.Future right away; cancel() drops everything
+    queued and interrupts the current utterance (barge-in).
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._heap: List[tuple] = []  # (priority, seq, text, future)
+        self._seq = 0
+        self._busy = False
+        self._current_priority = None
+        self.last_text = None  # utterance being spoken, or the last one spoken
+        self.last_done_at = 0.0  # time.time() when the last utterance finished
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._thread.start()
+
+    def say(self, text: str, priority: int = SPEECH_PRIORITY_NORMAL) -> Future:
+        fut: Future = Future()
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._heap, (priority, self._seq, text, fut))
+            self._cond.notify_all()
+        return fut
+
+    def cancel(self, min_priority: int = SPEECH_PRIORITY_NORMAL) -> int:
+        """Drop queued utterances with priority >= min_priority and stop the current one if it qualifies."""
+        with self._cond:
+            keep = [item for item in self._heap if item[0] < min_priority]
+            dropped = [item for item in self._heap if item[0] >= min_priority]
+            self._heap = keep
+            heapq.heapify(self._heap)
+            interrupt = self._busy and self._current_priority is not None and self._current_priority >= min_priority
+        for item in dropped:
+            item[3].cancel()
+        if interrupt:
+            try:
+                self.engine.stop()
+            except Exception:
+                pass
+        return len(dropped)
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._heap and not self._busy, timeout)
+
+    def saying(self, echo_seconds: float = 0.5) -> str:
+        """Text being spoken now or finished within echo_seconds, else None."""
+        with self._cond:
+            busy = self._busy
+        if busy or time.time() - self.last_done_at <= echo_seconds:
+            return self.last_text
+        return None
+
+    def _speak_now(self, text: str):
         try:
-            engine.stop()
-            engine.say(text)
-            engine.runAndWait()
+            self.engine.say(text)
+            self.engine.runAndWait()
         except RuntimeError:
-            # small retry once
+            # small retry once ('run loop already started')
             time.sleep(0.1)
             try:
-                engine.stop()
-                engine.say(text)
-                engine.runAndWait()
+                self.engine.stop()
+                self.engine.say(text)
+                self.engine.runAndWait()
             except Exception:
                 pass
 
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._busy = False
+                    self._cond.notify_all()
+                    self._cond.wait()
+                priority, _, text, fut = heapq.heappop(self._heap)
+                self._busy = True
+                self._current_priority = priority
+            if not fut.set_running_or_notify_cancel():
+                continue
+            self.last_text = text
+            try:
+                self._speak_now(text)
+                fut.set_result(True)
+            except Exception as e:
+                fut.set_exception(e)
+            finally:
+                self.last_done_at = time.time()
+
+
+SPEECH_WORKERS: Dict[int, SpeechWorker] = {}
+_SPEECH_WORKERS_LOCK = threading.Lock()
+
+
+def get_speech_worker(engine: pyttsx3.Engine) -> SpeechWorker:
+    with _SPEECH_WORKERS_LOCK:
+        worker = SPEECH_WORKERS.get(id(engine))
+        if worker is None or worker.engine is not engine:
+            worker = SpeechWorker(engine)
+            SPEECH_WORKERS[id(engine)] = worker
+        return worker
+
+
+TRACER = None
+CURRENT_TURN: Turn = None  # turn being traced by the main loop, if any
+_TRACER_LOCK = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    global TRACER
+    with _TRACER_LOCK:
+        if TRACER is None:
+            enabled = bool(RUNTIME.config.get("trace_enabled", True))
+            TRACER = Tracer(ConvHistoryWriter(TRACE_PATH) if enabled else None, enabled=enabled)
+        return TRACER
+
+
+def begin_turn(started: float = None, **tags) -> Turn:
+    """Start tracing a command turn; speech queued until end_turn() is timed in it."""
+    global CURRENT_TURN
+    end_turn()
+    CURRENT_TURN = get_tracer().new_turn(started, **tags)
+    return CURRENT_TURN
+
+
+def end_turn():
+    global CURRENT_TURN
+    turn, CURRENT_TURN = CURRENT_TURN, None
+    if turn is not None:
+        turn.finish()
+
+
+def trace_listen(turn: Turn, started: float, ended: float):
+    """Split a recognize_speech call into wait_for_speech / capture / recognize_speech
+    spans when the utterance boundaries are known, else record it as one span.
+    """
+    speech_start = UTTERANCE_MARKS.get("start")
+    speech_end = UTTERANCE_MARKS.get("end")
+    if speech_start and speech_end and started <= speech_start <= speech_end <= ended:
+        turn.add("wait_for_speech", started, speech_start)
+        turn.add("capture", speech_start, speech_end)
+        turn.add("recognize_speech", speech_end, ended)
+    else:
+        turn.add("recognize_speech", started, ended)
+    turn.tag(stt=LAST_STT.get("winner"))
+
+
+def speak(engine: pyttsx3.Engine, text: str, priority: int = SPEECH_PRIORITY_NORMAL, wait: bool = False) -> Future:
+    """Queue text for the engine's speech worker and return immediately.
+    The returned future completes when the text has been spoken (or is cancelled).
+    """
+    fut = get_speech_worker(engine).say(text, priority)
+    turn = CURRENT_TURN
+    if turn is not None:
+        queued = time.perf_counter()
+        fut.add_done_callback(lambda f: f.cancelled() or turn.add("speak", queued, time.perf_counter()))
+    if wait:
+        try:
+            fut.result()
+        except Exception:
+            pass
+    return fut
+
+
+def cancel_speech(engine: pyttsx3.Engine) -> int:
+    """Barge-in: stop the current utterance and drop queued chatter (alarms are kept)."""
+    return get_speech_worker(engine).cancel(SPEECH_PRIORITY_NORMAL)
+
+
+def wait_speech_idle(engine: pyttsx3.Engine, timeout: float = None) -> bool:
+    return get_speech_worker(engine).wait_idle(timeout)
+
+
+def wake_word_is_echo(engine: pyttsx3.Engine, heard: str) -> bool:
+    """With barge-in the microphone is open while Jarvis talks: a wake phrase that
+    is part of what Jarvis is saying right now ("Jarvis online") is its own voice.
+    """
+    said = get_speech_worker(engine).saying()
+    if not said:
+        return False
+    said, heard = (" ".join(re.sub(r"[^a-z0-9' ]+", " ", t.lower()).split()) for t in (said, heard))
+    return bool(heard) and contains_wake_word(said) and heard in said
+
 
 def init_tts(cfg):
     engine = pyttsx3.init()
@@ -241,27 +490,907 @@ def init_tts(cfg):
     return engine
 
 
+class AIDeadlineError(TimeoutError):
+    """The AI provider did not answer within the call's deadline."""
+
+
+class AIQuotaError(RuntimeError):
+    """The provider reported a rate limit/quota error, or we are backing off after one."""
+
+
+def is_quota_error(exc: Exception) -> bool:
+    if isinstance(exc, AIQuotaError):
+        return True
+    code = getattr(exc, "code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if code == 429 or type(exc).__name__ == "ResourceExhausted":
+        return True
+    text = str(exc).lower()
+    return "429" in text or "quota" in text or "rate limit" in text
+
+
+class _AIText:
+    """Response/chunk object with the .text attribute the call sites read."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class GeminiProvider:
+    """google-generativeai GenerativeModel behind the provider interface."""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str):
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate_content(self, contents, stream: bool = False, timeout: float = None, generation_config=None):
+        options = {"timeout": timeout} if timeout else None
+        return self.model.generate_content(contents, stream=stream, generation_config=generation_config,
+                                           request_options=options)
+
+
+class OpenAICompatibleProvider:
+    """Chat-completions endpoint (OpenAI or a local server such as llama.cpp,
+    Ollama or LM Studio) behind the provider interface.
+    """
+
+    name = "openai"
+
+    def __init__(self, base_url: str, model_name: str, api_key: str = None):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model_name = model_name
+        self.api_key = api_key
+
+    @staticmethod
+    def _messages(contents):
+        if isinstance(contents, str):
+            return [{"role": "user", "content": contents}]
+        messages = []
+        for item in contents:
+            if isinstance(item, dict):
+                text = "\n".join(str(p) for p in item.get("parts", [])) or str(item.get("content", ""))
+                messages.append({"role": item.get("role", "user"), "content": text})
+            else:
+                messages.append({"role": "user", "content": str(item)})
+        return messages
+
+    def generate_content(self, contents, stream: bool = False, timeout: float = None, generation_config=None):
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        body = {"model": self.model_name, "messages": self._messages(contents), "stream": bool(stream)}
+        if generation_config and generation_config.get("max_output_tokens"):
+            body["max_tokens"] = int(generation_config["max_output_tokens"])
+        resp = get_http_session().post(self.url, json=body, headers=headers, stream=stream,
+                                       timeout=(3.05, timeout or 30))
+        if resp.status_code == 429:
+            resp.close()
+            raise AIQuotaError(f"{self.url} returned 429")
+        resp.raise_for_status()
+        if not stream:
+            data = resp.json()
+            return _AIText(data["choices"][0]["message"].get("content") or "")
+        return _ChatCompletionStream(resp)
+
+
+class _ChatCompletionStream:
+    """Chunks of a streamed chat completion. close() drops the connection from any
+    thread, so an abandoned stream stops reading instead of running to the end.
+    """
+
+    def __init__(self, resp):
+        self.resp = resp
+
+    def __iter__(self):
+        with self.resp:
+            for line in self.resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                delta = json.loads(payload)["choices"][0].get("delta") or {}
+                if delta.get("content"):
+                    yield _AIText(delta["content"])
+
+    def close(self):
+        self.resp.close()
+
+
+class TokenBucket:
+    """Request budget refilled at `rate` tokens/second up to `capacity`.
+
+    A quota error empties the bucket and halves the rate; each success adds a
+    little rate back (AIMD), so Jarvis backs off instead of hammering a 429.
+    """
+
+    def __init__(self, rate: float = 1.0, capacity: float = 5.0, min_rate: float = 1.0 / 60):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.tokens = capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def take(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+    def penalize(self):
+        with self._lock:
+            self._refill()
+            self.tokens = 0.0
+            self.rate = max(self.min_rate, self.rate / 2.0)
+
+    def reward(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+
+AI_POOL = None
+_AI_POOL_LOCK = threading.Lock()
+
+
+# Enough for a turn and a background full-answer fetch, each hedged, while two
+# abandoned calls run out their deadline. Streams don't use the pool.
+AI_POOL_WORKERS = 8
+
+
+def get_ai_pool() -> ThreadPoolExecutor:
+    """Threads that run non-streaming provider calls, so a stalled request can't hold up the voice loop."""
+    global AI_POOL
+    with _AI_POOL_LOCK:
+        if AI_POOL is None:
+            AI_POOL = ThreadPoolExecutor(max_workers=AI_POOL_WORKERS, thread_name_prefix="ai")
+        return AI_POOL
+
+
+class AIClient:
+    """What init_ai returns: generate_content() like a Gemini model, plus
+    per-call deadlines, optional hedging and token-bucket quota backoff.
+
+    Non-streaming calls can be hedged: if no reply arrives within the
+    ai_hedge_percentile of recent latencies, a duplicate request is sent and the
+    first answer wins. Every request's provider timeout ends at the call's
+    deadline, so an abandoned one frees its pool thread by then. Streaming calls
+    read on their own thread and must deliver each chunk within the deadline; a
+    stream that is given up on is closed.
+    """
+
+    def __init__(self, provider, cfg):
+        self.provider = provider
+        self.deadline = float(cfg.get("ai_deadline_seconds", 8.0))
+        self.route_deadline = float(cfg.get("ai_route_deadline_seconds", 4.0))
+        self.hedge = bool(cfg.get("ai_hedge", False))
+        self.hedge_percentile = float(cfg.get("ai_hedge_percentile", 95))
+        self.bucket = TokenBucket(rate=float(cfg.get("ai_requests_per_minute", 30)) / 60.0,
+                                  capacity=float(cfg.get("ai_burst", 5)))
+        self.latencies_ms: "deque[float]" = deque(maxlen=50)
+        self.stats = {"calls": 0, "hedged": 0, "deadline": 0, "quota": 0, "errors": 0}
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None when hedging is off or there is too little history."""
+        if not self.hedge or len(self.latencies_ms) < 10:
+            return None
+        return percentile(list(self.latencies_ms), self.hedge_percentile) / 1000.0
+
+    def _take_token(self):
+        if not self.bucket.take():
+            self.stats["quota"] += 1
+            raise AIQuotaError("backing off after quota errors")
+
+    def _failed(self, exc: Exception):
+        if is_quota_error(exc):
+            self.stats["quota"] += 1
+            self.bucket.penalize()
+        else:
+            self.stats["errors"] += 1
+
+    def _timed_call(self, contents, deadline: float, extra: Dict[str, Any]):
+        started = time.perf_counter()
+        resp = self.provider.generate_content(contents, timeout=deadline, **extra)
+        return resp, (time.perf_counter() - started) * 1000.0
+
+    def generate_content(self, contents, stream: bool = False, deadline: float = None, generation_config=None):
+        deadline = float(deadline or self.deadline)
+        # Only passed through when set, so providers without it keep working
+        extra = {"generation_config": generation_config} if generation_config else {}
+        self.stats["calls"] += 1
+        self._take_token()
+        if stream:
+            return self._stream(contents, deadline, extra)
+        pool = get_ai_pool()
+        started = time.monotonic()
+        hedge_at = self.hedge_delay()
+        futures = [pool.submit(self._timed_call, contents, deadline, extra)]
+        pending = set(futures)
+        error = None
+        try:
+            while pending:
+                now = time.monotonic()
+                remaining = started + deadline - now
+                if remaining <= 0:
+                    break
+                if hedge_at is not None and len(futures) == 1:
+                    remaining = min(remaining, max(0.0, started + hedge_at - now))
+                done, pending = wait_futures(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    try:
+                        resp, ms = fut.result()
+                    except Exception as e:
+                        error = e
+                        self._failed(e)
+                        continue
+                    self.latencies_ms.append(ms)
+                    self.bucket.reward()
+                    return resp
+                if (not done and hedge_at is not None and len(futures) == 1
+                        and time.monotonic() >= started + hedge_at and self.bucket.take()):
+                    self.stats["hedged"] += 1
+                    remaining = max(0.1, started + deadline - time.monotonic())
+                    futures.append(pool.submit(self._timed_call, contents, remaining, extra))
+                    pending.add(futures[-1])
+        finally:
+            for fut in pending:
+                fut.cancel()
+        if error is not None and not pending:
+            raise error
+        self.stats["deadline"] += 1
+        raise AIDeadlineError(f"no AI reply within {deadline:.1f}s")
+
+    def _stream(self, contents, deadline: float, extra: Dict[str, Any]):
+        chunks: "queue.Queue" = queue.Queue()
+        started = time.perf_counter()
+        abandoned = threading.Event()
+        handle = {}
+
+        def pump():
+            try:
+                stream = self.provider.generate_content(contents, stream=True, timeout=deadline, **extra)
+                handle["stream"] = stream
+                for chunk in stream:
+                    if abandoned.is_set():
+                        return
+                    chunks.put(("chunk", chunk))
+                chunks.put(("done", None))
+            except Exception as e:
+                chunks.put(("error", e))
+            finally:
+                if abandoned.is_set():
+                    _close_quietly(handle.get("stream"))
+
+        threading.Thread(target=pump, name="ai-stream", daemon=True).start()
+        first = True
+        try:
+            while True:
+                try:
+                    kind, value = chunks.get(timeout=deadline)
+                except queue.Empty:
+                    self.stats["deadline"] += 1
+                    raise AIDeadlineError(f"AI stream stalled for {deadline:.1f}s")
+                if kind == "chunk":
+                    if first:
+                        first = False
+                        self.latencies_ms.append((time.perf_counter() - started) * 1000.0)
+                    yield value
+                elif kind == "done":
+                    self.bucket.reward()
+                    return
+                else:
+                    self._failed(value)
+                    raise value
+        finally:
+            # Deadline, error or the caller stopped reading: drop the connection
+            abandoned.set()
+            _close_quietly(handle.get("stream"))
+
+
+def _close_quietly(stream):
+    """Close a provider stream if it supports it (a stalled read then fails and its thread exits)."""
+    close = getattr(stream, "close", None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception:
+        pass
+
+
 def init_ai(cfg):
+    """AIClient for the configured provider ("gemini", "openai" or "local"), or None."""
     provider = (cfg.get("ai_provider") or "").lower()
-    if provider != "gemini" or not genai:
-        return None
-    api_key = cfg.get("google_api_key") or os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        return None
     try:
-        genai.configure(api_key=api_key)
-        model_name = cfg.get("gemini_model", "gemini-1.5-flash")
-        model = genai.GenerativeModel(model_name)
-        return model
+        if provider == "gemini":
+            api_key = cfg.get("google_api_key") or os.environ.get("GOOGLE_API_KEY")
+            if not genai or not api_key:
+                return None
+            backend = GeminiProvider(api_key, cfg.get("gemini_model", "gemini-1.5-flash"))
+        elif provider in ("openai", "local"):
+            default_url = "https://api.openai.com/v1" if provider == "openai" else "http://127.0.0.1:8080/v1"
+            api_key = cfg.get("openai_api_key") or os.environ.get("OPENAI_API_KEY")
+            if provider == "openai" and not api_key:
+                return None
+            backend = OpenAICompatibleProvider(cfg.get("ai_base_url") or default_url,
+                                               cfg.get("openai_model", "gpt-4o-mini"), api_key)
+        else:
+            return None
+        return AIClient(backend, cfg)
     except Exception:
         return None
 
 
-def ai_answer(model, question: str) -> str:
+# Config keys that require rebuilding the AI client when they change
+AI_CLIENT_KEYS = (
+    "ai_provider", "gemini_model", "google_api_key", "ai_base_url", "openai_model", "openai_api_key",
+    "ai_deadline_seconds", "ai_route_deadline_seconds", "ai_hedge", "ai_hedge_percentile",
+    "ai_requests_per_minute", "ai_burst",
+)
+
+
+class RuntimeState:
+    """Parsed config, contacts and custom commands plus the AI client, shared by every intent.
+
+    Each file is re-read only when its mtime changes (hot reload without a restart);
+    the AI client is rebuilt only when one of its settings (AI_CLIENT_KEYS) changes.
+    """
+
+    def __init__(self, config_path: str = CONFIG_PATH, contacts_path: str = CONTACTS_PATH,
+                 custom_cmds_path: str = CUSTOM_CMDS_PATH):
+        self._files = {
+            "config": {"path": config_path, "mtime": None, "value": {}},
+            "contacts": {"path": contacts_path, "mtime": None, "value": {}},
+            "custom_cmds": {"path": custom_cmds_path, "mtime": None, "value": {}},
+        }
+        self._ai_key = None
+        self._ai_model = None
+        self._lock = threading.RLock()
+
+    def _get(self, name: str):
+        slot = self._files[name]
+        try:
+            mtime = os.stat(slot["path"]).st_mtime_ns
+        except OSError:
+            mtime = -1  # missing file behaves like an empty one
+        with self._lock:
+            if mtime != slot["mtime"]:
+                if mtime == -1:
+                    value = {}
+                else:
+                    try:
+                        with open(slot["path"], "r", encoding="utf-8") as f:
+                            value = json.load(f)
+                    except Exception:
+                        # half-written or invalid: keep the last good copy and retry next time
+                        return slot["value"]
+                slot["value"] = value if isinstance(value, dict) else {}
+                slot["mtime"] = mtime
+                if name == "config":
+                    CURRENT_CFG.clear()
+                    CURRENT_CFG.update(slot["value"])
+            return slot["value"]
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self._get("config")
+
+    @property
+    def contacts(self) -> Dict[str, Any]:
+        return self._get("contacts")
+
+    @property
+    def custom_cmds(self) -> Dict[str, Any]:
+        return self._get("custom_cmds")
+
+    def ai_model(self):
+        cfg = self.config
+        key = tuple(cfg.get(k) for k in AI_CLIENT_KEYS) + (
+            os.environ.get("GOOGLE_API_KEY"), os.environ.get("OPENAI_API_KEY"),
+        )
+        with self._lock:
+            if key != self._ai_key:
+                self._ai_model = init_ai(cfg)
+                self._ai_key = key
+            return self._ai_model
+
+
+RUNTIME = RuntimeState()
+
+
+HTTP_SESSION = None
+_HTTP_LOCK = threading.Lock()
+# Last 200 response per URL that carried an ETag/Last-Modified, for conditional requests
+HTTP_VALIDATORS: "OrderedDict[str, Any]" = OrderedDict()
+HTTP_VALIDATORS_MAX = 128
+HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def get_http_session():
+    """Shared keep-alive session: one connection pool per host, reused across intents."""
+    global HTTP_SESSION
+    with _HTTP_LOCK:
+        if HTTP_SESSION is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=4)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            HTTP_SESSION = session
+        return HTTP_SESSION
+
+
+def http_get(url: str, connect_timeout: float = None, read_timeout: float = None, retries: int = None, conditional: bool = True):
+    """GET through the pooled session with separate connect/read timeouts.
+
+    Connection errors, timeouts and 429/5xx responses are retried with jittered
+    exponential backoff. With conditional, a repeat request sends If-None-Match /
+    If-Modified-Since and a 304 returns the previously cached response.
+    """
+    cfg = RUNTIME.config
+    connect_timeout = float(cfg.get("http_connect_timeout", 3.05) if connect_timeout is None else connect_timeout)
+    read_timeout = float(cfg.get("http_read_timeout", 8) if read_timeout is None else read_timeout)
+    retries = int(cfg.get("http_retries", 2) if retries is None else retries)
+    session = get_http_session()
+    headers = {}
+    cached = None
+    if conditional:
+        with _HTTP_LOCK:
+            cached = HTTP_VALIDATORS.get(url)
+        if cached is not None:
+            if cached.headers.get("ETag"):
+                headers["If-None-Match"] = cached.headers["ETag"]
+            if cached.headers.get("Last-Modified"):
+                headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+    attempt = 0
+    while True:
+        try:
+            r = session.get(url, headers=headers, timeout=(connect_timeout, read_timeout))
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                raise
+        else:
+            if r.status_code == 304 and cached is not None:
+                return cached
+            if r.status_code not in HTTP_RETRY_STATUSES or attempt >= retries:
+                if conditional and r.status_code == 200 and (r.headers.get("ETag") or r.headers.get("Last-Modified")):
+                    with _HTTP_LOCK:
+                        HTTP_VALIDATORS[url] = r
+                        HTTP_VALIDATORS.move_to_end(url)
+                        while len(HTTP_VALIDATORS) > HTTP_VALIDATORS_MAX:
+                            HTTP_VALIDATORS.popitem(last=False)
+                return r
+        attempt += 1
+        time.sleep(0.3 * (2 ** (attempt - 1)) * (0.5 + random.random()))
+
+
+def fetch_weather(loc: str) -> Dict[str, Any]:
+    url = f"https://wttr.in/{quote(loc)}?format=j1" if loc else "https://wttr.in?format=j1"
+    data = http_get(url).json()
+    cur = data.get("current_condition", [{}])[0]
+    temp_c = cur.get("temp_C")
+    if temp_c is None:
+        raise ValueError("Missing temp")
+    return {
+        "temp_c": temp_c,
+        "feels_c": cur.get("FeelsLikeC"),
+        "desc": (cur.get("weatherDesc", [{}])[0].get("value") or "").lower(),
+    }
+
+
+def fetch_wiki_summary(topic: str) -> str:
+    r = http_get(f"https://en.wikipedia.org/api/rest_v1/page/summary/{quote(topic)}")
+    if r.status_code != 200:
+        raise ValueError("HTTP")
+    summary = r.json().get("extract") or ""
+    if not summary:
+        raise ValueError("No summary")
+    return summary
+
+
+def fetch_news(topic: str) -> List[str]:
+    # Build Google News RSS URL (region India English by default)
+    base = "https://news.google.com/rss?hl=en-IN&gl=IN&ceid=IN:en"
+    url = base if not topic else f"https://news.google.com/rss/search?q={quote(topic)}&hl=en-IN&gl=IN&ceid=IN:en"
+    r = http_get(url)
+    import xml.etree.ElementTree as ET
+    root = ET.fromstring(r.text)
+    titles = [item.findtext('title') for item in root.findall('.//item')]
+    # Remove the feed title if present
+    headlines = [t for t in titles if t and not t.lower().startswith('top stories')]
+    if not headlines:
+        raise ValueError('No headlines')
+    return headlines
+
+
+# (fresh seconds, extra seconds a stale value may still be served while it refreshes)
+RESPONSE_TTLS = {
+    "weather": (600, 3600),
+    "news": (900, 7200),
+    "wiki": (86400, 7 * 86400),
+}
+
+
+class ResponseCache:
+    """Disk-backed TTL cache for weather/news/wiki answers with stale-while-revalidate.
+
+    A fresh entry is returned directly. A stale one (within its stale window) is
+    returned immediately while a background thread refreshes it. Anything older is
+    fetched inline. The least recently used entries are evicted past max_entries.
+    """
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, max_entries: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0}
+        self._entries: "OrderedDict[str, List[Any]]" = OrderedDict()  # key -> [stored_at, value]
+        self._refreshing = set()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind: str, text: str) -> str:
+        return f"{kind}:{' '.join((text or '').lower().split())}"
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        data = load_json(self.path, {})
+        if isinstance(data, dict):
+            for key, entry in data.items():
+                if isinstance(entry, list) and len(entry) == 2:
+                    self._entries[key] = entry
+
+    def _save(self):
+        with self._lock:
+            snapshot = dict(self._entries)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            write_json_atomic(self.path, snapshot)
+        except Exception:
+            pass
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._load()
+            self._entries[key] = [time.time(), value]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        self._save()
+
+    def _refresh(self, key: str, fetch):
+        try:
+            self.put(key, fetch())
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_fetch(self, kind: str, text: str, fetch):
+        fresh, stale = RESPONSE_TTLS.get(kind, (300, 0))
+        key = self.key(kind, text)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.time() - entry[0]
+                if age < fresh:
+                    self.stats["hits"] += 1
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                if age < fresh + stale:
+                    self.stats["stale_hits"] += 1
+                    self._entries.move_to_end(key)
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+                    return entry[1]
+            self.stats["misses"] += 1
+        value = fetch()
+        self.put(key, value)
+        return value
+
+
+RESPONSE_CACHE = ResponseCache()
+
+
+def weather_location(arg=None) -> str:
+    """Location a weather request is for: the one spoken, else default_location
+    (blank = by IP). The prefetcher and the weather intent share it so they share cache keys.
+    """
+    return (arg or "").strip() or (RUNTIME.config.get("default_location") or "").strip()
+
+
+def start_prefetcher(cfg: dict, logger: logging.Logger):
+    """Refresh the default location's weather and the top headlines on a schedule,
+    so those intents usually answer from RESPONSE_CACHE.
+    """
+    if not cfg.get("prefetch_enabled", True):
+        return None
+    interval = max(60, int(cfg.get("prefetch_interval_seconds", 900)))
+
+    def worker():
+        while True:
+            loc = weather_location()
+            for kind, text, fetch in (("weather", loc, lambda: fetch_weather(loc)), ("news", "", lambda: fetch_news(""))):
+                try:
+                    RESPONSE_CACHE.put(ResponseCache.key(kind, text), fetch())
+                except Exception:
+                    logger.info(f"Prefetch failed: {kind}")
+            time.sleep(interval)
+
+    t = threading.Thread(target=worker, name="prefetch", daemon=True)
+    t.start()
+    return t
+
+
+def log_ai_failure(what: str, exc: Exception):
+    """Callers still fall back on an empty answer, but the reason is logged."""
+    if isinstance(exc, AIDeadlineError):
+        kind = "deadline"
+    elif is_quota_error(exc):
+        kind = "quota"
+    else:
+        kind = type(exc).__name__
+    logging.getLogger("jarvis").warning(f"AI {what} failed ({kind}): {exc}")
+
+
+def start_ai_filler(engine: pyttsx3.Engine, cfg: dict):
+    """Say a short filler ("One moment.") if the answer hasn't started after
+    ai_filler_after_seconds. Returns the timer to cancel, or None when disabled.
+    """
+    delay = float(cfg.get("ai_filler_after_seconds", 1.5))
+    if not cfg.get("ai_filler_enabled", True) or delay <= 0:
+        return None
+    timer = threading.Timer(delay, lambda: speak(engine, cfg.get("ai_filler_text") or "One moment."))
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+# Two-tier answers: the model keeps the spoken answer short; the full answer is only
+# generated when "read full answer" asks for it
+SHORT_ANSWER_PROMPT = (
+    "Answer in one or two short sentences suitable for speaking aloud, without lists or markdown.\n"
+    "Question: "
+)
+
+# Recent full-length answers as (chars, ms), to estimate what a short answer saved
+FULL_ANSWER_STATS: "deque[tuple]" = deque(maxlen=20)
+_LAST_AI_LOCK = threading.Lock()
+
+
+def short_answer_config(cfg: dict, floor: int = 32) -> Dict[str, Any]:
+    """generation_config capping output near ai_tts_max_chars (about 4 characters per token)."""
+    max_chars = int(cfg.get("ai_tts_max_chars", 400))
+    return {"max_output_tokens": max(floor, int(max_chars / 4 * 1.25))}
+
+
+def log_answer_savings(result: Dict[str, Any], cfg: dict = None):
+    """Log (and record in result) the tokens and time a short answer saved against the
+    average of recent full answers. Until a full answer has been fetched the baseline is
+    ai_full_answer_baseline_tokens, generated at the short answer's own speed.
+    """
+    logger = logging.getLogger("jarvis")
+    chars = len(result.get("text") or "")
+    if FULL_ANSWER_STATS:
+        full_chars = sum(c for c, _ in FULL_ANSWER_STATS) / len(FULL_ANSWER_STATS)
+        full_ms = sum(ms for _, ms in FULL_ANSWER_STATS) / len(FULL_ANSWER_STATS)
+        basis = "the average full answer"
+    else:
+        baseline = int((cfg or {}).get("ai_full_answer_baseline_tokens", 400))
+        full_chars = baseline * 4
+        full_ms = result["ms"] * full_chars / max(1, chars)
+        basis = f"a {baseline}-token full answer"
+    result["saved_tokens"] = max(0, int(round((full_chars - chars) / 4)))
+    result["saved_ms"] = round(max(0.0, full_ms - result["ms"]), 1)
+    logger.info(f"Short AI answer: {chars} chars in {result['ms']:.0f} ms; saved ~{result['saved_tokens']} tokens "
+                f"and ~{result['saved_ms']:.0f} ms against {basis}")
+
+
+def fetch_full_ai_answer(model, question: str) -> str:
+    """Generate the uncapped answer (the second tier) and record its size and time."""
+    started = time.perf_counter()
+    ans = ai_answer(model, question)
+    if ans:
+        ms = (time.perf_counter() - started) * 1000.0
+        FULL_ANSWER_STATS.append((len(ans), ms))
+        logging.getLogger("jarvis").info(f"Full AI answer fetched: {len(ans)} chars in {ms:.0f} ms")
+    return ans
+
+
+def _start_full_answer_fetch(last_ai: Dict[str, Any], model) -> "Future":
+    """Fetch the full answer for last_ai in the background, once. Returns its Future."""
+    with _LAST_AI_LOCK:
+        fut = last_ai.get("pending")
+        if fut is None:
+            fut = Future()
+            query = last_ai.get("query")
+
+            def fetch():
+                try:
+                    fut.set_result(fetch_full_ai_answer(model, query))
+                except Exception as e:
+                    fut.set_exception(e)
+
+            threading.Thread(target=fetch, name="full-answer", daemon=True).start()
+            last_ai["pending"] = fut
+        return fut
+
+
+def remember_ai_answer(last_ai: Dict[str, Any], query: str, result: Dict[str, Any], cfg: dict, model):
+    """Keep the last answer for "read full answer". For a short answer the full
+    one is fetched on first request, or right away with ai_full_answer_prefetch.
+    """
+    if not result.get("text"):
+        return
+    with _LAST_AI_LOCK:
+        # The question as sent (with conversation context), so the full answer matches it
+        last_ai.update(text=result["text"], query=result.get("question") or query, pending=None,
+                       full=None if result.get("short") else result["text"])
+    if result.get("short") and model and cfg.get("ai_full_answer_prefetch", False):
+        _start_full_answer_fetch(last_ai, model)
+
+
+def read_full_ai_answer(engine: pyttsx3.Engine, cfg: dict, last_ai: Dict[str, Any], model):
+    """Speak the full version of the last answer, generating it if it was short."""
+    full = last_ai.get("full")
+    query = last_ai.get("query")
+    if not full and query and model:
+        filler = start_ai_filler(engine, cfg)
+        try:
+            full = _start_full_answer_fetch(last_ai, model).result(timeout=float(cfg.get("ai_deadline_seconds", 8)) + 1)
+        except Exception:
+            full = ""
+        if filler:
+            filler.cancel()
+        with _LAST_AI_LOCK:
+            if full and last_ai.get("query") == query:
+                last_ai["full"] = full
+    speak_full_ai_answer(engine, cfg, full or last_ai.get("text"))
+
+
+def start_read_full_ai_answer(engine: pyttsx3.Engine, cfg: dict, last_ai: Dict[str, Any], model) -> threading.Thread:
+    """Hotkey handler: read_full_ai_answer may have to generate the answer, so it runs on
+    its own thread and the keyboard hook returns at once."""
+    thread = threading.Thread(target=read_full_ai_answer, args=(engine, cfg, last_ai, model),
+                              name="read-full", daemon=True)
+    thread.start()
+    return thread
+
+
+class ConversationContext:
+    """Chat context for follow-up questions within conversation_window_seconds.
+
+    Recent turns are kept verbatim up to budget_chars; older ones are compacted
+    into a rolling summary of at most summary_chars (the question and the first
+    sentence of the answer, oldest dropped first). Everything is cleared once the
+    window passes without a turn, so a prompt never grows past
+    max_chars() + the new question however long the conversation runs.
+    """
+
+    HEADER = "Conversation so far, for context:\n"
+    SUMMARY_LABEL = "Earlier: "
+    QUESTION_LABEL = "Current question: "
+
+    def __init__(self, window_seconds: float, budget_chars: int = 1200, summary_chars: int = 400):
+        self.window = float(window_seconds)
+        self.budget = int(budget_chars)
+        self.summary_chars = int(summary_chars)
+        self.turns: "deque[str]" = deque()
+        self.turn_chars = 0
+        self.summary = ""
+        self.updated = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: dict) -> "ConversationContext":
+        window = float(cfg.get("conversation_window_seconds", 0)) if cfg.get("ai_context_enabled", True) else 0.0
+        return cls(window, int(cfg.get("ai_context_chars", 1200)), int(cfg.get("ai_context_summary_chars", 400)))
+
+    def max_chars(self) -> int:
+        """Upper bound on everything prompt() adds around the question."""
+        return (len(self.HEADER) + len(self.SUMMARY_LABEL) + self.summary_chars + 1
+                + self.budget + len(self.QUESTION_LABEL))
+
+    def _reset(self):
+        self.turns.clear()
+        self.turn_chars = 0
+        self.summary = ""
+        self.updated = 0.0
+
+    def _expire(self, now: float):
+        if self.updated and now - self.updated > self.window:
+            self._reset()
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def add(self, question: str, answer: str, now: float = None):
+        if self.window <= 0 or not question or not answer:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire(now)
+            turn = f"User: {question.strip()}\nAssistant: {answer.strip()}\n"
+            self.turns.append(turn)
+            self.turn_chars += len(turn)
+            while self.turns and self.turn_chars > self.budget:
+                old = self.turns.popleft()
+                self.turn_chars -= len(old)
+                self._compact(old)
+            self.updated = now
+
+    def _compact(self, turn: str):
+        """Fold an evicted turn into the summary, dropping the oldest notes past summary_chars."""
+        user, _, assistant = turn.partition("\nAssistant: ")
+        first = next(iter(split_sentences([assistant])), "")
+        note = f"{user[len('User: '):]} -> {first}".strip()
+        summary = f"{self.summary} | {note}" if self.summary else note
+        while len(summary) > self.summary_chars and " | " in summary:
+            summary = summary.split(" | ", 1)[1]
+        self.summary = summary[-self.summary_chars:] if self.summary_chars > 0 else ""
+
+    def prompt(self, question: str, now: float = None) -> str:
+        """question with the conversation so far in front of it (just question when there is none)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.window <= 0:
+                return question
+            self._expire(now)
+            if not self.turns and not self.summary:
+                return question
+            parts = [self.HEADER]
+            if self.summary:
+                parts.append(self.SUMMARY_LABEL + self.summary + "\n")
+            parts.extend(self.turns)
+            parts.append(self.QUESTION_LABEL + question)
+            return "".join(parts)
+
+
+def simulate_conversation_context(cfg: dict, turns: int = 1000) -> Dict[str, Any]:
+    """Feed `turns` synthetic question/answer pairs through a ConversationContext
+    (with and without window expiry) and report the largest prompt overhead
+    against its bound.
+    """
+    ctx = ConversationContext(max(1.0, float(cfg.get("conversation_window_seconds", 0)) or 120.0),
+                              int(cfg.get("ai_context_chars", 1200)), int(cfg.get("ai_context_summary_chars", 400)))
+    rng = random.Random(7)
+    now = 0.0
+    largest = 0
+    expired = 0
+    for i in range(turns):
+        question = f"follow-up question number {i} about " + " ".join(rng.choice(("weather", "tomorrow", "paris", "the news", "my schedule")) for _ in range(rng.randint(1, 8)))
+        answer = " ".join(f"Answer sentence {j} for turn {i}." for j in range(rng.randint(1, 12)))
+        # Mostly quick follow-ups, sometimes a pause longer than the window
+        gap = ctx.window * 2 if rng.random() < 0.02 else rng.uniform(1.0, ctx.window / 4)
+        if gap > ctx.window:
+            expired += 1
+        now += gap
+        prompt = ctx.prompt(question, now)
+        largest = max(largest, len(prompt) - len(question))
+        ctx.add(question, answer, now)
+    return {"turns": turns, "window_seconds": ctx.window, "expired_sessions": expired,
+            "max_context_chars": largest, "bound_chars": ctx.max_chars(), "bounded": largest <= ctx.max_chars()}
+
+
+def ai_answer(model, question: str, generation_config=None) -> str:
     if not model or not question:
         return ""
     try:
-        resp = model.generate_content(question)
+        extra = {"generation_config": generation_config} if generation_config else {}
+        resp = model.generate_content(question, **extra)
         text = getattr(resp, "text", None) or ""
         # Fallback: some SDK versions use .candidates
         if not text and getattr(resp, "candidates", None):
@@ -273,10 +1402,110 @@ def ai_answer(model, question: str) -> str:
                     text = "\n".join(parts)
                     break
         return text.strip()
-    except Exception:
+    except Exception as e:
+        log_ai_failure("answer", e)
         return ""
 
 
+def ai_answer_stream(model, question: str, generation_config=None):
+    """Yield answer text chunks as the model streams them. Stops early on failure."""
+    if not model or not question:
+        return
+    try:
+        extra = {"generation_config": generation_config} if generation_config else {}
+        resp = model.generate_content(question, stream=True, **extra)
+        for chunk in resp:
+            try:
+                text = chunk.text or ""
+            except Exception:
+                # blocked/empty chunks raise on .text in some SDK versions
+                text = ""
+            if text:
+                yield text
+    except Exception as e:
+        log_ai_failure("stream", e)
+        return
+
+
+SENTENCE_BOUNDARY_RE = re.compile(r"[.!?][\"')\]]*\s+|\n+")
+
+
+def split_sentences(chunks):
+    """Re-chunk a token stream into sentences as soon as each boundary arrives."""
+    buf = ""
+    for chunk in chunks:
+        buf += chunk
+        while True:
+            m = SENTENCE_BOUNDARY_RE.search(buf)
+            if not m:
+                break
+            sentence = buf[:m.end()].strip()
+            buf = buf[m.end():]
+            if sentence:
+                yield sentence
+    tail = buf.strip()
+    if tail:
+        yield tail
+
+
+def stream_ai_answer_to_tts(engine: pyttsx3.Engine, cfg: dict, model, question: str, logger: logging.Logger,
+                            generation_config=None) -> str:
+    """Speak a streamed AI answer sentence by sentence while the rest is still arriving.
+
+    A producer thread reads the model stream and queues sentences; this thread speaks
+    them until ai_tts_max_chars is used up. Returns the full answer text.
+    """
+    if not model or not question:
+        return ""
+    started = time.perf_counter()
+    filler = start_ai_filler(engine, cfg)
+    return speak_streamed_answer(engine, cfg, ai_answer_stream(model, question, generation_config), logger,
+                                 started, filler)
+
+
+def speak_streamed_answer(engine: pyttsx3.Engine, cfg: dict, chunks, logger: logging.Logger,
+                          started: float, filler=None) -> str:
+    """Speak answer text chunks sentence by sentence as they arrive (the body of
+    stream_ai_answer_to_tts). filler is cancelled at the first sentence.
+    """
+    sentences: "queue.Queue" = queue.Queue()
+    parts: List[str] = []
+
+    def producer():
+        try:
+            for sentence in split_sentences(chunks):
+                parts.append(sentence)
+                sentences.put(sentence)
+        finally:
+            sentences.put(None)
+
+    threading.Thread(target=producer, daemon=True).start()
+
+    budget = int(cfg.get("ai_tts_max_chars", 400))
+    first_speech_ms = None
+    while True:
+        sentence = sentences.get()
+        if filler:
+            filler.cancel()
+        if sentence is None:
+            break
+        if budget <= 0:
+            continue  # keep draining so the full answer is still collected
+        snippet = sentence if len(sentence) <= budget else sentence[:budget]
+        budget -= len(snippet)
+        if first_speech_ms is None:
+            first_speech_ms = (time.perf_counter() - started) * 1000
+            logger.info(f"AI stream: first speech after {first_speech_ms:.0f} ms")
+        speak(engine, snippet)
+
+    answer = " ".join(parts).strip()
+    if answer:
+        logger.info(f"AI stream: complete after {(time.perf_counter() - started) * 1000:.0f} ms, {len(answer)} chars")
+        if cfg.get("ai_print_full_answer", False):
+            safe_print("\n=== AI Answer ===\n" + answer + "\n==================\n")
+    return answer
+
+
 def is_question(text: str) -> bool:
     if not text:
         return False
@@ -290,200 +1519,1435 @@ def is_question(text: str) -> bool:
     return any(t.startswith(s) for s in starters)
 
 
-def speak_ai_answer(engine: pyttsx3.Engine, cfg: dict, answer: str, logger: logging.Logger):
-    if not answer:
-        return
-    try:
-        if cfg.get("ai_print_full_answer", False):
-            safe_print("\n=== AI Answer ===\n" + answer + "\n==================\n")
-        max_chars = int(cfg.get("ai_tts_max_chars", 400))
-        snippet = answer if len(answer) <= max_chars else answer[:max_chars]
-        speak(engine, snippet)
-    except Exception:
-        # Fallback to basic speak
-        speak(engine, answer[:400])
+def speak_ai_answer(engine: pyttsx3.Engine, cfg: dict, answer: str, logger: logging.Logger):
+    if not answer:
+        return
+    try:
+        if cfg.get("ai_print_full_answer", False):
+            safe_print("\n=== AI Answer ===\n" + answer + "\n==================\n")
+        max_chars = int(cfg.get("ai_tts_max_chars", 400))
+        snippet = answer if len(answer) <= max_chars else answer[:max_chars]
+        speak(engine, snippet)
+    except Exception:
+        # Fallback to basic speak
+        speak(engine, answer[:400])
+
+
+def speak_full_ai_answer(engine: pyttsx3.Engine, cfg: dict, answer: str):
+    if not answer:
+        speak(engine, "I don't have an answer to read yet")
+        return
+    chunk = int(cfg.get("ai_tts_max_chars", 500))
+    chunk = max(200, min(chunk, 1200))
+    # Group whole sentences into chunks so no sentence is cut in the middle
+    buf = ""
+    for sentence in split_sentences([answer]):
+        if buf and len(buf) + len(sentence) + 1 > chunk:
+            speak(engine, buf)
+            buf = ""
+        buf = f"{buf} {sentence}".strip()
+    if buf:
+        speak(engine, buf)
+
+
+def ai_or_search(engine: pyttsx3.Engine, cfg: dict, ai_model, query: str, logger: logging.Logger,
+                 context: "ConversationContext" = None) -> Dict[str, Any]:
+    """Try AI answer; if unavailable/empty, open Google search instead.
+
+    Returns a result dict: handled (bool), text (the AI answer, "" if none),
+    source ("ai", "web" or "none") and ms (time spent answering). With a
+    context, earlier turns are sent along and the answer is added to it.
+    """
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"handled": False, "text": "", "source": "none", "ms": 0.0}
+    if not query:
+        return result
+    # Short mode: ask for a spoken-length answer instead of cutting a full one
+    short = bool(ai_model) and cfg.get("ai_short_answers", True)
+    question = context.prompt(query) if context is not None else query
+    prompt = SHORT_ANSWER_PROMPT + question if short else question
+    gen_config = short_answer_config(cfg) if short else None
+    result.update(short=short, question=question)
+    if cfg.get("ai_stream_answers", True):
+        ans = stream_ai_answer_to_tts(engine, cfg, ai_model, prompt, logger, gen_config)
+    else:
+        filler = start_ai_filler(engine, cfg) if ai_model else None
+        ans = ai_answer(ai_model, prompt, gen_config)
+        if filler:
+            filler.cancel()
+        if ans:
+            speak_ai_answer(engine, cfg, ans, logger)
+    if ans and context is not None:
+        context.add(query, ans)
+    return finish_ai_result(engine, cfg, query, ans, result, started)
+
+
+def finish_ai_result(engine: pyttsx3.Engine, cfg: dict, query: str, ans: str, result: Dict[str, Any],
+                     started: float) -> Dict[str, Any]:
+    """Record an (already spoken) AI answer in result, or open a web search when there is none."""
+    if ans:
+        result.update(handled=True, text=ans, source="ai")
+        # Optionally also open related web results even when AI answered
+        try:
+            if cfg.get("also_open_web_on_ai_answer", True):
+                url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
+                webbrowser.open(url)
+        except Exception:
+            pass
+    else:
+        # Fallback: open web search
+        try:
+            # honor config to disable web fallback
+            if not cfg.get("web_fallback_on_ai_failure", True):
+                speak(engine, "I don't have that answer right now.")
+                result["handled"] = True
+            else:
+                url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
+                webbrowser.open(url)
+                speak(engine, f"Searching Google for {query}")
+                result.update(handled=True, source="web")
+        except Exception:
+            pass
+    result["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    if ans and result.get("short"):
+        log_answer_savings(result, cfg)
+    elif ans:
+        FULL_ANSWER_STATS.append((len(ans), result["ms"]))
+    return result
+
+
+# Intent list for the AI router, built once and shared by both routing prompts
+ROUTE_INTENTS_SPEC = (
+    "open_app, open_site, open_browser, search_web, search_youtube, time, date, greet, exit, "
+    "volume, brightness, media, remind_in, remind_at, calc, convert, date_of_week, read_full_answer.\n\n"
+    "args depends on intent: \n"
+    "- open_app: {target} (e.g., 'notepad', 'calculator', 'paint', 'vscode', 'explorer')\n"
+    "- open_site: {target} (e.g., 'google', 'youtube', 'github', 'gmail')\n"
+    "- open_browser: {}\n"
+    "- search_web: {query}\n"
+    "- search_youtube: {query}\n"
+    "- time/date/greet/exit/read_full_answer: {}\n"
+    "- volume: {direction} where direction in ['up','down','mute']\n"
+    "- brightness: {direction} where direction in ['up','down']\n"
+    "- media: {action} where action in ['play_pause','next','previous']\n"
+    "- remind_in: {amount, unit, message} with unit in ['seconds','minutes','hours']\n"
+    "- remind_at: {hour, minute, message} 24h integers\n"
+    "- calc: {expr} using only digits +-*/().\n"
+    "- convert: {value, src, dst} like 10, 'cm', 'inch'\n"
+    "- date_of_week: {date} in YYYY-MM-DD.\n"
+)
+
+ROUTE_PROMPT = (
+    "You are a command router. Map the user's sentence to one of these intents: "
+    + ROUTE_INTENTS_SPEC +
+    "Only choose intents that are obviously implied. If unsure, return intent 'none'.\n"
+    "Return STRICT JSON with keys: intent, args. Respond with ONLY the JSON, no extra text.\n"
+    "User: "
+)
+
+# Route-or-answer in one call: JSON for a command, plain text for anything else
+ROUTE_OR_ANSWER_PROMPT = (
+    "You are a voice assistant. If the user's sentence is obviously a command for one of these intents: "
+    + ROUTE_INTENTS_SPEC +
+    "then respond with ONLY STRICT JSON with keys: intent, args, no extra text.\n"
+    "Otherwise do not use JSON: answer the user directly in plain text suitable for speaking aloud.\n"
+    "User: "
+)
+ROUTE_OR_SHORT_ANSWER_PROMPT = ROUTE_OR_ANSWER_PROMPT.replace(
+    "suitable for speaking aloud.", "suitable for speaking aloud, in one or two short sentences.")
+
+
+def parse_route_reply(raw: str):
+    """Validate a router JSON reply against our executor's expectations.
+    Returns (intent, arg), or (None, None) for 'none' or invalid arguments.
+    Raises ValueError if raw isn't JSON.
+    """
+    raw = (raw or "").strip()
+    # Some SDK versions may wrap in code fences; strip them
+    if raw.startswith("```json") and raw.endswith("```"):
+        raw = raw[len("```json"): -3].strip()
+    elif raw.startswith("```") and raw.endswith("```"):
+        raw = raw[3:-3].strip()
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        return (None, None)
+    intent = (data.get("intent") or "").strip()
+    if not intent or intent.lower() == "none":
+        return (None, None)
+    args = data.get("args")
+
+    # Normalize to our executor's expectations
+    if intent in ("open_app", "open_site"):
+        target = (args.get("target") if isinstance(args, dict) else None) or None
+        return (intent, (target or "").lower())
+    if intent == "open_browser":
+        return (intent, None)
+    if intent in ("search_web", "search_youtube"):
+        query = (args.get("query") if isinstance(args, dict) else None) or ""
+        return (intent, query)
+    if intent in ("time", "date", "greet", "exit", "read_full_answer"):
+        return (intent, None)
+    if intent == "volume":
+        direction = (args.get("direction") if isinstance(args, dict) else None) or ""
+        if direction not in ("up", "down", "mute"):
+            return (None, None)
+        return (intent, direction)
+    if intent == "brightness":
+        direction = (args.get("direction") if isinstance(args, dict) else None) or ""
+        if direction not in ("up", "down"):
+            return (None, None)
+        return (intent, direction)
+    if intent == "media":
+        action = (args.get("action") if isinstance(args, dict) else None) or ""
+        if action not in ("play_pause", "next", "previous"):
+            return (None, None)
+        return (intent, action)
+    if intent == "remind_in":
+        if isinstance(args, dict):
+            amount = int(args.get("amount", 0))
+            unit = str(args.get("unit", "")).lower()
+            message = str(args.get("message", ""))
+            if amount > 0 and unit in ("second", "seconds", "minute", "minutes", "hour", "hours") and message:
+                return (intent, (amount, unit, message))
+    if intent == "remind_at":
+        if isinstance(args, dict):
+            hour = int(args.get("hour", -1))
+            minute = int(args.get("minute", -1))
+            message = str(args.get("message", ""))
+            if 0 <= hour <= 23 and 0 <= minute <= 59 and message:
+                return (intent, (hour, minute, message))
+    if intent == "calc":
+        expr = (args.get("expr") if isinstance(args, dict) else None) or ""
+        if re.fullmatch(r"[0-9\s\+\-\*\/\(\)\.]+", expr or ""):
+            return (intent, expr)
+    if intent == "convert":
+        if isinstance(args, dict):
+            try:
+                value = float(args.get("value"))
+            except Exception:
+                value = None
+            src = str(args.get("src", "")).lower()
+            dst = str(args.get("dst", "")).lower()
+            if value is not None and src and dst:
+                return (intent, (value, src, dst))
+    if intent == "date_of_week":
+        date_str = (args.get("date") if isinstance(args, dict) else None) or ""
+        try:
+            datetime.strptime(date_str, "%Y-%m-%d")
+            return (intent, date_str)
+        except Exception:
+            return (None, None)
+    return (None, None)
+
+
+def ai_route_intent(ai_model, text: str, logger: logging.Logger):
+    """Use AI to classify a natural language command into one of our safe intents.
+    Returns (intent, arg) or (None, None) if not confident.
+    """
+    if not ai_model or not text:
+        return (None, None)
+    try:
+        resp = ai_model.generate_content([
+            {"role": "user", "parts": [ROUTE_PROMPT + text]}
+        ], deadline=getattr(ai_model, "route_deadline", None))
+        return parse_route_reply(getattr(resp, "text", "") or "")
+    except (AIDeadlineError, AIQuotaError) as e:
+        log_ai_failure("routing", e)
+        return (None, None)
+    except Exception:
+        logger.info("AI routing failed or returned invalid JSON")
+        return (None, None)
+
+
+def ai_route_or_answer(engine: pyttsx3.Engine, cfg: dict, ai_model, text: str, logger: logging.Logger,
+                       context: "ConversationContext" = None) -> Dict[str, Any]:
+    """Route or answer an unknown command with a single AI call.
+
+    The model replies with router JSON for a command (validated by
+    parse_route_reply) or with a plain-text answer, which is spoken as it
+    streams. Returns ai_or_search's result dict plus intent/arg: intent is set
+    when the command was routed (nothing spoken yet). handled is False only if
+    there is no model or it returned JSON without a usable intent. Like
+    ai_or_search, an optional context supplies and records earlier turns.
+    """
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"handled": False, "text": "", "source": "none", "ms": 0.0,
+                              "intent": None, "arg": None}
+    if not ai_model or not text:
+        return result
+    short = cfg.get("ai_short_answers", True)
+    template = ROUTE_OR_SHORT_ANSWER_PROMPT if short else ROUTE_OR_ANSWER_PROMPT
+    question = context.prompt(text) if context is not None else text
+    prompt = [{"role": "user", "parts": [template + question]}]
+    # Leave room for routing JSON (reminder messages) under the short-answer cap
+    gen_config = short_answer_config(cfg, floor=128) if short else None
+    result.update(short=short, question=question)
+    streaming = cfg.get("ai_stream_answers", True)
+    filler = start_ai_filler(engine, cfg)
+    if streaming:
+        chunks = ai_answer_stream(ai_model, prompt, gen_config)
+    else:
+        chunks = iter([ai_answer(ai_model, prompt, gen_config)])
+    head = ""
+    for chunk in chunks:
+        head += chunk
+        if head.strip():
+            break
+    if head.lstrip().startswith(("{", "`")):
+        raw = head + "".join(chunks)
+        if filler:
+            filler.cancel()
+        try:
+            result["intent"], result["arg"] = parse_route_reply(raw)
+        except Exception:
+            logger.info("AI route-or-answer returned invalid JSON")
+        result["handled"] = result["intent"] is not None
+        result["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+    if streaming:
+        answer = speak_streamed_answer(engine, cfg, itertools.chain([head], chunks), logger, started, filler)
+    else:
+        if filler:
+            filler.cancel()
+        answer = head.strip()
+        speak_ai_answer(engine, cfg, answer, logger)
+    if answer and context is not None:
+        context.add(text, answer)
+    return finish_ai_result(engine, cfg, text, answer, result, started)
+
+# Seed phrasings for the local router. Labels are "intent" or "intent:arg" in the
+# same form ai_route_intent returns; "none" marks questions meant for the AI.
+LOCAL_ROUTER_SEEDS = {
+    "volume:up": ["make it louder", "turn it up", "turn the volume up", "increase the volume", "louder please",
+                  "raise the volume", "pump up the volume", "i can't hear it", "boost the sound", "sound up"],
+    "volume:down": ["make it quieter", "turn it down", "lower the volume", "decrease the volume", "too loud",
+                    "quieter please", "reduce the sound", "sound down", "it's too loud in here",
+                    "turn the volume down", "turn down the volume", "turn the sound down"],
+    "volume:mute": ["mute", "mute the sound", "silence the audio", "turn off the sound", "unmute",
+                    "mute audio", "kill the sound", "shut the sound off"],
+    "brightness:up": ["make the screen brighter", "increase brightness", "brighter please", "turn up the brightness",
+                      "the screen is too dark", "raise the brightness", "more brightness",
+                      "it's way too dim in here"],
+    "brightness:down": ["dim the screen", "make the screen darker", "lower the brightness", "decrease brightness",
+                        "the screen is too bright", "less brightness", "turn down the brightness"],
+    "media:play_pause": ["pause the music", "resume the song", "play the music", "pause it", "stop the music",
+                         "continue playing", "pause playback", "resume playback"],
+    "media:next": ["next song", "skip this track", "play the next track", "skip", "next one", "skip this song",
+                   "go to the next song"],
+    "media:previous": ["previous song", "go back a track", "play the last song again", "previous track",
+                       "back one song", "play the previous one"],
+    "time": ["what time is it", "tell me the time", "what's the time", "current time", "do you know the time",
+             "what is the time now", "time please"],
+    "date": ["what's the date", "what day is it today", "today's date", "what is today's date", "tell me the date",
+             "which date is it"],
+    "greet": ["hello", "hi there", "good morning", "hey", "good evening", "hello jarvis", "hey buddy"],
+    "exit": ["goodbye", "stop listening", "shut down", "exit", "quit", "see you later", "that's all for now",
+             "go to sleep", "bye", "see you tomorrow", "good night jarvis"],
+    "read_full_answer": ["read the full answer", "read it all", "tell me the whole answer", "read more",
+                         "continue reading", "read the rest"],
+    "open_browser": ["open the browser", "launch the web browser", "start the browser", "open a browser window",
+                     "bring up the browser"],
+    "none": ["what is the capital of france", "who wrote romeo and juliet", "tell me a joke",
+             "how far away is the moon", "explain how vaccines work", "what is the meaning of life",
+             "who is the president of the united states", "how do i bake bread", "what is machine learning",
+             "why is the sky blue", "how many legs does a spider have", "tell me about black holes",
+             "write a short poem about the sea", "what does photosynthesis mean", "recommend a good book",
+             "who won the world cup", "how does a car engine work", "what should i cook for dinner",
+             "how loud is a jet engine", "what time zone is london in", "what is the date of the next full moon",
+             "how do screens produce light", "who sings the song next to me", "how do you say hi in french"],
+    # Commands outside the labels above, so lookalikes ("turn off the lamp") aren't pulled into them
+    "ai": ["turn on the lamp", "switch off the tv", "turn off the kitchen light", "close the window",
+           "open the front door", "start a countdown", "cancel the reminder", "shut down the pc",
+           "restart my phone", "close spotify", "quit the app", "open word", "turn the air conditioning on",
+           "pause the download", "stop the recording", "read my messages", "skip the intro", "mute the call",
+           "open the settings", "set an alarm for seven", "turn off the oven", "lock the door"],
+}
+
+# Labels the router recognises but never acts on: quitting Jarvis, and commands
+# outside its set, always go to the AI router (which can ask or refuse) instead.
+LOCAL_ROUTER_DEFER = frozenset({"exit", "ai"})
+
+# Words that name the opposite of a label's arg. Shared words ("turn the volume")
+# can outweigh a single "down", so a label contradicted by its query is never acted on.
+_UP_WORDS = frozenset({"up", "louder", "brighter", "increase", "raise", "higher"})
+_DOWN_WORDS = frozenset({"down", "quieter", "softer", "darker", "decrease", "lower", "reduce"})
+LOCAL_ROUTER_OPPOSITES = {
+    "up": _DOWN_WORDS,
+    "down": _UP_WORDS,
+    "next": frozenset({"previous", "back", "last"}),
+    "previous": frozenset({"next", "skip", "forward"}),
+}
+
+
+def router_label_contradicted(label: str, text: str) -> bool:
+    """True if text contains a direction word opposite to label's arg ("volume:up" vs "down")."""
+    arg = label.partition(":")[2]
+    opposites = LOCAL_ROUTER_OPPOSITES.get(arg)
+    return bool(opposites) and not opposites.isdisjoint(IntentClassifier.normalize(text).split())
+
+
+def _router_label(intent, arg):
+    """Training label for a recorded (intent, arg), or None if the router doesn't predict it."""
+    label = f"{intent}:{arg}" if arg not in (None, "") else str(intent)
+    return label if label in LOCAL_ROUTER_SEEDS else None
+
+
+def router_examples_from_history(entries: List[Dict[str, Any]]) -> List[tuple]:
+    """(text, label) pairs from conversation history: commands with a recorded
+    parsed/executed intent, and AI-answered inputs as "none".
+
+    Rows the local router decided itself are skipped so it never trains on its
+    own mistakes; AI-routed commands it has no label for become "ai".
+    """
+    out = []
+    for e in entries:
+        text = (e.get("input") or "").strip()
+        if not text or e.get("routed_by") == "local":
+            continue
+        if e.get("ai_source") in ("ai", "web"):
+            out.append((text, "none"))
+            continue
+        intent = e.get("executed_intent") or e.get("parsed_intent")
+        label = _router_label(intent, e.get("arg")) if intent and intent != "unknown" else None
+        if label is None and intent and e.get("routed_by") == "ai":
+            label = "ai"
+        if label:
+            out.append((text, label))
+    return out
+
+
+class IntentClassifier:
+    """Character n-gram TF-IDF nearest-neighbour classifier over a NumPy matrix.
+
+    Each example becomes an L2-normalised row of word-boundary character 3-5 grams
+    plus whole words and word pairs, weighted by IDF; a query is scored against every row with
+    one matrix-vector product and takes the label of the most similar example.
+    """
+
+    def __init__(self, examples: List[tuple]):
+        seen = {}
+        for text, label in examples:
+            seen[self.normalize(text)] = label  # later (history) examples win
+        self.texts = [t for t in seen if t]
+        self.labels = [seen[t] for t in self.texts]
+        names = sorted(set(self.labels))
+        self._label_ids = np.array([names.index(label) for label in self.labels], dtype=np.int32)
+        grams = [self._grams(t) for t in self.texts]
+        self.vocab: Dict[str, int] = {}
+        for gs in grams:
+            for g in gs:
+                self.vocab.setdefault(g, len(self.vocab))
+        rows = np.zeros((len(self.texts), len(self.vocab)), dtype=np.float32)
+        for i, gs in enumerate(grams):
+            for g, n in gs.items():
+                rows[i, self.vocab[g]] = n
+        df = (rows > 0).sum(axis=0)
+        self.idf = (np.log((1.0 + len(self.texts)) / (1.0 + df)) + 1.0).astype(np.float32)
+        rows *= self.idf
+        rows /= np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-9)
+        self.matrix = rows
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(re.sub(r"[^a-z0-9' ]+", " ", (text or "").lower()).split())
+
+    @staticmethod
+    def _grams(text: str) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        words = text.split()
+        for pair in zip(words, words[1:]):
+            counts["b:" + " ".join(pair)] = counts.get("b:" + " ".join(pair), 0) + 1
+        for word in words:
+            counts["w:" + word] = counts.get("w:" + word, 0) + 1
+            padded = f" {word} "
+            for n in (3, 4, 5):
+                for i in range(len(padded) - n + 1):
+                    g = padded[i:i + n]
+                    counts[g] = counts.get(g, 0) + 1
+        return counts
+
+    # Politeness and filler that say nothing about the intent
+    FILLER_WORDS = frozenset({"please", "can", "could", "would", "you", "a", "bit", "little", "just", "now",
+                              "right", "jarvis", "hey", "ok", "okay", "um", "uh"})
+
+    def known_fraction(self, text: str) -> float:
+        """Share of the words in text (fillers aside) that occur in the training examples."""
+        words = [w for w in self.normalize(text).split() if w not in self.FILLER_WORDS]
+        if not words:
+            return 1.0
+        return sum(("w:" + w) in self.vocab for w in words) / len(words)
+
+    def predict(self, text: str):
+        """(label, cosine similarity) of the nearest example; (None, 0.0) if nothing overlaps."""
+        label, score, _ = self.predict_margin(text)
+        return label, score
+
+    def predict_margin(self, text: str):
+        """(label, score, margin): margin is how far the nearest example of any
+        other label trails the winner, so near-ties can be sent to the AI.
+        """
+        vec = np.zeros(len(self.vocab), dtype=np.float32)
+        for g, n in self._grams(self.normalize(text)).items():
+            idx = self.vocab.get(g)
+            if idx is not None:
+                vec[idx] = n
+        vec *= self.idf
+        norm = float(np.linalg.norm(vec))
+        if not norm or not len(self.texts):
+            return None, 0.0, 0.0
+        sims = self.matrix @ (vec / norm)
+        best = int(np.argmax(sims))
+        label = self.labels[best]
+        others = sims[self._label_ids != self._label_ids[best]]
+        margin = float(sims[best] - others.max()) if others.size else float(sims[best])
+        return label, float(sims[best]), margin
+
+
+INTENT_CLASSIFIER = {"model": None, "built_at": 0.0, "history_mtime": None}
+_INTENT_CLASSIFIER_LOCK = threading.Lock()
+
+
+def get_intent_classifier(cfg) -> "IntentClassifier":
+    """Classifier trained on LOCAL_ROUTER_SEEDS plus conversation history, rebuilt
+    at most every local_router_refresh_seconds when the history has changed.
+    None when NumPy isn't installed.
+    """
+    if not np:
+        return None
+    try:
+        mtime = os.stat(CONV_HISTORY_PATH).st_mtime_ns
+    except OSError:
+        mtime = None
+    refresh = float(cfg.get("local_router_refresh_seconds", 300))
+    with _INTENT_CLASSIFIER_LOCK:
+        state = INTENT_CLASSIFIER
+        stale = state["model"] is None or (
+            mtime != state["history_mtime"] and time.time() - state["built_at"] >= refresh)
+        if stale:
+            examples = [(t, label) for label, texts in LOCAL_ROUTER_SEEDS.items() for t in texts]
+            history = read_tail(CONV_HISTORY_PATH, int(cfg.get("local_router_history", 2000)))
+            examples += router_examples_from_history(history)
+            state.update(model=IntentClassifier(examples), built_at=time.time(), history_mtime=mtime)
+        return state["model"]
+
+
+def local_router_decision(model: "IntentClassifier", text: str, cfg):
+    """The label the router would act on for text, or None to leave it to the AI:
+    a weak or near-tied match, too many words it has never seen, a label in
+    LOCAL_ROUTER_DEFER, or one whose direction the query contradicts.
+    """
+    label, score, margin = model.predict_margin(text)
+    if (label is None or label in LOCAL_ROUTER_DEFER or router_label_contradicted(label, text)
+            or score < float(cfg.get("local_router_threshold", 0.5))
+            or margin < float(cfg.get("local_router_margin", 0.15))
+            or model.known_fraction(text) < float(cfg.get("local_router_min_known", 1.0))):
+        return None
+    return label
+
+
+def local_route_intent(text: str, cfg):
+    """Route a command offline. Returns (intent, arg, confident); intent None with
+    confident True means "this is a question, don't ask the AI to route it".
+    When local_router_decision declines, confident is False and the caller asks the AI.
+    """
+    if not cfg.get("local_router_enabled", True):
+        return None, None, False
+    try:
+        model = get_intent_classifier(cfg)
+    except Exception:
+        model = None
+    if model is None:
+        return None, None, False
+    label = local_router_decision(model, text, cfg)
+    if label is None:
+        return None, None, False
+    if label == "none":
+        return None, None, True
+    intent, _, arg = label.partition(":")
+    return intent, (arg or None), True
+
+
+def evaluate_local_router(cfg, corpus_path: str = None) -> Dict[str, Any]:
+    """Routing accuracy and per-query latency of the local classifier.
+
+    With a corpus (one "text<TAB>label" per line) the classifier trained as usual
+    is scored on it; otherwise every fifth seed/history example is held out.
+    Labels in LOCAL_ROUTER_DEFER are correct only when the router declines;
+    command_coverage is the share of routable commands handled without the AI,
+    and wrong_actions lists confident answers that differ from the label.
+    """
+    if not np:
+        return {"error": "NumPy is not installed"}
+    examples = [(t, label) for label, texts in LOCAL_ROUTER_SEEDS.items() for t in texts]
+    examples += router_examples_from_history(read_tail(CONV_HISTORY_PATH, int(cfg.get("local_router_history", 2000))))
+    if corpus_path:
+        train = examples
+        with open(corpus_path, "r", encoding="utf-8") as f:
+            test = [tuple(line.rstrip("\n").split("\t", 1)) for line in f if "\t" in line]
+    else:
+        train = [ex for i, ex in enumerate(examples) if i % 5]
+        test = [ex for i, ex in enumerate(examples) if not i % 5]
+    model = IntentClassifier(train)
+    correct = answered = answered_correct = commands = commands_routed = 0
+    wrong = []
+    latencies = []
+    for text, expected in test:
+        started = time.perf_counter_ns()
+        label = local_router_decision(model, text, cfg)
+        latencies.append((time.perf_counter_ns() - started) / 1000.0)
+        is_command = expected not in LOCAL_ROUTER_DEFER and expected != "none"
+        commands += is_command
+        if label is None:
+            correct += expected in LOCAL_ROUTER_DEFER
+            continue
+        answered += 1
+        commands_routed += is_command
+        if label == expected:
+            correct += 1
+            answered_correct += 1
+        else:
+            wrong.append(f"{text} -> {label} (expected {expected})")
+    n = len(test) or 1
+    return {
+        "train_examples": len(model.texts), "test_examples": len(test),
+        "threshold": float(cfg.get("local_router_threshold", 0.5)),
+        "margin": float(cfg.get("local_router_margin", 0.15)),
+        "min_known": float(cfg.get("local_router_min_known", 1.0)),
+        "accuracy": round(correct / n, 3),
+        "command_coverage": round(commands_routed / commands, 3) if commands else None,
+        "accuracy_above_threshold": round(answered_correct / answered, 3) if answered else None,
+        "wrong_actions": wrong,
+        "latency_us_p50": round(percentile(latencies, 50), 1) if latencies else None,
+        "latency_us_p95": round(percentile(latencies, 95), 1) if latencies else None,
+    }
+
+
+class AudioRingBuffer:
+    """Fixed-size, preallocated byte ring written by a single capture thread.
+
+    Positions are absolute byte offsets since capture started. read() hands out
+    memoryview slices of the ring without copying; they stay valid until the writer
+    laps them (capacity bytes later), so consumers should use them promptly.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self.write_pos = 0
+        self.write_time = 0.0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def write(self, data: bytes):
+        n = len(data)
+        if n > self.capacity:
+            data = data[-self.capacity:]
+            n = self.capacity
+        with self._cond:
+            start = self.write_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self._view[start:start + first] = data[:first]
+            if first < n:
+                self._view[0:n - first] = data[first:]
+            self.write_pos += n
+            self.write_time = time.time()
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def oldest_pos(self) -> int:
+        return max(0, self.write_pos - self.capacity)
+
+    def read(self, pos: int, n: int, timeout: float = None):
+        """Wait until bytes [pos, pos+n) are written and return (start_pos, views).
+        start_pos moves forward if pos was already overwritten; views is empty once closed.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.closed or self.write_pos >= max(pos, self.oldest_pos()) + n, timeout):
+                return pos, []
+            if self.write_pos < pos + n and self.closed:
+                return pos, []
+            pos = max(pos, self.oldest_pos())
+            start = pos % self.capacity
+            first = min(n, self.capacity - start)
+            views = [self._view[start:start + first]]
+            if first < n:
+                views.append(self._view[0:n - first])
+            return pos, views
+
+
+class AudioCapture:
+    """Reads frames from an audio stream nonstop into an AudioRingBuffer on its own thread."""
+
+    def __init__(self, stream, sample_rate: int, sample_width: int, chunk: int, seconds: float = 30.0):
+        self.stream = stream
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = sample_width
+        self.CHUNK = chunk
+        self.bytes_per_second = sample_rate * sample_width
+        frame_bytes = chunk * sample_width
+        capacity = max(frame_bytes, int(seconds * self.bytes_per_second) // frame_bytes * frame_bytes)
+        self.ring = AudioRingBuffer(capacity)
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="audio-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self.ring.close()
+
+    def join(self, timeout: float = None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def pos_at(self, t: float) -> int:
+        """Byte position that was being captured at wall-clock time t."""
+        ring = self.ring
+        offset = int((ring.write_time - t) * self.bytes_per_second)
+        offset -= offset % self.SAMPLE_WIDTH
+        return max(ring.oldest_pos(), ring.write_pos - max(0, offset))
+
+    def _run(self):
+        while self._running:
+            try:
+                data = self.stream.read(self.CHUNK)
+            except Exception:
+                break
+            if not data:
+                break
+            self.ring.write(data)
+        self.ring.close()
+
+
+class _RingStream:
+    def __init__(self, source: "RingBufferSource"):
+        self.source = source
+
+    def read(self, size: int):
+        src = self.source
+        nbytes = size * src.SAMPLE_WIDTH
+        pos, views = src.capture.ring.read(src.cursor, nbytes)
+        if not views:
+            return b""
+        src.cursor = pos + nbytes
+        # A contiguous read is a view into the ring, not a copy. It stays valid until the capture
+        # laps it (capture_buffer_seconds later), long after speech_recognition has joined the
+        # phrase it belongs to. Only a read that wraps past the end of the ring is joined.
+        return views[0] if len(views) == 1 else b"".join(views)
+
+
+class RingBufferSource(sr.AudioSource):
+    """AudioSource that reads from a continuous AudioCapture instead of opening the mic per listen.
+
+    Each source keeps its own cursor, so audio that arrives between two listen()
+    calls (while recognizing or sleeping) is still read by the next one.
+    """
+
+    def __init__(self, capture: AudioCapture):
+        self.capture = capture
+        self.SAMPLE_RATE = capture.SAMPLE_RATE
+        self.SAMPLE_WIDTH = capture.SAMPLE_WIDTH
+        self.CHUNK = capture.CHUNK
+        self.cursor = capture.ring.write_pos
+        self.stream = _RingStream(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def skip_to(self, t: float, preroll: float = 0.0):
+        """Skip audio captured before time t (e.g. our own TTS), keeping preroll seconds
+        before it so a word started right at t isn't clipped."""
+        pos = self.capture.pos_at(t) - int(preroll * self.capture.bytes_per_second)
+        pos -= pos % self.SAMPLE_WIDTH
+        self.cursor = max(self.cursor, pos, self.capture.ring.oldest_pos())
+
+
+# Process-wide Vosk cache: loading a model takes hundreds of ms, so keep it
+# for the lifetime of the process and recycle recognizers between utterances.
+VOSK_LOCK = threading.Lock()
+VOSK_MODELS: Dict[str, Any] = {}
+VOSK_REC_POOL: Dict[tuple, List[Any]] = {}
+VOSK_POOL_MAX = 4
+
+
+def get_vosk_model(model_path: str):
+    """Return a cached vosk.Model for model_path, loading it on first use."""
+    if not Model or not model_path or not os.path.isdir(model_path):
+        return None
+    key = os.path.abspath(model_path)
+    with VOSK_LOCK:
+        model = VOSK_MODELS.get(key)
+        if model is None:
+            model = Model(model_path)
+            VOSK_MODELS[key] = model
+        return model
+
+
+def acquire_vosk_recognizer(model_path: str, sample_rate: int = 16000, grammar: str = None):
+    """Take a ready KaldiRecognizer from the pool, or build one on the cached model.
+    grammar is an optional JSON list of phrases that restricts the vocabulary.
+    """
+    model = get_vosk_model(model_path)
+    if model is None or not KaldiRecognizer:
+        return None
+    key = (os.path.abspath(model_path), int(sample_rate), grammar)
+    with VOSK_LOCK:
+        pool = VOSK_REC_POOL.get(key)
+        if pool:
+            return pool.pop()
+    if grammar:
+        return KaldiRecognizer(model, int(sample_rate), grammar)
+    return KaldiRecognizer(model, int(sample_rate))
+
+
+def release_vosk_recognizer(model_path: str, sample_rate: int, rec, grammar: str = None):
+    """Reset a recognizer and return it to the pool for the next utterance."""
+    if rec is None:
+        return
+    try:
+        rec.Reset()
+    except Exception:
+        return  # don't recycle a recognizer in an unknown state
+    key = (os.path.abspath(model_path), int(sample_rate), grammar)
+    with VOSK_LOCK:
+        pool = VOSK_REC_POOL.setdefault(key, [])
+        if len(pool) < VOSK_POOL_MAX:
+            pool.append(rec)
+
+
+class FrameVAD:
+    """Frame-level voice activity detector with an adaptive noise floor.
+
+    Audio is split into short frames (10-30 ms); a frame is voiced when its RMS is
+    threshold_db above the tracked noise floor. Speech starts after attack_frames
+    voiced frames in a row and ends once hangover_ms passes without one. Frame
+    energies are computed with NumPy when it's installed, else with audioop.
+
+    During speech the floor can still rise: every floor_window_ms it moves halfway
+    to the quietest frame of that window. Real speech has quieter gaps between
+    words, so it barely moves; a noise that started during a lull (a fan, traffic)
+    doesn't, so it stops counting as speech after a window or two.
+    """
+
+    def __init__(self, sample_rate: int, frame_ms: int = 20, threshold_db: float = 9.0,
+                 hangover_ms: int = 300, attack_frames: int = 2, initial_floor: float = 100.0,
+                 min_rms: float = 50.0, floor_adapt: float = 0.05, floor_window_ms: int = 1000):
+        frame_ms = min(30, max(10, int(frame_ms)))
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+        self.ratio = 10 ** (float(threshold_db) / 20.0)
+        self.hangover_frames = max(1, int(round(hangover_ms / frame_ms)))
+        self.attack_frames = max(1, int(attack_frames))
+        self.floor = max(1.0, float(initial_floor))
+        self.min_rms = float(min_rms)
+        self.floor_adapt = float(floor_adapt)
+        self.window_frames = max(1, int(round(floor_window_ms / frame_ms)))
+        self.in_speech = False
+        self._run = 0
+        self._hang = 0
+        self._rest = b""
+        self._window_min = None
+        self._window_n = 0
+
+    @classmethod
+    def from_config(cls, cfg, sample_rate: int, energy_threshold: float):
+        """Build a VAD whose starting threshold matches the calibrated energy threshold."""
+        threshold_db = float(cfg.get("vad_threshold_db", 9.0))
+        return cls(
+            sample_rate,
+            frame_ms=int(cfg.get("vad_frame_ms", 20)),
+            threshold_db=threshold_db,
+            hangover_ms=int(cfg.get("vad_hangover_ms", 300)),
+            initial_floor=float(energy_threshold) / (10 ** (threshold_db / 20.0)),
+        )
+
+    def frame_energies(self, data: bytes):
+        """RMS of every whole 16-bit frame in data."""
+        n = len(data) // self.frame_bytes
+        if not n:
+            return []
+        if np:
+            frames = np.frombuffer(data, dtype=np.int16, count=n * self.frame_bytes // 2).reshape(n, -1)
+            return np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1)).tolist()
+        fb = self.frame_bytes
+        return [audioop.rms(data[i * fb:(i + 1) * fb], 2) for i in range(n)]
+
+    def update(self, buf: bytes) -> bool:
+        """Feed 16-bit mono audio; returns whether speech is in progress after it."""
+        data = self._rest + buf
+        energies = self.frame_energies(data)
+        used = len(energies) * self.frame_bytes
+        self._rest = data[used:]
+        for energy in energies:
+            if self.in_speech:
+                self._track_speech_floor(energy)
+            voiced = energy > max(self.floor * self.ratio, self.min_rms)
+            if voiced:
+                self._run += 1
+                if self._run >= self.attack_frames:
+                    self.in_speech = True
+                    self._hang = self.hangover_frames
+            else:
+                self._run = 0
+                # Only track the floor on unvoiced frames; fall fast, rise slowly
+                step = 0.5 if energy < self.floor else self.floor_adapt
+                self.floor = max(1.0, self.floor + step * (energy - self.floor))
+                if self.in_speech:
+                    self._hang -= 1
+                    if self._hang <= 0:
+                        self.in_speech = False
+                        self._window_min, self._window_n = None, 0
+        return self.in_speech
+
+    def _track_speech_floor(self, energy: float):
+        """Minimum-statistics floor update while speech is in progress."""
+        self._window_min = energy if self._window_min is None else min(self._window_min, energy)
+        self._window_n += 1
+        if self._window_n >= self.window_frames:
+            if self._window_min > self.floor:
+                self.floor += 0.5 * (self._window_min - self.floor)
+            self._window_min, self._window_n = None, 0
+
+
+# perf_counter() times at which the last utterance started and ended (for tracing)
+UTTERANCE_MARKS: Dict[str, float] = {}
+
+
+def iter_utterance(recognizer: sr.Recognizer, source: sr.AudioSource, timeout=5, phrase_time_limit=6, vad: FrameVAD = None):
+    """Yield 16-bit audio chunks of one utterance, lead-in included, until it ends.
+
+    Without a VAD this mirrors the energy endpointing of recognizer.listen
+    (energy_threshold + pause_threshold). With one, the VAD's hangover decides
+    when speech is over, which is usually well before pause_threshold.
+    Raises sr.WaitTimeoutError if no speech starts within timeout.
+    """
+    seconds_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+    if vad is None:
+        pause_buffers = max(1, int(round(recognizer.pause_threshold / seconds_per_buffer)))
+    else:
+        pause_buffers = 1
+    preroll_buffers = max(1, int(round(getattr(recognizer, "non_speaking_duration", 0.3) / seconds_per_buffer)))
+    preroll: List[bytes] = []
+    waited = 0.0
+    spoken = 0.0
+    silent = 0
+    started = False
+    UTTERANCE_MARKS.clear()
+    while True:
+        buf = source.stream.read(source.CHUNK)
+        if not buf:
+            break
+        if source.SAMPLE_WIDTH != 2:
+            buf = audioop.lin2lin(buf, source.SAMPLE_WIDTH, 2)
+        if vad is None:
+            voiced = audioop.rms(buf, 2) > recognizer.energy_threshold
+        else:
+            voiced = vad.update(buf)
+        if not started:
+            waited += seconds_per_buffer
+            if voiced:
+                started = True
+                UTTERANCE_MARKS["start"] = time.perf_counter()
+                # Include the quiet lead-in so the first syllable isn't clipped
+                for pre in preroll:
+                    yield pre
+                preroll = []
+            else:
+                if timeout and waited > timeout:
+                    raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+                preroll.append(buf)
+                if len(preroll) > preroll_buffers:
+                    preroll.pop(0)
+                continue
+        yield buf
+        spoken += seconds_per_buffer
+        silent = 0 if voiced else silent + 1
+        if silent >= pause_buffers:
+            break
+        if phrase_time_limit and spoken > phrase_time_limit:
+            break
+    UTTERANCE_MARKS["end"] = time.perf_counter()
+
+
+def listen_vad(recognizer: sr.Recognizer, source: sr.AudioSource, vad: FrameVAD, timeout=5, phrase_time_limit=6) -> sr.AudioData:
+    """recognizer.listen replacement that ends the phrase on the VAD's decision."""
+    frames = b"".join(iter_utterance(recognizer, source, timeout, phrase_time_limit, vad=vad))
+    return sr.AudioData(frames, source.SAMPLE_RATE, 2)
+
+
+def listen_vosk_streaming(recognizer: sr.Recognizer, source: sr.AudioSource, rec, timeout=5, phrase_time_limit=6, vad: FrameVAD = None) -> str:
+    """Feed microphone chunks into Vosk while the user is speaking.
+
+    Decoding runs incrementally, so the transcript is ready as soon as the
+    end of the phrase is detected.
+    """
+    for buf in iter_utterance(recognizer, source, timeout, phrase_time_limit, vad=vad):
+        rec.AcceptWaveform(bytes(buf))  # Vosk's C binding takes bytes, not ring buffer views
+    result = json.loads(rec.FinalResult())
+    return (result.get("text") or "").strip()
+
+
+# Vocabulary for the offline wake stage; "[unk]" absorbs every other word
+WAKE_GRAMMAR = json.dumps(sorted(set(WAKE_WORDS)) + ["[unk]"])
+
+
+def listen_for_wake_word(recognizer: sr.Recognizer, source: sr.AudioSource, rec, timeout=12) -> bool:
+    """Offline keyword spotting: stream frames into a grammar-restricted Vosk recognizer
+    and return True as soon as a wake word shows up. Quiet frames are not decoded.
+
+    Returns False on timeout or end of stream, so nothing is sent to cloud STT
+    until the wake word has actually been heard.
+    """
+    seconds_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+    hangover_buffers = max(1, int(round(0.5 / seconds_per_buffer)))
+    gate = recognizer.energy_threshold * 0.5
+    active = 0
+    waited = 0.0
+    while not timeout or waited <= timeout:
+        buf = source.stream.read(source.CHUNK)
+        if not buf:
+            break
+        waited += seconds_per_buffer
+        if source.SAMPLE_WIDTH != 2:
+            buf = audioop.lin2lin(buf, source.SAMPLE_WIDTH, 2)
+        # Energy gate with a short hangover keeps the decoder idle in silence
+        if audioop.rms(buf, 2) > gate:
+            active = hangover_buffers
+        elif active:
+            active -= 1
+        else:
+            continue
+        if rec.AcceptWaveform(bytes(buf)):
+            text = json.loads(rec.Result()).get("text") or ""
+        else:
+            text = json.loads(rec.PartialResult()).get("partial") or ""
+        if text and contains_wake_word(text):
+            return True
+    return False
+
+
+def detect_wake_word(recognizer: sr.Recognizer, source: sr.AudioSource, cfg, timeout=12):
+    """Run the offline wake stage if configured (wake_detector: "vosk").
+    Returns True/False, or None when the offline stage isn't available and the
+    caller should fall back to full STT.
+    """
+    if (cfg.get("wake_detector") or "stt").lower() != "vosk" or not audioop or not getattr(source, "stream", None):
+        return None
+    model_path = cfg.get("wake_vosk_model_path") or cfg.get("vosk_model_path")
+    if not model_path or not os.path.isdir(model_path) or not Model or not KaldiRecognizer:
+        return None
+    rate = int(source.SAMPLE_RATE)
+    rec = acquire_vosk_recognizer(model_path, rate, WAKE_GRAMMAR)
+    if rec is None:
+        return None
+    try:
+        return listen_for_wake_word(recognizer, source, rec, timeout=timeout)
+    finally:
+        release_vosk_recognizer(model_path, rate, rec, WAKE_GRAMMAR)
+
+
+def listen_wake_phrase(recognizer: sr.Recognizer, source: sr.AudioSource, cfg, timeout=12, phrase_time_limit=6):
+    """Wake stage of the main loop. Returns (text, woke): the wake phrase transcript,
+    including a command said in the same breath ("jarvis what time is it"), and the
+    offline detector's verdict (None when full STT handled the wake phrase).
+
+    The offline detector stops at the wake word, so the rest of the phrase is
+    transcribed straight after it; a pause of wake_tail_timeout seconds means there is none.
+    """
+    woke = detect_wake_word(recognizer, source, cfg, timeout=timeout)
+    if woke is None:
+        text = recognize_speech(recognizer, source, cfg, timeout=timeout, phrase_time_limit=phrase_time_limit,
+                                endpointing=cfg.get("wake_endpointing"))
+        return text, None
+    if not woke:
+        return "", False
+    try:
+        tail = recognize_speech(recognizer, source, cfg, timeout=float(cfg.get("wake_tail_timeout", 0.6)),
+                                phrase_time_limit=int(cfg.get("stt_phrase_cmd", 10)),
+                                endpointing=cfg.get("command_endpointing"))
+    except sr.WaitTimeoutError:
+        tail = ""
+    return f"{WAKE_WORDS[0]} {tail}".strip(), True
+
+
+class _WavSource(sr.AudioSource):
+    """AudioSource over a WAV file, so recognizer.listen() and the wake/endpointing
+    evaluations can replay fixtures. The file is opened here rather than in __enter__.
+    """
+
+    def __init__(self, path: str, chunk: int = 1024):
+        import wave
+        self._wav = wave.open(path, "rb")
+        if self._wav.getnchannels() != 1:
+            raise ValueError(f"{path}: expected mono audio")
+        self.SAMPLE_RATE = self._wav.getframerate()
+        self.SAMPLE_WIDTH = self._wav.getsampwidth()
+        self.CHUNK = chunk
+        self.stream = self
+        self.seconds = self._wav.getnframes() / float(self.SAMPLE_RATE)
+
+    def read(self, size: int) -> bytes:
+        return self._wav.readframes(size)
+
+    def position(self) -> float:
+        """Seconds of audio consumed so far."""
+        return self._wav.tell() / float(self.SAMPLE_RATE)
+
+    def close(self):
+        self._wav.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def evaluate_wake_detector(paths: List[str], cfg) -> Dict[str, Any]:
+    """Replay WAV fixtures through the offline wake stage.
+
+    Files whose name contains "wake" are expected to trigger, all others not.
+    Reports false accepts/rejects and decoder CPU seconds per hour of audio.
+    """
+    recognizer = build_recognizer(cfg)
+    cfg = dict(cfg, wake_detector="vosk")
+    report = {"files": 0, "positives": 0, "negatives": 0, "false_accepts": [], "false_rejects": [], "audio_seconds": 0.0}
+    cpu = 0.0
+    for path in paths:
+        source = _WavSource(path)
+        try:
+            started = time.process_time()
+            hit = detect_wake_word(recognizer, source, cfg, timeout=0)
+            cpu += time.process_time() - started
+        finally:
+            source.close()
+        if hit is None:
+            raise RuntimeError("Offline wake detector unavailable (check vosk and vosk_model_path)")
+        expected = "wake" in os.path.basename(path).lower()
+        report["files"] += 1
+        report["audio_seconds"] += source.seconds
+        report["positives" if expected else "negatives"] += 1
+        if hit and not expected:
+            report["false_accepts"].append(path)
+        elif expected and not hit:
+            report["false_rejects"].append(path)
+    hours = report["audio_seconds"] / 3600.0
+    report["cpu_seconds_per_audio_hour"] = round(cpu / hours, 2) if hours else None
+    return report
+
+
+def build_recognizer(cfg) -> sr.Recognizer:
+    recognizer = sr.Recognizer()
+    # Tunable STT parameters
+    recognizer.energy_threshold = int(cfg.get("energy_threshold", 250))
+    recognizer.dynamic_energy_threshold = bool(cfg.get("dynamic_energy_threshold", True))
+    recognizer.pause_threshold = float(cfg.get("pause_threshold", 0.8))
+    try:
+        recognizer.non_speaking_duration = float(cfg.get("non_speaking_duration", 0.3))
+    except Exception:
+        pass
+    return recognizer
+
+
+def make_vad(recognizer: sr.Recognizer, source: sr.AudioSource, cfg, endpointing: str = None):
+    """FrameVAD for this listen if VAD endpointing is selected (and usable), else None."""
+    mode = (endpointing or cfg.get("endpointing") or "energy").lower()
+    if mode != "vad" or not audioop or not getattr(source, "stream", None):
+        return None
+    return FrameVAD.from_config(cfg, int(source.SAMPLE_RATE), recognizer.energy_threshold)
+
+
+def speech_end_seconds(path: str, frame_ms: int = 20) -> float:
+    """End of speech in a WAV fixture, found with hindsight: the last frame whose
+    RMS is at least a tenth of the loudest frame's.
+    """
+    source = _WavSource(path)
+    try:
+        data = source.read(source._wav.getnframes())
+    finally:
+        source.close()
+    if source.SAMPLE_WIDTH != 2:
+        data = audioop.lin2lin(data, source.SAMPLE_WIDTH, 2)
+    energies = FrameVAD(source.SAMPLE_RATE, frame_ms=frame_ms).frame_energies(data)
+    if not energies:
+        return 0.0
+    gate = max(energies) * 0.1
+    last = max(i for i, e in enumerate(energies) if e >= gate)
+    return (last + 1) * frame_ms / 1000.0
+
+
+def benchmark_endpointing(paths: List[str], cfg) -> Dict[str, Any]:
+    """Replay WAV fixtures through both endpointing engines and report how long
+    after the end of speech each one hands the phrase to STT (audio time, ms).
+    """
+    report: Dict[str, Any] = {"files": len(paths)}
+    for mode in ("energy", "vad"):
+        lags = []
+        for path in paths:
+            truth = speech_end_seconds(path)
+            recognizer = build_recognizer(cfg)
+            source = _WavSource(path)
+            try:
+                vad = make_vad(recognizer, source, cfg, mode)
+                try:
+                    if vad is not None:
+                        listen_vad(recognizer, source, vad, timeout=0, phrase_time_limit=0)
+                    else:
+                        recognizer.listen(source, timeout=None, phrase_time_limit=None)
+                except sr.WaitTimeoutError:
+                    continue
+                lags.append((source.position() - truth) * 1000.0)
+            finally:
+                source.close()
+        report[mode] = {
+            "phrases": len(lags),
+            "median_ms": round(percentile(lags, 50), 1) if lags else None,
+            "p95_ms": round(percentile(lags, 95), 1) if lags else None,
+        }
+    return report
+
+
+STT_POOL = None
+STT_POOL_LOCK = threading.Lock()
+
+
+def get_stt_pool(workers: int = 4) -> ThreadPoolExecutor:
+    """Shared, bounded pool for concurrent cloud STT requests."""
+    global STT_POOL
+    with STT_POOL_LOCK:
+        if STT_POOL is None:
+            STT_POOL = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="stt")
+        return STT_POOL
+
+
+def _google_candidate(recognizer: sr.Recognizer, audio: sr.AudioData, lang: str):
+    """(transcript, confidence) for one language, or None if Google understood nothing."""
+    raw = recognizer.recognize_google(audio, language=lang, show_all=True)
+    alternatives = raw.get("alternative") if isinstance(raw, dict) else None
+    if not alternatives:
+        return None
+    top = alternatives[0]
+    text = (top.get("transcript") or "").strip()
+    if not text:
+        return None
+    # Google sometimes omits confidence; treat that as a middling score
+    return text, float(top.get("confidence", 0.5) or 0.5)
+
+
+def recognize_google_languages(recognizer: sr.Recognizer, audio: sr.AudioData, languages: List[str],
+                               primary: str, cfg) -> str:
+    """Send one utterance to Google in several languages concurrently and keep the
+    most confident transcript. The primary language wins outright once it reaches
+    stt_primary_accept_confidence and gets stt_primary_bonus in the comparison.
+    Requests still pending when a winner is clear (or at the deadline) are dropped.
+    """
+    deadline_s = float(cfg.get("stt_language_deadline", 4.0))
+    bonus = float(cfg.get("stt_primary_bonus", 0.1))
+    accept = float(cfg.get("stt_primary_accept_confidence", 0.75))
+    # Per-request socket timeout without touching the shared recognizer
+    rec = copy.copy(recognizer)
+    rec.operation_timeout = deadline_s
+    pool = get_stt_pool(cfg.get("stt_language_workers", 4))
+    futures = {pool.submit(_google_candidate, rec, audio, lang): lang for lang in languages}
+    pending = set(futures)
+    best = None  # (score, text)
+    deadline = time.monotonic() + deadline_s
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait_futures(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                lang = futures[fut]
+                try:
+                    candidate = fut.result()
+                except Exception:
+                    candidate = None  # RequestError etc. only rules out this language
+                if not candidate:
+                    continue
+                text, confidence = candidate
+                if lang == primary and confidence >= accept:
+                    return text.lower().strip()
+                score = confidence + (bonus if lang == primary else 0.0)
+                if best is None or score > best[0]:
+                    best = (score, text)
+            # Nothing left can beat the current best: stop waiting
+            if best and pending:
+                ceiling = max(1.0 + (bonus if futures[f] == primary else 0.0) for f in pending)
+                if best[0] >= ceiling:
+                    break
+    finally:
+        for fut in pending:
+            fut.cancel()
+    return best[1].lower().strip() if best else ""
+
+
+# Hybrid STT bookkeeping: outcome of the last recognize_speech call, the smoothed
+# cloud latency (for the latency-saved estimate) and when to retry the cloud after a failure
+LAST_STT: Dict[str, Any] = {}
+HYBRID_STATE = {"cloud_ms": None, "cloud_retry_at": 0.0}
+_KNOWN_PHRASES = {"custom_cmds": None, "phrases": frozenset()}
 
 
-def speak_full_ai_answer(engine: pyttsx3.Engine, cfg: dict, answer: str):
-    if not answer:
-        speak(engine, "I don't have an answer to read yet")
-        return
-    chunk = int(cfg.get("ai_tts_max_chars", 500))
-    chunk = max(200, min(chunk, 1200))
-    for i in range(0, len(answer), chunk):
-        speak(engine, answer[i:i+chunk])
+def known_command_phrases(custom_cmds: dict) -> frozenset:
+    """Phrases a local transcript can be trusted on verbatim: custom commands,
+    exact built-in commands, open/close of whitelisted apps and sites, wake words.
+    """
+    # Holding the dict itself (not its id) so a reloaded one is never mistaken for it
+    if _KNOWN_PHRASES["custom_cmds"] is not custom_cmds:
+        phrases = set(custom_cmds or ()) | set(INTENT_GRAMMAR.exact) | set(WAKE_WORDS)
+        for app in WHITELISTED_APPS:
+            phrases.update((f"open {app}", f"close {app}"))
+        for site in WHITELISTED_SITES:
+            phrases.update((f"open {site}", f"go to {site}"))
+        _KNOWN_PHRASES.update(custom_cmds=custom_cmds, phrases=frozenset(phrases))
+    return _KNOWN_PHRASES["phrases"]
+
+
+def _timed_google(recognizer: sr.Recognizer, audio: sr.AudioData, lang: str):
+    started = time.perf_counter()
+    try:
+        text = recognizer.recognize_google(audio, language=lang).lower().strip()
+    except sr.UnknownValueError:
+        text = ""
+    return text, (time.perf_counter() - started) * 1000.0
 
 
-def ai_or_search(engine: pyttsx3.Engine, cfg: dict, ai_model, query: str, logger: logging.Logger) -> bool:
-    """Try AI answer; if unavailable/empty, open Google search instead. Returns True if handled."""
-    if not query:
-        return False
-    ans = ai_answer(ai_model, query)
-    if ans:
-        speak_ai_answer(engine, cfg, ans, logger)
-        # Optionally also open related web results even when AI answered
-        try:
-            if cfg.get("also_open_web_on_ai_answer", True):
-                url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
-                webbrowser.open(url)
-        except Exception:
-            pass
-        return True
-    # Fallback: open web search
+def _note_cloud_latency(fut: Future):
+    """Fold a finished cloud request into the smoothed latency (done callback)."""
     try:
-        # honor config to disable web fallback
-        if not cfg.get("web_fallback_on_ai_failure", True):
-            speak(engine, "I don't have that answer right now.")
-            return True
-        url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
-        webbrowser.open(url)
-        speak(engine, f"Searching Google for {query}")
-        return True
+        _, ms = fut.result()
     except Exception:
-        return False
+        return
+    prev = HYBRID_STATE["cloud_ms"]
+    HYBRID_STATE["cloud_ms"] = ms if prev is None else prev * 0.8 + ms * 0.2
 
 
-def ai_route_intent(ai_model, text: str, logger: logging.Logger):
-    """Use AI to classify a natural language command into one of our safe intents.
-    Returns (intent, arg) or (None, None) if not confident.
+def recognize_hybrid(recognizer: sr.Recognizer, source: sr.AudioSource, cfg, timeout=5, phrase_time_limit=6,
+                     endpointing: str = None) -> str:
+    """Decode with Vosk while listening and send the same phrase to Google.
+
+    A local transcript that exactly matches a known command is returned at once;
+    otherwise Google gets stt_hybrid_deadline seconds, after which (or if the
+    network fails) the local transcript is used. After a network error the cloud
+    is skipped for stt_offline_retry_seconds.
     """
-    if not ai_model or not text:
-        return (None, None)
+    model_path = cfg.get("vosk_model_path")
+    if not (model_path and os.path.isdir(model_path) and Model and KaldiRecognizer
+            and audioop and getattr(source, "stream", None)):
+        return recognize_speech(recognizer, source, dict(cfg, stt_backend="google"), timeout, phrase_time_limit, endpointing)
+    vad = make_vad(recognizer, source, cfg, endpointing)
+    language = cfg.get("language", "en-US")
+    rate = int(source.SAMPLE_RATE)
+    rec = acquire_vosk_recognizer(model_path, rate)
+    if rec is None:
+        return ""
+    chunks = []
+    cloud = None
     try:
-        system_prompt = (
-            "You are a command router. Map the user's sentence to one of these intents: "
-            "open_app, open_site, open_browser, search_web, search_youtube, time, date, greet, exit, "
-            "volume, brightness, media, remind_in, remind_at, calc, convert, date_of_week, read_full_answer. "
-            "Only choose intents that are obviously implied. If unsure, return intent 'none'.\n\n"
-            "Return STRICT JSON with keys: intent, args. Where args depends on intent: \n"
-            "- open_app: {target} (e.g., 'notepad', 'calculator', 'paint', 'vscode', 'explorer')\n"
-            "- open_site: {target} (e.g., 'google', 'youtube', 'github', 'gmail')\n"
-            "- open_browser: {}\n"
-            "- search_web: {query}\n"
-            "- search_youtube: {query}\n"
-            "- time/date/greet/exit/read_full_answer: {}\n"
-            "- volume: {direction} where direction in ['up','down','mute']\n"
-            "- brightness: {direction} where direction in ['up','down']\n"
-            "- media: {action} where action in ['play_pause','next','previous']\n"
-            "- remind_in: {amount, unit, message} with unit in ['seconds','minutes','hours']\n"
-            "- remind_at: {hour, minute, message} 24h integers\n"
-            "- calc: {expr} using only digits +-*/().\n"
-            "- convert: {value, src, dst} like 10, 'cm', 'inch'\n"
-            "- date_of_week: {date} in YYYY-MM-DD.\n"
-            "Respond with ONLY the JSON, no extra text."
-        )
-
-        prompt = f"User: {text}"
-        resp = ai_model.generate_content([
-            {"role": "user", "parts": [system_prompt + "\n" + prompt]}
-        ])
-        raw = getattr(resp, "text", "") or ""
-        raw = raw.strip()
-        # Some SDK versions may wrap in code fences; strip them
-        if raw.startswith("```)" ):
-            pass
-        if raw.startswith("```json") and raw.endswith("```"):
-            raw = raw[len("```json"): -3].strip()
-        elif raw.startswith("```") and raw.endswith("```"):
-            raw = raw[3:-3].strip()
-        data = json.loads(raw)
-        intent = (data.get("intent") or "").strip()
-        if not intent or intent.lower() == "none":
-            return (None, None)
-        args = data.get("args")
-
-        # Normalize to our executor's expectations
-        if intent in ("open_app", "open_site"):
-            target = (args.get("target") if isinstance(args, dict) else None) or None
-            return (intent, (target or "").lower())
-        if intent == "open_browser":
-            return (intent, None)
-        if intent in ("search_web", "search_youtube"):
-            query = (args.get("query") if isinstance(args, dict) else None) or ""
-            return (intent, query)
-        if intent in ("time", "date", "greet", "exit", "read_full_answer"):
-            return (intent, None)
-        if intent == "volume":
-            direction = (args.get("direction") if isinstance(args, dict) else None) or ""
-            if direction not in ("up", "down", "mute"):
-                return (None, None)
-            return (intent, direction)
-        if intent == "brightness":
-            direction = (args.get("direction") if isinstance(args, dict) else None) or ""
-            if direction not in ("up", "down"):
-                return (None, None)
-            return (intent, direction)
-        if intent == "media":
-            action = (args.get("action") if isinstance(args, dict) else None) or ""
-            if action not in ("play_pause", "next", "previous"):
-                return (None, None)
-            return (intent, action)
-        if intent == "remind_in":
-            if isinstance(args, dict):
-                amount = int(args.get("amount", 0))
-                unit = str(args.get("unit", "")).lower()
-                message = str(args.get("message", ""))
-                if amount > 0 and unit in ("second", "seconds", "minute", "minutes", "hour", "hours") and message:
-                    return (intent, (amount, unit, message))
-        if intent == "remind_at":
-            if isinstance(args, dict):
-                hour = int(args.get("hour", -1))
-                minute = int(args.get("minute", -1))
-                message = str(args.get("message", ""))
-                if 0 <= hour <= 23 and 0 <= minute <= 59 and message:
-                    return (intent, (hour, minute, message))
-        if intent == "calc":
-            expr = (args.get("expr") if isinstance(args, dict) else None) or ""
-            if re.fullmatch(r"[0-9\s\+\-\*\/\(\)\.]+", expr or ""):
-                return (intent, expr)
-        if intent == "convert":
-            if isinstance(args, dict):
-                try:
-                    value = float(args.get("value"))
-                except Exception:
-                    value = None
-                src = str(args.get("src", "")).lower()
-                dst = str(args.get("dst", "")).lower()
-                if value is not None and src and dst:
-                    return (intent, (value, src, dst))
-        if intent == "date_of_week":
-            date_str = (args.get("date") if isinstance(args, dict) else None) or ""
-            try:
-                datetime.strptime(date_str, "%Y-%m-%d")
-                return (intent, date_str)
-            except Exception:
-                return (None, None)
+        for buf in iter_utterance(recognizer, source, timeout, phrase_time_limit, vad=vad):
+            rec.AcceptWaveform(bytes(buf))
+            chunks.append(buf)
+        # End of phrase: ship it to the cloud first, then finish the local decode
+        ended = time.perf_counter()
+        if time.monotonic() >= HYBRID_STATE["cloud_retry_at"]:
+            audio = sr.AudioData(b"".join(chunks), rate, 2)
+            cloud = get_stt_pool(cfg.get("stt_language_workers", 4)).submit(_timed_google, recognizer, audio, language)
+            cloud.add_done_callback(_note_cloud_latency)
+        local = (json.loads(rec.FinalResult()).get("text") or "").strip()
+        local_ms = (time.perf_counter() - ended) * 1000.0
+    finally:
+        release_vosk_recognizer(model_path, rate, rec)
+
+    LAST_STT.update(backend="hybrid", local_ms=round(local_ms, 1))
+    if cloud is None:
+        LAST_STT.update(winner="local_offline")
+        return local
+    if local and local in known_command_phrases(RUNTIME.custom_cmds):
+        estimate = HYBRID_STATE["cloud_ms"]
+        LAST_STT.update(winner="local", saved_ms=round(max(0.0, estimate - local_ms), 1) if estimate is not None else None)
+        return local
+    try:
+        text, cloud_ms = cloud.result(timeout=float(cfg.get("stt_hybrid_deadline", 2.5)))
+    except sr.RequestError:
+        # Offline: don't wait on the network again for a while
+        HYBRID_STATE["cloud_retry_at"] = time.monotonic() + float(cfg.get("stt_offline_retry_seconds", 30))
+        LAST_STT.update(winner="local_offline")
+        return local
     except Exception:
-        logger.info("AI routing failed or returned invalid JSON")
-        return (None, None)
+        LAST_STT.update(winner="local_deadline")
+        return local
+    LAST_STT.update(winner="cloud", cloud_ms=round(cloud_ms, 1))
+    return text or local
 
-def recognize_speech(recognizer: sr.Recognizer, source: sr.AudioSource, cfg, timeout=5, phrase_time_limit=6) -> str:
+
+def recognize_speech(recognizer: sr.Recognizer, source: sr.AudioSource, cfg, timeout=5, phrase_time_limit=6,
+                     endpointing: str = None) -> str:
+    """Listen for one phrase and transcribe it. endpointing ("energy" or "vad")
+    overrides the config's endpointing engine for this call.
+    """
     backend = (cfg.get("stt_backend") or "google").lower()
     language = cfg.get("language", "en-US")
     languages = cfg.get("languages") or []
-    audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+    LAST_STT.clear()
+    LAST_STT["backend"] = backend
+    if backend == "hybrid":
+        return recognize_hybrid(recognizer, source, cfg, timeout, phrase_time_limit, endpointing)
+    vad = make_vad(recognizer, source, cfg, endpointing)
+    if backend == "vosk" and Model and KaldiRecognizer:
+        model_path = cfg.get("vosk_model_path")
+        if not model_path or not os.path.isdir(model_path):
+            return ""
+        if bool(cfg.get("vosk_streaming", True)) and audioop and getattr(source, "stream", None):
+            rate = int(source.SAMPLE_RATE)
+            rec = acquire_vosk_recognizer(model_path, rate)
+            if rec is None:
+                return ""
+            try:
+                return listen_vosk_streaming(recognizer, source, rec, timeout=timeout, phrase_time_limit=phrase_time_limit, vad=vad)
+            finally:
+                release_vosk_recognizer(model_path, rate, rec)
+    if vad is not None:
+        audio = listen_vad(recognizer, source, vad, timeout=timeout, phrase_time_limit=phrase_time_limit)
+    else:
+        audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
     try:
         if backend == "vosk" and Model and KaldiRecognizer:
             model_path = cfg.get("vosk_model_path")
-            if not model_path or not os.path.isdir(model_path):
+            data = audio.get_raw_data(convert_rate=16000, convert_width=2)
+            # Use a pooled recognizer on the cached model
+            rec = acquire_vosk_recognizer(model_path, 16000)
+            if rec is None:
                 return ""
-            data = audio.get_wav_data(convert_rate=16000, convert_width=2)
-            # Use Vosk recognizer
-            model = Model(model_path)
-            rec = KaldiRecognizer(model, 16000)
-            rec.AcceptWaveform(data)
-            result = json.loads(rec.Result())
+            try:
+                rec.AcceptWaveform(data)
+                result = json.loads(rec.FinalResult())
+            finally:
+                release_vosk_recognizer(model_path, 16000, rec)
             text = (result.get("text") or "").strip()
             return text
         else:
             # Google online recognizer with optional multi-language attempts
             # Try configured list first, then fall back to single language
             # By default, only try the primary language to avoid mis-detection.
-            # If you explicitly enable try_all_languages in config, iterate the list.
+            # If you explicitly enable try_all_languages in config, all languages are sent at once.
             if bool(cfg.get("try_all_languages", False)):
                 langs_to_try = [lang_code for lang_code in languages if isinstance(lang_code, str) and lang_code] or [language]
             else:
                 langs_to_try = [language]
+            if len(langs_to_try) > 1:
+                return recognize_google_languages(recognizer, audio, langs_to_try, language, cfg)
             for lang in langs_to_try:
                 try:
                     text = recognizer.recognize_google(audio, language=lang)
@@ -503,6 +2967,261 @@ def contains_wake_word(text: str) -> bool:
     return any(w in text for w in WAKE_WORDS)
 
 
+def _intent_open(c, command, m):
+    target = c.replace("open ", "", 1).strip()
+    # prefer opening in browser if user asks explicitly (e.g., "open whatsapp in browser" or "open whatsapp web")
+    if any(x in target for x in (" in browser", " on browser", " web")):
+        site_hint = target
+        for mark in (" in browser", " on browser", " web"):
+            site_hint = site_hint.replace(mark, "")
+        site_hint = site_hint.strip()
+        # direct site key match first
+        if site_hint in WHITELISTED_SITES:
+            return ("open_site", site_hint)
+        # special-case popular sites
+        if site_hint in ("whatsapp", "whatsapp web"):
+            return ("open_site", "whatsapp")
+    if target in WHITELISTED_APPS:
+        return ("open_app", target)
+    if target in WHITELISTED_SITES:
+        return ("open_site", target)
+    # try patterns like open chrome/youtube/google
+    if target in ("chrome", "browser"):
+        return ("open_browser", None)
+    # open any url or domain safely
+    if target.startswith("http://") or target.startswith("https://"):
+        return ("open_url", target)
+    # simple domain match like example.com or sub.example.org
+    if DOMAIN_RE.fullmatch(target):
+        return ("open_url", f"https://{target}")
+    return ("unknown_open", target)
+
+
+def _intent_close(c, command, m):
+    # normalize target after the verb
+    target = c[6:].strip()
+    # strip determiners like "the", "my"
+    target = re.sub(r"^(the|my)\s+", "", target)
+    # map common synonyms to browser close
+    if target in ("browser", "chrome", "google", "edge", "firefox", "brave", "opera"):
+        return ("close_browser", None)
+    if target in WHITELISTED_APPS:
+        return ("close_app", target)
+    return ("unknown_close", target)
+
+
+def _intent_go_to(c, command, m):
+    target = c.split(" ", 2)[-1].strip()
+    if target in WHITELISTED_SITES:
+        return ("open_site", target)
+    # allow plain domains/urls
+    if target.startswith("http://") or target.startswith("https://"):
+        return ("open_url", target)
+    if DOMAIN_RE.fullmatch(target):
+        return ("open_url", f"https://{target}")
+    return ("unknown_site", target)
+
+
+def _intent_type(c, command, m):
+    text = command[5:].strip()  # preserve original casing after 'type '
+    if text:
+        return ("type_text", text)
+    return None
+
+
+KEY_SYNONYMS = {
+    "enter": "enter", "return": "enter",
+    "escape": "esc", "esc": "esc",
+    "control": "ctrl", "ctrl": "ctrl",
+    "alternate": "alt", "alt": "alt",
+    "tab": "tab", "space": "space",
+    "delete": "delete", "backspace": "backspace",
+}
+
+
+def _intent_press(c, command, m):
+    key = c[6:].strip()
+    parts = [KEY_SYNONYMS.get(p.strip(), p.strip()) for p in re.split(r"[+\-]", key) if p.strip()]
+    if parts:
+        return ("press_key", parts)
+    return None
+
+
+def _intent_message(c, command, m):
+    name = m.group(3).strip()
+    text = m.group(4).strip()
+    if name and text:
+        return ("message", (name, text))
+    return None
+
+
+def _intent_alarm(c, command, m):
+    hh = int(m.group(4))
+    mm = int(m.group(6) or 0)
+    ap = (m.group(7) or "").lower()
+    if ap == "pm" and hh < 12:
+        hh += 12
+    if ap == "am" and hh == 12:
+        hh = 0
+    return ("remind_at", (hh, mm, "Alarm"))
+
+
+DOMAIN_RE = re.compile(r"[a-z0-9.-]+\.[a-z]{2,}(\/.*)?")
+
+# Declarative intent grammar, highest priority first. Each rule is
+# (kind, patterns, result) where kind is:
+#   exact    - c equals one of the phrases
+#   prefix   - c starts with one of the prefixes
+#   contains - one of the substrings appears anywhere in c
+#   regex    - re.match of the pattern against c
+# result is a fixed (intent, arg) or a callable (c, command, match) that
+# returns one, or None to fall through to the next matching rule.
+# The broad "contains" rules for time/date sit early and shadow later rules
+# (e.g. "what day is 2025-10-01" never reaches date_of_week); kept as-is so
+# results match the original if-chain.
+INTENT_RULES = [
+    ("exact", ("open",), ("prompt_open", None)),
+    ("prefix", ("open ",), _intent_open),
+    ("exact", ("close browser", "close the browser"), ("close_browser", None)),
+    ("prefix", ("close ",), _intent_close),
+    ("prefix", ("go to ", "goto "), _intent_go_to),
+    ("prefix", ("search ", "google "), lambda c, command, m: ("search_web", c.split(" ", 1)[1].strip())),
+    ("prefix", ("youtube ", "search youtube "), lambda c, command, m: ("search_youtube", c.split(" ", 1)[1].strip())),
+    ("prefix", ("type ",), _intent_type),
+    ("prefix", ("press ",), _intent_press),
+    ("exact", ("scroll up", "scroll down", "scroll top", "scroll bottom"), lambda c, command, m: ("scroll", c.split(" ", 1)[1])),
+    ("exact", ("screenshot", "take screenshot", "capture screen"), ("screenshot", None)),
+    ("contains", ("time",), ("time", None)),
+    ("contains", ("date", "day"), ("date", None)),
+    ("exact", ("volume up", "increase volume"), ("volume", "up")),
+    ("exact", ("volume down", "decrease volume"), ("volume", "down")),
+    ("exact", ("mute", "unmute", "toggle mute"), ("volume", "mute")),
+    ("exact", ("brightness up", "increase brightness"), ("brightness", "up")),
+    ("exact", ("brightness down", "decrease brightness"), ("brightness", "down")),
+    ("exact", ("play", "pause", "play pause", "resume"), ("media", "play_pause")),
+    ("exact", ("next", "next track", "next song"), ("media", "next")),
+    ("exact", ("previous", "previous track", "previous song"), ("media", "previous")),
+    ("regex", r"remind me in (\d+) (second|seconds|minute|minutes|hour|hours) to (.+)",
+     lambda c, command, m: ("remind_in", (int(m.group(1)), m.group(2), m.group(3)))),
+    ("regex", r"remind me at (\d{1,2}):(\d{2}) to (.+)",
+     lambda c, command, m: ("remind_at", (int(m.group(1)), int(m.group(2)), m.group(3)))),
+    ("exact", ("hello", "hi", "hey"), ("greet", None)),
+    ("exact", ("stop", "exit", "quit", "bye"), ("exit", None)),
+    ("prefix", ("calculate ",), lambda c, command, m: ("calc", c.replace("calculate ", "", 1).strip())),
+    ("regex", r"(what is |what's )?([0-9\s\+\-\*\/\(\)\.]+)$", lambda c, command, m: ("calc", m.group(2).strip())),
+    ("regex", r"convert\s+([\d\.]+)\s*([a-z]+)\s+to\s+([a-z]+)",
+     lambda c, command, m: ("convert", (float(m.group(1)), m.group(2), m.group(3)))),
+    ("regex", r"what (day|day of week) is (\d{4}-\d{2}-\d{2})", lambda c, command, m: ("date_of_week", m.group(2))),
+    ("exact", ("read full answer", "read the answer", "read again", "repeat answer", "repeat the answer"), ("read_full_answer", None)),
+    ("exact", ("list reminders", "show reminders", "my reminders", "what are my reminders"), ("list_reminders", None)),
+    ("exact", ("cancel all reminders", "clear reminders", "clear all reminders"), ("cancel_reminders", None)),
+    ("regex", r"cancel (?:the |my )?reminder (?:to |about )?(.+)$", lambda c, command, m: ("cancel_reminder", m.group(1).strip())),
+    ("regex", r"snooze(?: for (\d+) (second|seconds|minute|minutes|hour|hours))?$",
+     lambda c, command, m: ("snooze", (int(m.group(1)), m.group(2)) if m.group(1) else (5, "minutes"))),
+    ("exact", ("engage stealth mode", "stealth mode", "enter stealth mode"), ("protocol_stealth", None)),
+    ("exact", ("house party protocol", "initiate house party", "start house party"), ("protocol_house_party", None)),
+    ("exact", ("clean slate protocol", "initiate clean slate", "clean slate"), ("protocol_clean_slate", None)),
+    ("regex", r"(send\s+)?message\s+(to\s+)?([a-z\s]+?)[,:]?\s+(.*)$", _intent_message),
+    ("regex", r"(send\s+)?(a\s+)?message\s+to\s+([a-z\s]+)$", lambda c, command, m: ("message", (m.group(3).strip(), ""))),
+    ("regex", r"(send\s+)?email\s+(to\s+)?([a-z\s]+?)(?:\s+about|\s+regarding|\s+subject)?[,:]?\s*(.*)$",
+     lambda c, command, m: ("email", (m.group(3).strip(), (m.group(4) or "").strip()))),
+    ("regex", r"(call|dial)\s+([a-z\s]+)$", lambda c, command, m: ("call", m.group(2).strip())),
+    ("regex", r"(what'?s\s+the\s+)?(weather|temperature)(\s+in\s+(.+))?", lambda c, command, m: ("weather", (m.group(4) or "").strip())),
+    ("regex", r"(who is|what is|tell me about)\s+(.+)$", lambda c, command, m: ("wiki", m.group(2).strip())),
+    ("regex", r"(set\s+)?(a\s+)?timer\s+for\s+(\d+)\s+(second|seconds|minute|minutes|hour|hours)",
+     lambda c, command, m: ("remind_in", (int(m.group(3)), m.group(4), "Timer finished"))),
+    ("regex", r"(set\s+)?(an\s+)?alarm\s+(for|at)\s+(\d{1,2})(:(\d{2}))?\s*(am|pm)?", _intent_alarm),
+    ("regex", r"translate\s+(.+?)\s+to\s+([a-zA-Z\-]+)$", lambda c, command, m: ("translate", (m.group(1).strip(), m.group(2).strip()))),
+    ("regex", r"(news|headlines)(\s+about\s+(.+))?$", lambda c, command, m: ("news", (m.group(3) or "").strip())),
+]
+
+
+class IntentGrammar:
+    """INTENT_RULES compiled once into an exact-phrase table, a prefix trie,
+    a substring list and one combined alternation regex.
+
+    match() gathers every rule that could apply to a command from those
+    indexes and runs them in declaration order, so results are identical to
+    checking the rules one by one.
+    """
+
+    def __init__(self, rules):
+        self.rules = []
+        self.exact: Dict[str, int] = {}
+        self.trie: Dict[str, Any] = {}
+        self.contains: List[tuple] = []
+        self.regexes: List[tuple] = []
+        self.regex_by_idx: Dict[int, Any] = {}
+        alternatives = []
+        for idx, (kind, patterns, result) in enumerate(rules):
+            self.rules.append(result)
+            if kind == "exact":
+                for phrase in patterns:
+                    self.exact.setdefault(phrase, idx)
+            elif kind == "prefix":
+                for prefix in patterns:
+                    node = self.trie
+                    for ch in prefix:
+                        node = node.setdefault(ch, {})
+                    node.setdefault(None, []).append(idx)
+            elif kind == "contains":
+                self.contains.append((idx, patterns))
+            elif kind == "regex":
+                self.regexes.append((idx, re.compile(patterns)))
+                self.regex_by_idx[idx] = self.regexes[-1][1]
+                alternatives.append(f"(?P<r{idx}>{patterns})")
+            else:
+                raise ValueError(f"Unknown intent rule kind: {kind}")
+        self.combined = re.compile("|".join(alternatives))
+
+    def candidates(self, c: str):
+        found = []
+        idx = self.exact.get(c)
+        if idx is not None:
+            found.append(idx)
+        node = self.trie
+        for ch in c:
+            node = node.get(ch)
+            if node is None:
+                break
+            found.extend(node.get(None, ()))
+        for idx, needles in self.contains:
+            if any(n in c for n in needles):
+                found.append(idx)
+        return found
+
+    def match(self, c: str, command: str):
+        pending = self.candidates(c)
+        m = self.combined.match(c)
+        regex_idx = int(m.lastgroup[1:]) if m else None
+        if regex_idx is not None:
+            pending.append(regex_idx)
+        heapq.heapify(pending)
+        while pending:
+            idx = heapq.heappop(pending)
+            result = self.rules[idx]
+            if not callable(result):
+                return result
+            rm = None
+            if idx == regex_idx:
+                rm = self.regex_by_idx[idx].match(c)
+            out = result(c, command, rm)
+            if out is not None:
+                return out
+            if idx == regex_idx:
+                # The winning regex fell through; find the next regex rule that matches
+                regex_idx = None
+                for later_idx, pattern in self.regexes:
+                    if later_idx > idx and pattern.match(c):
+                        regex_idx = later_idx
+                        heapq.heappush(pending, later_idx)
+                        break
+        return ("unknown", c)
+
+
+INTENT_GRAMMAR = IntentGrammar(INTENT_RULES)
+
+
 def parse_intent(command: str, custom_cmds: dict):
     c = command.lower().strip()
 
@@ -511,300 +3230,319 @@ def parse_intent(command: str, custom_cmds: dict):
         act = custom_cmds[c]
         return (act.get("action"), act.get("target"))
 
-    # open application
-    if c == "open":
-        return ("prompt_open", None)
-    if c.startswith("open "):
-        target = c.replace("open ", "", 1).strip()
-        # prefer opening in browser if user asks explicitly (e.g., "open whatsapp in browser" or "open whatsapp web")
-        if any(x in target for x in (" in browser", " on browser", " web")):
-            site_hint = target
-            for mark in (" in browser", " on browser", " web"):
-                site_hint = site_hint.replace(mark, "")
-            site_hint = site_hint.strip()
-            # direct site key match first
-            if site_hint in WHITELISTED_SITES:
-                return ("open_site", site_hint)
-            # special-case popular sites
-            if site_hint in ("whatsapp", "whatsapp web"):
-                return ("open_site", "whatsapp")
-        if target in WHITELISTED_APPS:
-            return ("open_app", target)
-        if target in WHITELISTED_SITES:
-            return ("open_site", target)
-        # try patterns like open chrome/youtube/google
-        if target in ("chrome", "browser"):
-            return ("open_browser", None)
-        # open any url or domain safely
-        if target.startswith("http://") or target.startswith("https://"):
-            return ("open_url", target)
-        # simple domain match like example.com or sub.example.org
-        if re.fullmatch(r"[a-z0-9.-]+\.[a-z]{2,}(\/.*)?", target):
-            return ("open_url", f"https://{target}")
-        return ("unknown_open", target)
-
-    # close application/browser
-    if c in ("close browser", "close the browser"):
-        return ("close_browser", None)
-    if c.startswith("close "):
-        # normalize target after the verb
-        target = c[6:].strip()
-        # strip determiners like "the", "my"
-        target = re.sub(r"^(the|my)\s+", "", target)
-        # map common synonyms to browser close
-        if target in ("browser", "chrome", "google", "edge", "firefox", "brave", "opera"):
-            return ("close_browser", None)
-        if target in WHITELISTED_APPS:
-            return ("close_app", target)
-        return ("unknown_close", target)
-
-    # website shortcuts
-    if c.startswith("go to ") or c.startswith("goto "):
-        target = c.split(" ", 2)[-1].strip()
-        if target in WHITELISTED_SITES:
-            return ("open_site", target)
-        # allow plain domains/urls
-        if target.startswith("http://") or target.startswith("https://"):
-            return ("open_url", target)
-        if re.fullmatch(r"[a-z0-9.-]+\.[a-z]{2,}(\/.*)?", target):
-            return ("open_url", f"https://{target}")
-        return ("unknown_site", target)
-
-    # search web
-    if c.startswith("search ") or c.startswith("google "):
-        query = c.split(" ", 1)[1].strip()
-        return ("search_web", query)
-
-    if c.startswith("youtube ") or c.startswith("search youtube "):
-        q = c.split(" ", 1)[1].strip() if " " in c else ""
-        return ("search_youtube", q)
-
-    # input control: type text
-    if c.startswith("type "):
-        text = command[5:].strip()  # preserve original casing after 'type '
-        if text:
-            return ("type_text", text)
-
-    # input control: press key or combo
-    if c.startswith("press "):
-        key = c[6:].strip()
-        # normalize common names
-        synonyms = {
-            "enter": "enter", "return": "enter",
-            "escape": "esc", "esc": "esc",
-            "control": "ctrl", "ctrl": "ctrl",
-            "alternate": "alt", "alt": "alt",
-            "tab": "tab", "space": "space",
-            "delete": "delete", "backspace": "backspace",
-        }
-        parts = [synonyms.get(p.strip(), p.strip()) for p in re.split(r"[+\-]", key) if p.strip()]
-        if parts:
-            return ("press_key", parts)
-
-    # input control: scroll
-    if c in ("scroll up", "scroll down", "scroll top", "scroll bottom"):
-        direction = c.split(" ", 1)[1]
-        return ("scroll", direction)
-
-    # screenshot
-    if c in ("screenshot", "take screenshot", "capture screen"):
-        return ("screenshot", None)
-
-    # time/date
-    if "time" in c:
-        return ("time", None)
-    if "date" in c or "day" in c:
-        return ("date", None)
-
-    # volume
-    if c in ("volume up", "increase volume"):
-        return ("volume", "up")
-    if c in ("volume down", "decrease volume"):
-        return ("volume", "down")
-    if c in ("mute", "unmute", "toggle mute"):
-        return ("volume", "mute")
-
-    # brightness
-    if c in ("brightness up", "increase brightness"):
-        return ("brightness", "up")
-    if c in ("brightness down", "decrease brightness"):
-        return ("brightness", "down")
-
-    # media
-    if c in ("play", "pause", "play pause", "resume"):
-        return ("media", "play_pause")
-    if c in ("next", "next track", "next song"):
-        return ("media", "next")
-    if c in ("previous", "previous track", "previous song"):
-        return ("media", "previous")
-
-    # reminders: "remind me in 10 minutes to stretch" or "remind me at 7:30 to ..."
-    m = re.match(r"remind me in (\d+) (second|seconds|minute|minutes|hour|hours) to (.+)", c)
-    if m:
-        amount = int(m.group(1))
-        unit = m.group(2)
-        msg = m.group(3)
-        return ("remind_in", (amount, unit, msg))
-    m2 = re.match(r"remind me at (\d{1,2}):(\d{2}) to (.+)", c)
-    if m2:
-        hh = int(m2.group(1))
-        mm = int(m2.group(2))
-        msg = m2.group(3)
-        return ("remind_at", (hh, mm, msg))
-
-    # small talk
-    if c in ("hello", "hi", "hey"):
-        return ("greet", None)
-
-    if c in ("stop", "exit", "quit", "bye"):
-        return ("exit", None)
-
-    # calculator: "calculate ..." or direct math "what is 2+2" / "2 + 2"
-    if c.startswith("calculate "):
-        expr = c.replace("calculate ", "", 1).strip()
-        return ("calc", expr)
-    mcalc = re.match(r"(what is |what's )?([0-9\s\+\-\*\/\(\)\.]+)$", c)
-    if mcalc:
-        expr = mcalc.group(2).strip()
-        return ("calc", expr)
-
-    # unit conversions: temperature, length, weight
-    # examples: "convert 100 c to f", "convert 10 inches to cm", "convert 5 kg to lb"
-    mconv = re.match(r"convert\s+([\d\.]+)\s*([a-z]+)\s+to\s+([a-z]+)", c)
-    if mconv:
-        val = float(mconv.group(1))
-        src = mconv.group(2)
-        dst = mconv.group(3)
-        return ("convert", (val, src, dst))
-
-    # date query: "what day is 2025-10-01"
-    mdate = re.match(r"what (day|day of week) is (\d{4}-\d{2}-\d{2})", c)
-    if mdate:
-        return ("date_of_week", mdate.group(2))
-
-    # read full last AI answer
-    if c in ("read full answer", "read the answer", "read again", "repeat answer", "repeat the answer"):
-        return ("read_full_answer", None)
-
-    # persona protocols
-    if c in ("engage stealth mode", "stealth mode", "enter stealth mode"):
-        return ("protocol_stealth", None)
-    if c in ("house party protocol", "initiate house party", "start house party"):
-        return ("protocol_house_party", None)
-    if c in ("clean slate protocol", "initiate clean slate", "clean slate"):
-        return ("protocol_clean_slate", None)
-
-    # communications: message/email/call
-    # e.g., "message john i'm late", "send message to alice: meeting at 5"
-    m_msg = re.match(r"(send\s+)?message\s+(to\s+)?([a-z\s]+?)[,:]?\s+(.*)$", c)
-    if m_msg:
-        name = m_msg.group(3).strip()
-        text = m_msg.group(4).strip()
-        if name and text:
-            return ("message", (name, text))
-
-    m_msg2 = re.match(r"(send\s+)?(a\s+)?message\s+to\s+([a-z\s]+)$", c)
-    if m_msg2:
-        name = m_msg2.group(3).strip()
-        return ("message", (name, ""))
-
-    # email commands
-    m_mail = re.match(r"(send\s+)?email\s+(to\s+)?([a-z\s]+?)(?:\s+about|\s+regarding|\s+subject)?[,:]?\s*(.*)$", c)
-    if m_mail:
-        name = m_mail.group(3).strip()
-        rest = (m_mail.group(4) or "").strip()
-        return ("email", (name, rest))
-
-    # call/dial commands
-    m_call = re.match(r"(call|dial)\s+([a-z\s]+)$", c)
-    if m_call:
-        name = m_call.group(2).strip()
-        return ("call", name)
-
-    # weather: "weather", "weather in chennai", "what's the weather in mumbai"
-    m_weather = re.match(r"(what'?s\s+the\s+)?(weather|temperature)(\s+in\s+(.+))?", c)
-    if m_weather:
-        loc = (m_weather.group(4) or "").strip()
-        return ("weather", loc)
-
-    # wikipedia summary: "who is ...", "what is ...", "tell me about ..."
-    m_wiki = re.match(r"(who is|what is|tell me about)\s+(.+)$", c)
-    if m_wiki:
-        topic = m_wiki.group(2).strip()
-        return ("wiki", topic)
-
-    # timers: "set a timer for 10 minutes"
-    m_timer = re.match(r"(set\s+)?(a\s+)?timer\s+for\s+(\d+)\s+(second|seconds|minute|minutes|hour|hours)", c)
-    if m_timer:
-        amount = int(m_timer.group(3))
-        unit = m_timer.group(4)
-        return ("remind_in", (amount, unit, "Timer finished"))
-
-    # alarms: "set an alarm at 6", "set alarm for 6:30 am"
-    m_alarm = re.match(r"(set\s+)?(an\s+)?alarm\s+(for|at)\s+(\d{1,2})(:(\d{2}))?\s*(am|pm)?", c)
-    if m_alarm:
-        hh = int(m_alarm.group(4))
-        mm = int(m_alarm.group(6) or 0)
-        ap = (m_alarm.group(7) or "").lower()
-        if ap == "pm" and hh < 12:
-            hh += 12
-        if ap == "am" and hh == 12:
-            hh = 0
-        return ("remind_at", (hh, mm, "Alarm"))
-
-    # translate: "translate <text> to <lang>"
-    m_tr = re.match(r"translate\s+(.+?)\s+to\s+([a-zA-Z\-]+)$", c)
-    if m_tr:
-        text_to_tr = m_tr.group(1).strip()
-        lang = m_tr.group(2).strip()
-        return ("translate", (text_to_tr, lang))
-
-    # news: "news", "headlines", "news about india", "tech news"
-    m_news = re.match(r"(news|headlines)(\s+about\s+(.+))?$", c)
-    if m_news:
-        topic = (m_news.group(3) or "").strip()
-        return ("news", topic)
-
-    return ("unknown", c)
+    return INTENT_GRAMMAR.match(c, command)
+
+
+_CONTACT_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+# Letter groups that sound alike (Soundex classes); vowels, h, w and y carry no code
+_PHONETIC_CODES = {c: d for d, letters in enumerate(("bfpv", "cgjkqsxz", "dt", "l", "mn", "r"), 1) for c in letters}
+
+
+def contact_tokens(text: str) -> List[tuple]:
+    """(token, end offset) pairs of lowercased text; a possessive 's is dropped ("venu's" -> "venu")."""
+    out = []
+    for m in _CONTACT_TOKEN_RE.finditer((text or "").lower()):
+        token = m.group(0)
+        if token.endswith("'s"):
+            token = token[:-2]
+        out.append((token.replace("'", ""), m.end()))
+    return out
+
+
+def phonetic_key(text: str) -> str:
+    """Soundex-like key of a name, coding the first letter too, so names an STT
+    engine confuses ("venu"/"venue"/"benu") share a key.
+    """
+    key = []
+    last = None
+    for ch in re.sub(r"[^a-z]", "", (text or "").lower()):
+        code = _PHONETIC_CODES.get(ch)
+        if code and code != last:
+            key.append(str(code))
+        if ch not in "hw":
+            last = code
+    return "".join(key) or (text or "")[:1]
+
+
+def edit_distance(a: str, b: str, limit: int = None) -> int:
+    """Levenshtein distance; stops early (returning limit + 1) once it must exceed limit."""
+    if a == b:
+        return 0
+    if limit is not None and abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if limit is not None and min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+class ContactIndex:
+    """Lookup structure over contacts.json, built once per version of the file.
+
+    Names and aliases (an optional "aliases" list per contact) go into a token
+    trie, so finding a contact in a sentence walks the words once instead of
+    trying every name. Names that don't match exactly fall back to contacts
+    sharing a phonetic key, ranked by edit distance, to absorb STT mistakes.
+    """
+
+    def __init__(self, contacts: Dict[str, Any], max_distance: float = 0.34):
+        self.contacts = contacts
+        self.max_distance = max_distance
+        self.names: Dict[str, str] = {}  # normalized name or alias -> contact key
+        self.trie: Dict[str, Any] = {}
+        self.phonetic: Dict[str, List[str]] = {}
+        for key, info in contacts.items():
+            aliases = info.get("aliases", []) if isinstance(info, dict) else []
+            for name in [key] + [a for a in aliases if isinstance(a, str)]:
+                tokens = [t for t, _ in contact_tokens(name)]
+                if not tokens:
+                    continue
+                norm = " ".join(tokens)
+                self.names.setdefault(norm, key)
+                node = self.trie
+                for t in tokens:
+                    node = node.setdefault(t, {})
+                node.setdefault("", key)
+                self.phonetic.setdefault(phonetic_key("".join(tokens)), []).append(norm)
+
+    def match_at(self, tokens: List[str], start: int = 0):
+        """Longest contact name starting at tokens[start]: (key, tokens used) or (None, 0)."""
+        node = self.trie
+        best = (None, 0)
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if "" in node:
+                best = (node[""], i - start + 1)
+        return best
+
+    def fuzzy(self, name: str, max_distance: float = None):
+        """Closest contact to a misheard name: (key, normalized distance) or (None, 1.0)."""
+        max_distance = self.max_distance if max_distance is None else max_distance
+        norm = " ".join(t for t, _ in contact_tokens(name))
+        if not norm:
+            return None, 1.0
+        best = (None, 1.0)
+        key = phonetic_key(norm.replace(" ", ""))
+        # Also names one trailing consonant shorter ("venus" for "venu")
+        candidates = self.phonetic.get(key, []) + (self.phonetic.get(key[:-1], []) if len(key) > 1 else [])
+        for cand in candidates:
+            limit = int(max_distance * max(len(cand), len(norm)))
+            dist = edit_distance(norm, cand, limit)
+            score = dist / max(len(cand), len(norm))
+            if dist <= limit and score < best[1]:
+                best = (self.names[cand], score)
+        return best
+
+    def match_span(self, pairs: List[tuple], start: int, max_words: int = 4):
+        """Contact named by the words from pairs[start] (from contact_tokens):
+        (key, end offset, fuzzy) or (None, None, False). The trie match wins unless a
+        longer name was heard with a single slip ("wildy freho" is "wildy frehu", not "wildy").
+        """
+        tokens = [t for t, _ in pairs]
+        key, used = self.match_at(tokens, start)
+        # With an exact match, only a single-slip longer name can beat it
+        max_distance = 0.2 if key is not None else None
+        best = (None, 1.0, None)
+        for n in range(min(max_words, len(tokens) - start), used, -1):
+            cand, score = self.fuzzy(" ".join(tokens[start:start + n]), max_distance)
+            if cand is not None and score < best[1]:
+                best = (cand, score, pairs[start + n - 1][1])
+        if key is not None and best[0] is None:
+            return key, pairs[start + used - 1][1], False
+        return best[0], best[2], best[0] is not None and best[0] != key
+
+    def resolve(self, name: str):
+        """(contact key, info, fuzzy) for a spoken name: exact, alias, possessive or a
+        close match, also when followed by extra words ("venus phone"); fuzzy is True
+        for a close match. (None, None, False) if nothing is close enough.
+        """
+        pairs = contact_tokens(name)
+        key = self.names.get(" ".join(t for t, _ in pairs))
+        fuzzy = False
+        if key is None and pairs:
+            key, _, fuzzy = self.match_span(pairs, 0)
+        if key is None:
+            return None, None, False
+        return key, self.contacts.get(key), fuzzy
+
+    def find_after(self, text: str, verbs: tuple, max_words: int = 4):
+        """Contact named right after one of verbs in text: (key, end offset, words heard,
+        fuzzy) or (None, None, None, False).
+        """
+        pairs = contact_tokens(text)
+        for i, (t, _) in enumerate(pairs):
+            if t not in verbs:
+                continue
+            start = i + 1
+            if start < len(pairs) and pairs[start][0] == "to":
+                start += 1
+            key, end, fuzzy = self.match_span(pairs, start, max_words)
+            if key is not None:
+                heard = " ".join(t for t, e in pairs[start:] if e <= end)
+                return key, end, heard, fuzzy
+        return None, None, None, False
+
+
+CONTACT_INDEX = {"contacts": None, "index": None}
+_CONTACT_INDEX_LOCK = threading.Lock()
+
+
+def get_contact_index() -> ContactIndex:
+    """Index of RUNTIME.contacts, rebuilt only when contacts.json changes (RuntimeState
+    hands out a new dict only when the file's mtime changes).
+    """
+    contacts = RUNTIME.contacts
+    with _CONTACT_INDEX_LOCK:
+        if CONTACT_INDEX["contacts"] is not contacts:
+            CONTACT_INDEX.update(contacts=contacts, index=ContactIndex(contacts))
+        return CONTACT_INDEX["index"]
+
+
+def resolve_contact(name: str):
+    """(contact key, info, fuzzy) for a spoken name, shared by the call/message/email intents."""
+    try:
+        return get_contact_index().resolve(name)
+    except Exception:
+        return None, None, False
+
+
+# A call/message/email to a closely matched contact, waiting for a yes or no
+PENDING_CONTACT_ACTION: Dict[str, Any] = {}
+_PENDING_CONTACT_LOCK = threading.Lock()
+CONFIRM_YES_WORDS = {"yes", "yeah", "yep", "yup", "sure", "correct", "right", "ok", "okay"}
+CONFIRM_NO_WORDS = {"no", "nope", "cancel", "don't", "dont", "wrong", "stop"}
+
+
+def ask_contact_confirmation(engine: pyttsx3.Engine, intent: str, arg, key: str):
+    """Hold a contact action until the user confirms the closely matched name."""
+    with _PENDING_CONTACT_LOCK:
+        PENDING_CONTACT_ACTION.clear()
+        PENDING_CONTACT_ACTION.update(
+            intent=intent, arg=arg,
+            expires=time.monotonic() + float(RUNTIME.config.get("contact_confirm_seconds", 20)))
+    speak(engine, f"Did you mean {key}? Say yes to {intent} them.")
+
+
+def contact_confirmation_pending() -> bool:
+    with _PENDING_CONTACT_LOCK:
+        return bool(PENDING_CONTACT_ACTION) and time.monotonic() <= PENDING_CONTACT_ACTION["expires"]
+
+
+def take_contact_confirmation(text: str):
+    """The held (intent, arg) if text says yes, ("cancel", None) if it says no, else
+    None. Any reply ends the wait, so a later stray "yes" can't dial anyone.
+    """
+    with _PENDING_CONTACT_LOCK:
+        pending = dict(PENDING_CONTACT_ACTION)
+        PENDING_CONTACT_ACTION.clear()
+    if not pending or time.monotonic() > pending["expires"]:
+        return None
+    words = re.sub(r"[^a-z' ]+", " ", (text or "").lower()).split()
+    if words and words[0] in CONFIRM_YES_WORDS:
+        return pending["intent"], pending["arg"]
+    if words and (words[0] in CONFIRM_NO_WORDS or words[:2] == ["never", "mind"]):
+        return "cancel", None
+    return None
+
+
+MESSAGE_BODY_MARKER_RE = re.compile(r"^\s*(?::|,|that\b|saying\b|say\b)\s*")
 
 
 def contact_intent_from_text(text: str):
-    """Lightweight fallback: infer call/message to a known contact by substring match.
+    """Lightweight fallback: infer call/message to a known contact from free text.
     Returns (intent, arg) or (None, None).
     """
     try:
         c = (text or "").lower().strip()
-        contacts = load_json(CONTACTS_PATH, {})
-        names = list(contacts.keys())
+        index = get_contact_index()
         # call patterns
-        if c.startswith("call ") or c.startswith("dial ") or " call " in c or " dial " in c:
-            for name in names:
-                if f"call {name}" in c or f"dial {name}" in c:
-                    return ("call", name)
-        # message patterns without body
-        if c.startswith("message ") or " message " in c or c.startswith("send message"):
-            for name in names:
-                # with body
-                for marker in (":", ",", " that ", " saying ", " say "):
-                    key = f"message {name}{marker}"
-                    if key in c:
-                        body = c.split(key, 1)[1].strip()
-                        return ("message", (name, body))
-                # without body
-                if f"message {name}" in c:
-                    return ("message", (name, ""))
+        # A close match passes on the name as heard, so execute_intent asks before acting
+        name, _, heard, fuzzy = index.find_after(c, ("call", "dial"))
+        if name:
+            return ("call", heard if fuzzy else name)
+        # message patterns, with a body after ":", ",", "that", "saying" or "say"
+        name, end, heard, fuzzy = index.find_after(c, ("message",))
+        if name:
+            rest = c[end:]
+            m = MESSAGE_BODY_MARKER_RE.match(rest)
+            body = rest[m.end():].strip() if m and m.group(0).strip() else ""
+            return ("message", (heard if fuzzy else name, body))
         return (None, None)
     except Exception:
         return (None, None)
 
 
+def benchmark_contact_resolver(count: int = 10000, queries: int = 2000) -> Dict[str, Any]:
+    """Build time and per-query latency of ContactIndex on a synthetic address book
+    of `count` contacts: exact names, possessives and one-letter STT errors, with
+    the old scan over every name as a baseline.
+    """
+    rng = random.Random(11)
+    syllables = ("ka", "ri", "ven", "u", "ma", "li", "to", "sha", "an", "na", "der", "jo", "el", "mi", "ra",
+                 "son", "bo", "pe", "gus", "tha", "wil", "fre", "dy", "hu", "quin", "zo", "bel", "cor", "ta", "nik")
+
+    def word():
+        return "".join(rng.choice(syllables) for _ in range(rng.randint(2, 3)))
+
+    contacts: Dict[str, Any] = {}
+    while len(contacts) < count:
+        contacts[f"{word()} {word()}" if rng.random() < 0.7 else word()] = {"phone": "+10000000000"}
+    names = list(contacts)
+
+    started = time.perf_counter()
+    index = ContactIndex(contacts)
+    build_ms = (time.perf_counter() - started) * 1000.0
+
+    def misheard(name):
+        # Typical STT slip: one vowel heard as another ("venu" -> "vena")
+        vowels = [i for i, ch in enumerate(name) if ch in "aeiou"]
+        if not vowels:
+            return name
+        i = rng.choice(vowels)
+        return name[:i] + rng.choice([v for v in "aeiou" if v != name[i]]) + name[i + 1:]
+
+    cases = []
+    for _ in range(queries):
+        name = rng.choice(names)
+        kind = rng.choice(("exact", "possessive", "misheard"))
+        spoken = name + "'s" if kind == "possessive" else misheard(name) if kind == "misheard" else name
+        cases.append((kind, f"please call {spoken} now", name))
+
+    def linear(text):
+        for name in names:
+            if f"call {name}" in text:
+                return name
+        return None
+
+    results: Dict[str, Any] = {"contacts": count, "build_ms": round(build_ms, 1)}
+    for label, fn in (("index", lambda t: index.find_after(t, ("call", "dial"))[0]), ("linear_scan", linear)):
+        timings: Dict[str, List[float]] = {}
+        correct: Dict[str, int] = {}
+        for kind, text, expected in cases[:queries if label == "index" else min(queries, 200)]:
+            t0 = time.perf_counter_ns()
+            got = fn(text)
+            timings.setdefault(kind, []).append((time.perf_counter_ns() - t0) / 1000.0)
+            correct[kind] = correct.get(kind, 0) + (got == expected)
+        results[label] = {kind: {"accuracy": round(correct[kind] / len(v), 3),
+                                 "us_p50": round(percentile(v, 50), 1), "us_p95": round(percentile(v, 95), 1)}
+                          for kind, v in sorted(timings.items())}
+    return results
+
+
 def _volume_control(direction: str):
     if not AudioUtilities or not IAudioEndpointVolume:
         return False
     try:
         devices = AudioUtilities.GetSpeakers()
-        interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-        volume = interface.QueryInterface(IAudioEndpointVolume)
+        interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL.load(), None)
+        volume = interface.QueryInterface(IAudioEndpointVolume.load())
         if direction == "mute":
             volume.SetMute(1, None) if not volume.GetMute() else volume.SetMute(0, None)
             return True
@@ -872,38 +3610,206 @@ def _terminate_processes_by_names(names: List[str]) -> bool:
     return any_killed
 
 
-def schedule_reminder(engine: pyttsx3.Engine, when: datetime, message: str):
-    # Persist this reminder
+def write_json_atomic(path: str, data):
+    """Write JSON to a temp file next to path and rename it over path."""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+class ReminderScheduler:
+    """All reminders on one thread: a min-heap of due times plus a condition variable.
+
+    on_fire(message) is called from the scheduler thread. clock returns the current
+    datetime and can be replaced with a fake; run_due() fires whatever is due without
+    the thread, so tests can step time deterministically.
+
+    Changes are saved in batches: persist() only marks the list dirty and the
+    thread writes it persist_delay seconds later, so adding n reminders rewrites
+    the file a handful of times rather than n. flush() writes immediately; stop()
+    and interpreter exit call it.
+    """
+
+    def __init__(self, on_fire, path: str = REMINDERS_PATH, clock=datetime.now, persist_delay: float = 0.5):
+        self.on_fire = on_fire
+        self.path = path
+        self.clock = clock
+        self.persist_delay = persist_delay
+        self._dirty_since = None  # time.monotonic() of the first unsaved change
+        self._heap: List[tuple] = []  # (when, id); cancelled ids are skipped lazily
+        self._items: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 1
+        self._last_fired: Dict[str, Any] = {}
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="reminders", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self.flush()
+
+    def add(self, when: datetime, message: str, persist: bool = True) -> int:
+        with self._cond:
+            rid = self._next_id
+            self._next_id += 1
+            self._items[rid] = {"id": rid, "when": when, "message": message}
+            heapq.heappush(self._heap, (when, rid))
+            self._cond.notify()
+        if persist:
+            self.persist()
+        return rid
+
+    def cancel(self, rid: int) -> bool:
+        with self._cond:
+            removed = self._items.pop(rid, None) is not None
+            self._cond.notify()
+        if removed:
+            self.persist()
+        return removed
+
+    def clear(self) -> int:
+        with self._cond:
+            count = len(self._items)
+            self._items.clear()
+            self._heap = []
+            self._cond.notify()
+        self.persist()
+        return count
+
+    def snooze(self, rid: int, seconds: float) -> bool:
+        """Push a pending reminder back by seconds."""
+        with self._cond:
+            item = self._items.get(rid)
+            if not item:
+                return False
+            item["when"] = item["when"] + timedelta(seconds=seconds)
+            heapq.heappush(self._heap, (item["when"], rid))
+            self._cond.notify()
+        self.persist()
+        return True
+
+    def snooze_last(self, seconds: float):
+        """Re-schedule the most recently fired reminder seconds from now. Returns its id or None."""
+        with self._cond:
+            last = dict(self._last_fired)
+        if not last:
+            return None
+        return self.add(self.clock() + timedelta(seconds=seconds), last["message"])
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            return sorted((dict(i) for i in self._items.values()), key=lambda i: i["when"])
+
+    def persist(self):
+        """Mark the reminders for saving; the thread writes them persist_delay later."""
+        with self._cond:
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+                self._cond.notify()
+
+    def flush(self):
+        """Write pending changes to path now."""
+        with self._write_lock:
+            with self._cond:
+                if self._dirty_since is None:
+                    return
+                self._dirty_since = None
+                items = [{"when": i["when"].isoformat(), "message": i["message"]}
+                         for i in sorted(self._items.values(), key=lambda i: i["when"])]
+            try:
+                write_json_atomic(self.path, items)
+            except Exception:
+                with self._cond:
+                    if self._dirty_since is None:
+                        self._dirty_since = time.monotonic()
+
+    def _pop_due(self, now: datetime) -> List[Dict[str, Any]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, rid = heapq.heappop(self._heap)
+            item = self._items.get(rid)
+            # stale heap entry (cancelled or snoozed to a later time)
+            if item is None or item["when"] != when:
+                continue
+            del self._items[rid]
+            due.append(item)
+        return due
+
+    def _fire(self, due: List[Dict[str, Any]]):
+        if not due:
+            return
+        self.persist()
+        for item in due:
+            with self._cond:
+                self._last_fired = item
+            try:
+                self.on_fire(item["message"])
+            except Exception:
+                pass
+
+    def run_due(self) -> int:
+        with self._cond:
+            due = self._pop_due(self.clock())
+        self._fire(due)
+        return len(due)
+
+    def _run(self):
+        while True:
+            save = False
+            with self._cond:
+                while not self._stopped:
+                    now = self.clock()
+                    due = self._pop_due(now)
+                    if due:
+                        break
+                    timeout = None
+                    if self._heap:
+                        timeout = max(0.0, (self._heap[0][0] - now).total_seconds())
+                    if self._dirty_since is not None:
+                        save_in = self._dirty_since + self.persist_delay - time.monotonic()
+                        if save_in <= 0:
+                            save = True
+                            break
+                        timeout = save_in if timeout is None else min(timeout, save_in)
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+            if save:
+                self.flush()
+            self._fire(due)
+
+
+REMINDER_SCHEDULER = None
+_REMINDER_SCHEDULER_LOCK = threading.Lock()
+
+
+def get_reminder_scheduler(engine: pyttsx3.Engine) -> ReminderScheduler:
+    """Process-wide scheduler; started on first use and speaks through engine."""
+    global REMINDER_SCHEDULER
+    with _REMINDER_SCHEDULER_LOCK:
+        if REMINDER_SCHEDULER is None:
+            REMINDER_SCHEDULER = ReminderScheduler(lambda message: speak(engine, f"Reminder: {message}", priority=SPEECH_PRIORITY_ALARM))
+            REMINDER_SCHEDULER.start()
+        return REMINDER_SCHEDULER
+
+
+def schedule_reminder(engine: pyttsx3.Engine, when: datetime, message: str) -> int:
     try:
         os.makedirs(os.path.dirname(REMINDERS_PATH), exist_ok=True)
-        reminders: List[Dict[str, Any]] = load_json(REMINDERS_PATH, [])
-        reminders.append({
-            "when": when.isoformat(),
-            "message": message
-        })
-        with open(REMINDERS_PATH, "w", encoding="utf-8") as f:
-            json.dump(reminders, f, ensure_ascii=False, indent=2)
     except Exception:
         pass
-
-    def worker():
-        now = datetime.now()
-        delay = max(0, (when - now).total_seconds())
-        time.sleep(delay)
-        speak(engine, f"Reminder: {message}")
-        # Remove from persistence after firing
-        try:
-            reminders2: List[Dict[str, Any]] = load_json(REMINDERS_PATH, [])
-            reminders2 = [r for r in reminders2 if not (
-                r.get("message") == message and r.get("when") == when.isoformat()
-            )]
-            with open(REMINDERS_PATH, "w", encoding="utf-8") as f:
-                json.dump(reminders2, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
-
-    t = threading.Thread(target=worker, daemon=True)
-    t.start()
+    return get_reminder_scheduler(engine).add(when, message)
 
 
 def restore_persistent_reminders(engine: pyttsx3.Engine):
@@ -912,8 +3818,8 @@ def restore_persistent_reminders(engine: pyttsx3.Engine):
         items: List[Dict[str, Any]] = load_json(REMINDERS_PATH, [])
         if not items:
             return
+        scheduler = get_reminder_scheduler(engine)
         now = datetime.now()
-        remaining: List[Dict[str, Any]] = []
         for r in items:
             try:
                 when = datetime.fromisoformat(r.get("when", ""))
@@ -922,32 +3828,41 @@ def restore_persistent_reminders(engine: pyttsx3.Engine):
                     continue
                 if when > now:
                     # schedule again
-                    schedule_reminder(engine, when, msg)
-                    remaining.append({"when": when.isoformat(), "message": msg})
+                    scheduler.add(when, msg, persist=False)
                 # If past due, skip (do not fire late reminders on startup)
             except Exception:
                 continue
-        with open(REMINDERS_PATH, "w", encoding="utf-8") as f:
-            json.dump(remaining, f, ensure_ascii=False, indent=2)
+        scheduler.persist()
     except Exception:
         pass
 
 
-def append_conv_history(entry: Dict[str, Any]):
-    """Append a conversation entry to conv-history.json, keep last 200."""
+CONV_HISTORY_WRITER = None
+_CONV_HISTORY_LOCK = threading.Lock()
+
+
+def get_conv_history_writer() -> ConvHistoryWriter:
+    global CONV_HISTORY_WRITER
+    with _CONV_HISTORY_LOCK:
+        if CONV_HISTORY_WRITER is None:
+            CONV_HISTORY_WRITER = ConvHistoryWriter(CONV_HISTORY_PATH)
+        return CONV_HISTORY_WRITER
+
+
+def append_conv_history(entry: Dict[str, Any], ai_result: Dict[str, Any] = None):
+    """Queue a conversation entry for logs/conv-history.jsonl (flushed in the background).
+    If ai_result (from ai_or_search) is given, its length, source and timing are recorded.
+    """
     try:
-        os.makedirs(LOG_DIR, exist_ok=True)
-        data: List[Dict[str, Any]] = []
-        if os.path.exists(CONV_HISTORY_PATH):
-            with open(CONV_HISTORY_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                if not isinstance(data, list):
-                    data = []
-        data.append(entry)
-        # keep last 200
-        data = data[-200:]
-        with open(CONV_HISTORY_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if ai_result is not None:
+            entry = dict(entry)
+            entry["ai_answer_len"] = len(ai_result.get("text") or "")
+            entry["ai_source"] = ai_result.get("source")
+            entry["ai_ms"] = ai_result.get("ms")
+            if ai_result.get("saved_tokens") is not None:
+                entry["ai_saved_tokens"] = ai_result["saved_tokens"]
+                entry["ai_saved_ms"] = ai_result.get("saved_ms")
+        get_conv_history_writer().append(entry)
     except Exception:
         pass
 
@@ -1059,7 +3974,7 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
         q = arg or ""
         url = "https://www.youtube.com"
         if q:
-            cfg2 = load_json(CONFIG_PATH, {})
+            cfg2 = RUNTIME.config
             if (cfg2.get("youtube_play_top", True) and kit):
                 try:
                     kit.playonyt(q)
@@ -1120,6 +4035,40 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
         schedule_reminder(engine, when, msg)
         speak(engine, f"Reminder set for {hh:02d}:{mm:02d}")
 
+    elif intent == "list_reminders":
+        items = get_reminder_scheduler(engine).list()
+        if not items:
+            speak(engine, "You have no reminders")
+        else:
+            speak(engine, f"You have {len(items)} reminder{'s' if len(items) != 1 else ''}")
+            for item in items[:5]:
+                speak(engine, f"{item['message']} at {item['when'].strftime('%I:%M %p')}")
+
+    elif intent == "cancel_reminders":
+        count = get_reminder_scheduler(engine).clear()
+        speak(engine, f"Cancelled {count} reminder{'s' if count != 1 else ''}" if count else "You have no reminders")
+
+    elif intent == "cancel_reminder":
+        scheduler = get_reminder_scheduler(engine)
+        wanted = str(arg or "").lower()
+        match = next((i for i in scheduler.list() if wanted and wanted in i["message"].lower()), None)
+        if match and scheduler.cancel(match["id"]):
+            speak(engine, f"Cancelled reminder: {match['message']}")
+        else:
+            speak(engine, f"I couldn't find a reminder about {arg}")
+
+    elif intent == "snooze":
+        amount, unit = arg
+        mult = 1
+        if unit.startswith("minute"):
+            mult = 60
+        elif unit.startswith("hour"):
+            mult = 3600
+        if get_reminder_scheduler(engine).snooze_last(amount * mult):
+            speak(engine, f"Snoozed for {amount} {unit}")
+        else:
+            speak(engine, "There is nothing to snooze")
+
     elif intent == "calc":
         expr = str(arg)
         # only allow safe characters
@@ -1149,7 +4098,7 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
         speak(engine, "House Party Protocol activated")
     
     elif intent == "protocol_clean_slate":
-        # Close whitelisted apps (except explorer), mute, and clear pending reminders file
+        # Close whitelisted apps (except explorer), mute, and clear pending reminders
         to_close = []
         for app, procs in WHITELISTED_APP_PROCESSES.items():
             if app == "explorer":
@@ -1157,11 +4106,7 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
             to_close.extend(procs)
         _terminate_processes_by_names(list(set(to_close)))
         _volume_control("mute")
-        try:
-            with open(REMINDERS_PATH, "w", encoding="utf-8") as f:
-                json.dump([], f)
-        except Exception:
-            pass
+        get_reminder_scheduler(engine).clear()
         speak(engine, "Clean Slate completed")
 
     elif intent == "win_minimize":
@@ -1324,22 +4269,13 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
             speak(engine, "Invalid date format. Use YYYY-MM-DD")
 
     elif intent == "weather":
-        loc = (arg or "").strip()
+        loc = weather_location(arg)
         try:
-            url = f"https://wttr.in/{quote(loc)}?format=j1" if loc else "https://wttr.in?format=j1"
-            r = requests.get(url, timeout=8)
-            data = r.json()
-            cur = data.get("current_condition", [{}])[0]
-            temp_c = cur.get("temp_C")
-            feels_c = cur.get("FeelsLikeC")
-            desc = (cur.get("weatherDesc", [{}])[0].get("value") or "").lower()
-            if temp_c is not None:
-                if loc:
-                    speak(engine, f"Weather in {loc}: {temp_c} degrees, feels like {feels_c}, {desc}")
-                else:
-                    speak(engine, f"Current weather: {temp_c} degrees, feels like {feels_c}, {desc}")
+            w = RESPONSE_CACHE.get_or_fetch("weather", loc, lambda: fetch_weather(loc))
+            if loc:
+                speak(engine, f"Weather in {loc}: {w['temp_c']} degrees, feels like {w['feels_c']}, {w['desc']}")
             else:
-                raise ValueError("Missing temp")
+                speak(engine, f"Current weather: {w['temp_c']} degrees, feels like {w['feels_c']}, {w['desc']}")
         except Exception:
             try:
                 webbrowser.open(f"https://www.google.com/search?q=weather+{quote(loc)}")
@@ -1350,20 +4286,12 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
     elif intent == "wiki":
         topic = str(arg)
         try:
-            api = f"https://en.wikipedia.org/api/rest_v1/page/summary/{quote(topic)}"
-            r = requests.get(api, timeout=8)
-            if r.status_code == 200:
-                summary = r.json().get("extract") or ""
-                if summary:
-                    speak(engine, summary[:500])
-                else:
-                    raise ValueError("No summary")
-            else:
-                raise ValueError("HTTP")
+            summary = RESPONSE_CACHE.get_or_fetch("wiki", topic, lambda: fetch_wiki_summary(topic))
+            speak(engine, summary[:500])
         except Exception:
             # Fallback to AI answer or open Wikipedia
-            handled = ai_or_search(engine, {}, init_ai(load_json(CONFIG_PATH, {})), f"Provide a short summary about {topic}", logging.getLogger("jarvis"))
-            if not handled:
+            result = ai_or_search(engine, {}, RUNTIME.ai_model(), f"Provide a short summary about {topic}", logging.getLogger("jarvis"))
+            if not result["handled"]:
                 try:
                     webbrowser.open(f"https://en.wikipedia.org/wiki/{quote(topic)}")
                 except Exception:
@@ -1371,8 +4299,7 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
 
     elif intent == "translate":
         text_to_tr, lang = arg
-        cfg = load_json(CONFIG_PATH, {})
-        model = init_ai(cfg)
+        model = RUNTIME.ai_model()
         if model:
             prompt = f"Translate the following text into {lang}. Only return the translation.\n\nText: {text_to_tr}"
             ans = ai_answer(model, prompt)
@@ -1390,17 +4317,7 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
     elif intent == "news":
         topic = (arg or "").strip()
         try:
-            # Build Google News RSS URL (region India English by default)
-            base = "https://news.google.com/rss?hl=en-IN&gl=IN&ceid=IN:en"
-            url = base if not topic else f"https://news.google.com/rss/search?q={quote(topic)}&hl=en-IN&gl=IN&ceid=IN:en"
-            r = requests.get(url, timeout=8)
-            import xml.etree.ElementTree as ET
-            root = ET.fromstring(r.text)
-            titles = [item.findtext('title') for item in root.findall('.//item')]
-            # Remove the feed title if present
-            headlines = [t for t in titles if t and not t.lower().startswith('top stories')]
-            if not headlines:
-                raise ValueError('No headlines')
+            headlines = RESPONSE_CACHE.get_or_fetch("news", topic, lambda: fetch_news(topic))
             top = headlines[:5]
             if topic:
                 speak(engine, f"Top {len(top)} headlines about {topic}:")
@@ -1419,16 +4336,18 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
         # arg: (name, text)
         try:
             name, text = arg
-            cfg = load_json(CONFIG_PATH, {})
+            cfg = RUNTIME.config
             if not cfg.get("communications_enabled", True):
                 speak(engine, "Messaging is disabled in settings")
                 return True
-            contacts = load_json(CONTACTS_PATH, {})
-            key = name.lower().strip()
-            info = contacts.get(key)
+            key, info, fuzzy = resolve_contact(name)
             if not info:
                 speak(engine, f"I don't have contact info for {name}")
                 return True
+            if fuzzy:
+                ask_contact_confirmation(engine, "message", (key, text), key)
+                return True
+            name = key
             channel = (cfg.get("default_message_channel") or "whatsapp").lower()
             if channel == "whatsapp":
                 phone = (info.get("phone") or info.get("whatsapp") or "").replace(" ", "")
@@ -1454,7 +4373,7 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
                     return True
                 subject = ""
                 body = text or ""
-                cfg = load_json(CONFIG_PATH, {})
+                cfg = RUNTIME.config
                 if cfg.get("smtp_enabled", False) and cfg.get("smtp_host") and cfg.get("smtp_user"):
                     try:
                         msg = MIMEText(body, _charset="utf-8")
@@ -1487,13 +4406,15 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
         # arg: (name, text)
         try:
             name, text = arg
-            contacts = load_json(CONTACTS_PATH, {})
-            key = name.lower().strip()
-            info = contacts.get(key)
+            key, info, fuzzy = resolve_contact(name)
             if not info or not info.get("email"):
                 speak(engine, f"I don't have an email for {name}")
                 return True
-            cfg = load_json(CONFIG_PATH, {})
+            if fuzzy:
+                ask_contact_confirmation(engine, "email", (key, text), key)
+                return True
+            name = key
+            cfg = RUNTIME.config
             subject = ""
             body = text or ""
             if cfg.get("smtp_enabled", False) and cfg.get("smtp_host") and cfg.get("smtp_user"):
@@ -1525,13 +4446,15 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
         # arg: name
         try:
             name = str(arg)
-            cfg = load_json(CONFIG_PATH, {})
-            contacts = load_json(CONTACTS_PATH, {})
-            key = name.lower().strip()
-            info = contacts.get(key)
+            cfg = RUNTIME.config
+            key, info, fuzzy = resolve_contact(name)
             if not info or not info.get("phone"):
                 speak(engine, f"I don't have a phone number for {name}")
                 return True
+            if fuzzy:
+                ask_contact_confirmation(engine, "call", key, key)
+                return True
+            name = key
             handler = (cfg.get("call_handler") or "tel").lower()
             number = info["phone"].replace(" ", "")
             if handler == "skype":
@@ -1578,36 +4501,264 @@ def execute_intent(engine: pyttsx3.Engine, intent, arg):
     return True
 
 
-def main():
-    safe_print("Starting Jarvis Assistant (wake word 'jarvis' or hotkey)...")
-    # Load .env first for secure config (e.g., GOOGLE_API_KEY)
-    load_env_if_available()
-    cfg = load_json(CONFIG_PATH, {})
-    # Expose cfg to input-control handlers
+# Intents that one-shot commands (CLI/GUI/daemon) always execute directly instead of asking AI
+ONESHOT_ACTION_INTENTS = {
+    "open_app", "open_browser", "open_site",
+    "close_app", "close_browser",
+    "search_web", "search_youtube", "time", "date",
+    "volume", "brightness", "media",
+    "remind_in", "remind_at",
+    "list_reminders", "cancel_reminders", "cancel_reminder", "snooze",
+    "calc", "convert", "date_of_week",
+    # window and input control
+    "win_minimize", "win_restore", "win_close", "win_switch",
+    "type_text", "press_key", "scroll", "screenshot",
+    "greet", "exit",
+    # communications
+    "call", "message", "email",
+    # protocols and extras
+    "protocol_stealth", "protocol_house_party", "protocol_clean_slate",
+    "translate", "wiki", "weather",
+    "unknown_open", "unknown_close", "prompt_open",
+}
+
+
+def run_oneshot_command(engine: pyttsx3.Engine, cfg: dict, ai_model, custom_cmds: dict, text: str, logger: logging.Logger) -> Dict[str, Any]:
+    """Run a single typed command the way cli_command.py does. Returns {intent, ai}."""
+    confirmed = take_contact_confirmation(text)
+    if confirmed:
+        run_contact_confirmation(engine, *confirmed)
+        return {"intent": confirmed[0], "ai": False}
+    intent, arg = parse_intent(text, custom_cmds)
+    handled = False
+    if cfg.get("ai_default_mode", True) and intent not in ONESHOT_ACTION_INTENTS:
+        handled = ai_or_search(engine, cfg, ai_model, text, logger)["handled"]
+    if not handled:
+        execute_intent(engine, intent, arg)
+    return {"intent": intent, "ai": handled}
+
+
+def run_contact_confirmation(engine: pyttsx3.Engine, intent: str, arg):
+    """Carry out (or drop) a contact action the user just answered yes/no to."""
+    if intent == "cancel":
+        speak(engine, "Okay, cancelled.")
+        return True
+    return execute_intent(engine, intent, arg)
+
+
+def speak_wake_reply(engine: pyttsx3.Engine, cfg: dict):
     try:
-        CURRENT_CFG.clear()
-        if isinstance(cfg, dict):
-            CURRENT_CFG.update(cfg)
+        if cfg.get("persona_enabled") and cfg.get("play_wake_chime"):
+            winsound.Beep(1200, 90)
     except Exception:
         pass
-    custom_cmds = load_json(CUSTOM_CMDS_PATH, {})
+    reply = (cfg.get("wake_reply") or "Yes?") if cfg.get("persona_enabled") else "Yes?"
+    speak(engine, reply)
 
-    logger = init_logging()
 
-    recognizer = sr.Recognizer()
-    # Tunable STT parameters
-    recognizer.energy_threshold = int(cfg.get("energy_threshold", 250))
-    recognizer.dynamic_energy_threshold = bool(cfg.get("dynamic_energy_threshold", True))
-    recognizer.pause_threshold = float(cfg.get("pause_threshold", 0.8))
+class _DaemonServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    """One JSON request line in, one JSON response line out."""
+
+    def handle(self):
+        state = self.server.jarvis_state
+        try:
+            line = self.rfile.readline(64 * 1024)
+            req = json.loads(line.decode("utf-8") or "{}")
+            resp = handle_daemon_request(state, req)
+        except Exception as e:
+            resp = {"ok": False, "error": str(e)}
+        try:
+            self.wfile.write((json.dumps(resp, ensure_ascii=False) + "\n").encode("utf-8"))
+        except Exception:
+            pass
+
+
+def write_daemon_token(path: str = None) -> str:
+    """Create a fresh random token and store it where only the current user can read it."""
+    path = path or DAEMON_TOKEN_PATH
+    token = secrets.token_hex(32)
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    tmp = path + ".tmp"
     try:
-        recognizer.non_speaking_duration = float(cfg.get("non_speaking_duration", 0.3))
-    except Exception:
+        os.remove(tmp)  # O_CREAT keeps an existing file's permissions
+    except OSError:
+        pass
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    os.replace(tmp, path)
+    return token
+
+
+def handle_daemon_request(state: Dict[str, Any], req: Dict[str, Any]) -> Dict[str, Any]:
+    if not hmac.compare_digest(str(req.get("token") or "").encode("utf-8"), state["token"].encode("utf-8")):
+        state["logger"].warning("Daemon request rejected: missing or wrong token")
+        return {"ok": False, "error": "Unauthorized"}
+    kind = str(req.get("type") or "")
+    state["requests"] += 1
+    if kind == "status":
+        return {
+            "ok": True,
+            "pid": os.getpid(),
+            "uptime": round(time.time() - state["started"], 1),
+            "requests": state["requests"],
+            "ai": RUNTIME.ai_model() is not None,
+            "imports_ms": {k: round(v * 1000, 1) for k, v in IMPORT_TIMES.items()},
+            "response_cache": dict(RESPONSE_CACHE.stats),
+        }
+    if kind == "wake":
+        speak_wake_reply(state["engine"], RUNTIME.config)
+        return {"ok": True}
+    if kind == "command":
+        text = str(req.get("text") or "").strip()
+        if not text:
+            return {"ok": False, "error": "No command provided"}
+        state["logger"].info(f"Daemon command: {text}")
+        res = run_oneshot_command(state["engine"], RUNTIME.config, RUNTIME.ai_model(), RUNTIME.custom_cmds, text, state["logger"])
+        res["ok"] = True
+        return res
+    if kind == "shutdown":
+        server = state.get("server")
+        if server:
+            def stop():
+                server.shutdown()
+                server.server_close()
+            threading.Thread(target=stop, daemon=True).start()
+        return {"ok": True}
+    return {"ok": False, "error": f"Unknown request type: {kind}"}
+
+
+def start_daemon_server(engine: pyttsx3.Engine, logger: logging.Logger, background: bool = True):
+    """Bind the loopback command socket and (by default) serve it from a background thread.
+    Returns the server, or None if the port is unavailable (e.g. another Jarvis is running).
+    """
+    state = {"engine": engine, "logger": logger, "started": time.time(), "requests": 0, "server": None}
+    try:
+        server = _DaemonServer((DAEMON_HOST, int(RUNTIME.config.get("daemon_port", DAEMON_PORT))), _DaemonHandler)
+    except OSError as e:
+        logger.info(f"Daemon socket unavailable: {e}")
+        return None
+    try:
+        # Only after binding, so a second instance can't replace the running daemon's token
+        state["token"] = write_daemon_token()
+    except OSError as e:
+        logger.info(f"Daemon token could not be written: {e}")
+        server.server_close()
+        return None
+    server.jarvis_state = state
+    state["server"] = server
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Daemon listening on {DAEMON_HOST}:{server.server_address[1]}")
+    return server
+
+
+def benchmark_daemon(command: str = "what time is it", runs: int = 5) -> Dict[str, Any]:
+    """Round-trip time of one command without the daemon (a fresh `cli_command.py --no-daemon`
+    process, what the GUI spawns when none is running) and through the resident daemon's
+    socket. Uses the running daemon, or starts one in this process for the duration.
+    """
+    import cli_command
+
+    logger = logging.getLogger("jarvis")
+    argv = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli_command.py"),
+            "--no-daemon", command]
+    cold = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(argv, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, timeout=300)
+        cold.append((time.perf_counter() - started) * 1000.0)
+        if proc.returncode != 0:
+            return {"error": f"in-process run failed: {proc.stderr.decode('utf-8', 'replace').strip()[-500:]}"}
+    server = None
+    if cli_command.daemon_request({"type": "status"}, timeout=5.0) is None:
+        server = start_daemon_server(init_tts(RUNTIME.config), logger)
+        if server is None:
+            return {"error": "daemon port unavailable"}
+    warm = []
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            reply = cli_command.daemon_request({"type": "command", "text": command})
+            warm.append((time.perf_counter() - started) * 1000.0)
+            if not reply or not reply.get("ok"):
+                return {"error": f"daemon request failed: {reply}"}
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    def summary(times):
+        return {"p50_ms": round(percentile(times, 50), 1), "p95_ms": round(percentile(times, 95), 1)}
+
+    return {
+        "command": command,
+        "runs": runs,
+        "without_daemon": summary(cold),
+        "with_daemon": summary(warm),
+        "speedup": round(percentile(cold, 50) / max(percentile(warm, 50), 0.001), 1),
+    }
+
+
+def serve_daemon():
+    """Headless mode: keep TTS, AI and config warm and serve requests until shutdown."""
+    load_env_if_available()
+    cfg = RUNTIME.config
+    logger = init_logging()
+    engine = init_tts(cfg)
+    restore_persistent_reminders(engine)
+    RUNTIME.ai_model()  # warm the AI client before the first request
+    start_prefetcher(cfg, logger)
+    server = start_daemon_server(engine, logger, background=False)
+    if not server:
+        safe_print("Jarvis daemon could not start (port in use?)")
+        return 1
+    safe_print(f"Jarvis daemon listening on {DAEMON_HOST}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
         pass
+    finally:
+        server.server_close()
+    safe_print("Jarvis daemon stopped.")
+    return 0
+
+
+def main():
+    safe_print("Starting Jarvis Assistant (wake word 'jarvis' or hotkey)...")
+    # Load .env first for secure config (e.g., GOOGLE_API_KEY)
+    load_env_if_available()
+    # Config, custom commands and the AI client come from RUNTIME and hot-reload on file change
+    cfg = RUNTIME.config
+    custom_cmds = RUNTIME.custom_cmds
+
+    logger = init_logging()
+
+    recognizer = build_recognizer(cfg)
 
     engine = init_tts(cfg)
     # Restore reminders before we start listening
     restore_persistent_reminders(engine)
-    ai_model = init_ai(cfg)
+    ai_model = RUNTIME.ai_model()
+    # Serve GUI/CLI requests from this process so they skip a cold start
+    daemon_server = None
+    if cfg.get("daemon_enabled", True):
+        daemon_server = start_daemon_server(engine, logger)
+    start_prefetcher(cfg, logger)
+    # Build the local intent router off the main thread so the first unknown command doesn't wait for it
+    if cfg.get("ai_action_routing", True) and cfg.get("local_router_enabled", True):
+        threading.Thread(target=lambda: get_intent_classifier(cfg), name="intent-router", daemon=True).start()
+    # Load the Vosk model once up front so the first utterance doesn't pay for it
+    if (cfg.get("stt_backend") or "").lower() == "vosk":
+        try:
+            get_vosk_model(cfg.get("vosk_model_path"))
+        except Exception:
+            logger.info("Vosk model failed to load")
 
     # Microphone selection
     mic_index = None
@@ -1633,11 +4784,15 @@ def main():
     hotkey_triggered = {"flag": False}
     convo_window = int(cfg.get("conversation_window_seconds", 0))
     last_interaction = {"ts": 0.0}
-    last_ai = {"text": ""}
+    last_ai = {"text": "", "query": None, "full": None, "pending": None}
+    # Earlier turns of this conversation, sent along with follow-up questions
+    conversation = ConversationContext.from_config(cfg)
     pending_command = {"text": None}
     last_empty_prompt = {"ts": 0.0}
 
     def on_hotkey():
+        # Barge-in: the hotkey interrupts whatever Jarvis is saying
+        cancel_speech(engine)
         hotkey_triggered["flag"] = True
 
     if keyboard and (hotkey or hotkey_read_full):
@@ -1646,34 +4801,77 @@ def main():
                 keyboard.add_hotkey(hotkey, on_hotkey)
                 safe_print(f"Hotkey registered: {hotkey}")
             if hotkey_read_full:
-                keyboard.add_hotkey(hotkey_read_full, lambda: speak_full_ai_answer(engine, cfg, last_ai["text"]))
+                keyboard.add_hotkey(hotkey_read_full,
+                                    lambda: start_read_full_ai_answer(engine, cfg, last_ai, RUNTIME.ai_model()))
                 safe_print(f"Hotkey registered (read full): {hotkey_read_full}")
         except Exception:
             safe_print("Failed to register hotkey.")
 
     try:
-        with sr.Microphone(device_index=mic_index) as source:
+        # cleanup is exited first, so capture stops reading before the microphone stream closes
+        with sr.Microphone(device_index=mic_index) as mic, contextlib.ExitStack() as cleanup:
             safe_print("Calibrating for ambient noise...")
             calibrate_dur = float(cfg.get("ambient_noise_duration", 1.5))
-            recognizer.adjust_for_ambient_noise(source, duration=calibrate_dur)
+            recognizer.adjust_for_ambient_noise(mic, duration=calibrate_dur)
+            # Capture continuously so speech between two listens (recognition, replies) isn't lost
+            source = mic
+            capture = None
+            preroll = float(cfg.get("capture_preroll_seconds", 0.3))
+            if cfg.get("continuous_capture", True):
+                capture = AudioCapture(mic.stream, mic.SAMPLE_RATE, mic.SAMPLE_WIDTH, mic.CHUNK,
+                                       seconds=float(cfg.get("capture_buffer_seconds", 30)))
+                capture.start()
+                cleanup.callback(capture.join, 1.0)
+                cleanup.callback(capture.stop)
+                source = RingBufferSource(capture)
             speak(engine, "Jarvis online. Say my name or use the hotkey.")
-            
+
             running = True
             while running:
+                end_turn()
                 try:
+                    # Pick up edits to config.json / custom_commands.json between turns
+                    cfg = RUNTIME.config
+                    custom_cmds = RUNTIME.custom_cmds
+                    ai_model = RUNTIME.ai_model()
                     now_ts = time.time()
                     in_conversation = convo_window > 0 and (now_ts - last_interaction["ts"]) <= convo_window
+                    # A "did you mean ...?" question is answered without the wake word
+                    in_conversation = in_conversation or contact_confirmation_pending()
 
                     if not in_conversation:
                         if wake_enabled:
+                            # With barge-in (the default) the wake word interrupts speech;
+                            # otherwise don't listen over our own voice
+                            if not cfg.get("barge_in_on_wake", True):
+                                wait_speech_idle(engine)
+                                if capture:
+                                    source.skip_to(get_speech_worker(engine).last_done_at, preroll)
                             safe_print("Listening for wake word...")
                             wake_timeout = int(cfg.get("stt_timeout_wake", 12))
                             wake_phrase = int(cfg.get("stt_phrase_wake", 6))
-                            text = recognize_speech(recognizer, source, cfg, timeout=wake_timeout, phrase_time_limit=wake_phrase)
+                            # Offline keyword spotting first; only fall back to full STT when it's unavailable
+                            wake_started = time.perf_counter()
+                            text, woke = listen_wake_phrase(recognizer, source, cfg, timeout=wake_timeout,
+                                                            phrase_time_limit=wake_phrase)
                             if text:
                                 safe_print(f"Heard: {text}")
                                 logger.info(f"Heard wake loop: {text}")
+                            if text and contains_wake_word(text) and wake_word_is_echo(engine, text):
+                                logger.info("Ignored wake word in Jarvis's own speech")
+                                text = ""
                             if text and contains_wake_word(text):
+                                cancel_speech(engine)
+                                # The turn starts when the wake phrase ends (it may already hold the command)
+                                wake_ended = time.perf_counter()
+                                # (with the offline detector, only when a command followed the wake word)
+                                speech_end = UTTERANCE_MARKS.get("end") if woke is None or text != WAKE_WORDS[0] else None
+                                if not speech_end or not wake_started <= speech_end <= wake_ended:
+                                    speech_end = None
+                                turn = begin_turn(started=speech_end or wake_started,
+                                                  backend=(cfg.get("stt_backend") or "google").lower())
+                                if speech_end:
+                                    turn.add("recognize_speech", speech_end, wake_ended, phase="wake")
                                 # If user already asked the question with the wake word, use it directly.
                                 tail = text
                                 try:
@@ -1710,26 +4908,45 @@ def main():
                     safe_print("Waiting for command...")
                     cmd_timeout = int(cfg.get("stt_timeout_cmd", 12))
                     cmd_phrase = int(cfg.get("stt_phrase_cmd", 10))
+                    turn = CURRENT_TURN or begin_turn(backend=(cfg.get("stt_backend") or "google").lower())
                     # If we already have a command captured during wake, use it; else listen now
                     if pending_command["text"]:
                         command = pending_command["text"]
                         pending_command["text"] = None
                     else:
-                        time.sleep(0.15)
-                        command = recognize_speech(recognizer, source, cfg, timeout=cmd_timeout, phrase_time_limit=cmd_phrase)
+                        wait_speech_idle(engine)
+                        if capture:
+                            # continue right after the wake phrase, minus anything we said since
+                            source.skip_to(get_speech_worker(engine).last_done_at, preroll)
+                        else:
+                            time.sleep(0.15)
+                        listen_started = time.perf_counter()
+                        command = recognize_speech(recognizer, source, cfg, timeout=cmd_timeout, phrase_time_limit=cmd_phrase,
+                                                   endpointing=cfg.get("command_endpointing"))
+                        trace_listen(turn, listen_started, time.perf_counter())
                     if not command:
                         # Do not speak any prompt on empty recognition to avoid disturbance
                         logger.info("Empty command")
                         continue
                     safe_print(f"Command: {command}")
                     logger.info(f"Command: {command}")
-                    intent, arg = parse_intent(command, custom_cmds)
+                    confirmed = take_contact_confirmation(command)
+                    if confirmed:
+                        turn.tag(intent=confirmed[0])
+                        with turn.span("execute_intent"):
+                            running = run_contact_confirmation(engine, *confirmed)
+                        last_interaction["ts"] = time.time()
+                        continue
+                    with turn.span("parse_intent"):
+                        intent, arg = parse_intent(command, custom_cmds)
+                    turn.tag(intent=intent)
                     try:
                         append_conv_history({
                             "ts": datetime.now().isoformat(),
                             "input": command,
                             "parsed_intent": intent,
-                            "arg": arg
+                            "arg": arg,
+                            "stt": dict(LAST_STT) if LAST_STT.get("winner") else None
                         })
                     except Exception:
                         pass
@@ -1740,6 +4957,7 @@ def main():
                         "search_web", "search_youtube", "time", "date",
                         "volume", "brightness", "media",
                         "remind_in", "remind_at",
+                        "list_reminders", "cancel_reminders", "cancel_reminder", "snooze",
                         "calc", "convert", "date_of_week",
                         # window and input control
                         "win_minimize", "win_restore", "win_close", "win_switch",
@@ -1752,84 +4970,118 @@ def main():
                     # If ai_default_mode is on, send everything to AI unless it matches explicit action intents
                     if cfg.get("ai_default_mode", False):
                         if intent not in action_intents:
-                            handled = ai_or_search(engine, cfg, ai_model, command, logger)
-                            if handled:
-                                # Try to capture printed answer snippet from ai_or_search by re-calling ai_answer
-                                ans = ai_answer(ai_model, command)
-                                if ans:
-                                    last_ai["text"] = ans
+                            with turn.span("ai_answer"):
+                                result = ai_or_search(engine, cfg, ai_model, command, logger, conversation)
+                            turn.tag(ai_source=result["source"])
+                            if result["handled"]:
+                                remember_ai_answer(last_ai, command, result, cfg, ai_model)
                                 try:
                                     append_conv_history({
                                         "ts": datetime.now().isoformat(),
                                         "input": command,
-                                        "ai_answer_len": len(ans or "")
-                                    })
+                                    }, ai_result=result)
                                 except Exception:
                                     pass
                                 last_interaction["ts"] = time.time()
-                                logger.info("Answered via AI/Search (default mode)")
+                                logger.info(f"Answered via AI/Search (default mode): source={result['source']} in {result['ms']} ms")
                                 continue
 
                     # Otherwise, if configured, route questions to AI by default
                     if cfg.get("ai_default_for_questions", False):
                         if intent not in action_intents and is_question(command):
-                            handled = ai_or_search(engine, cfg, ai_model, command, logger)
-                            if handled:
-                                ans = ai_answer(ai_model, command)
-                                if ans:
-                                    last_ai["text"] = ans
+                            with turn.span("ai_answer"):
+                                result = ai_or_search(engine, cfg, ai_model, command, logger, conversation)
+                            turn.tag(ai_source=result["source"])
+                            if result["handled"]:
+                                remember_ai_answer(last_ai, command, result, cfg, ai_model)
                                 try:
                                     append_conv_history({
                                         "ts": datetime.now().isoformat(),
                                         "input": command,
-                                        "ai_answer_len": len(ans or "")
-                                    })
+                                    }, ai_result=result)
                                 except Exception:
                                     pass
                                 last_interaction["ts"] = time.time()
-                                logger.info("Answered via AI/Search (question default)")
+                                logger.info(f"Answered via AI/Search (question default): source={result['source']} in {result['ms']} ms")
                                 continue
 
                     if intent == "unknown":
                         # Contact-aware quick match before AI routing
                         routed_intent, routed_arg = contact_intent_from_text(command)
                         if routed_intent:
-                            running = execute_intent(engine, routed_intent, routed_arg)
+                            turn.tag(intent=routed_intent)
+                            with turn.span("execute_intent"):
+                                running = execute_intent(engine, routed_intent, routed_arg)
                             last_interaction["ts"] = time.time()
                             logger.info(f"Executed via contact fallback: {routed_intent}")
                             continue
-                        # Try AI action routing first if enabled
+                        # Try action routing first if enabled: local classifier, then the AI below its threshold
+                        result = None
+                        routed_by = None
                         if cfg.get("ai_action_routing", True):
-                            routed_intent, routed_arg = ai_route_intent(ai_model, command, logger)
+                            with turn.span("local_route"):
+                                routed_intent, routed_arg, confident = local_route_intent(command, cfg)
+                            routed_by = "local"
+                            if not confident:
+                                routed_by = "ai"
+                                if cfg.get("ai_route_and_answer", True):
+                                    # One call that either routes the command or answers it
+                                    with turn.span("ai_route_or_answer"):
+                                        result = ai_route_or_answer(engine, cfg, ai_model, command, logger, conversation)
+                                    routed_intent, routed_arg = result["intent"], result["arg"]
+                                    if not result["handled"]:
+                                        result = None
+                                else:
+                                    with turn.span("ai_route_intent"):
+                                        routed_intent, routed_arg = ai_route_intent(ai_model, command, logger)
                             if routed_intent:
-                                running = execute_intent(engine, routed_intent, routed_arg)
+                                turn.tag(intent=routed_intent, routed_by=routed_by)
+                                with turn.span("execute_intent"):
+                                    if routed_intent == "read_full_answer":
+                                        read_full_ai_answer(engine, cfg, last_ai, ai_model)
+                                    else:
+                                        running = execute_intent(engine, routed_intent, routed_arg)
                                 last_interaction["ts"] = time.time()
-                                logger.info(f"Executed via AI routing: {routed_intent}")
+                                try:
+                                    # Recorded so the local router learns from routed commands
+                                    append_conv_history({
+                                        "ts": datetime.now().isoformat(),
+                                        "input": command,
+                                        "executed_intent": routed_intent,
+                                        "arg": routed_arg,
+                                        "routed_by": routed_by
+                                    })
+                                except Exception:
+                                    pass
+                                logger.info(f"Executed via {routed_by} routing: {routed_intent}")
                                 continue
-                        # Fallback Q&A or search
-                        handled = ai_or_search(engine, cfg, ai_model, command, logger)
-                        if handled:
-                            ans = ai_answer(ai_model, command)
-                            if ans:
-                                last_ai["text"] = ans
+                        # Fallback Q&A or search, unless the routing call already answered
+                        if result is None:
+                            with turn.span("ai_answer"):
+                                result = ai_or_search(engine, cfg, ai_model, command, logger, conversation)
+                        turn.tag(ai_source=result["source"])
+                        if result["handled"]:
+                            remember_ai_answer(last_ai, command, result, cfg, ai_model)
                             try:
                                 append_conv_history({
                                     "ts": datetime.now().isoformat(),
                                     "input": command,
-                                    "ai_answer_len": len(ans or "")
-                                })
+                                    "routed_by": routed_by
+                                }, ai_result=result)
                             except Exception:
                                 pass
                             last_interaction["ts"] = time.time()
-                            logger.info("Answered via AI/Search (unknown)")
+                            logger.info(f"Answered via AI/Search (unknown): source={result['source']} in {result['ms']} ms")
                             continue
                     # handle reading full answer locally
                     if intent == "read_full_answer":
-                        speak_full_ai_answer(engine, cfg, last_ai["text"])
+                        with turn.span("read_full_answer"):
+                            read_full_ai_answer(engine, cfg, last_ai, ai_model)
                         last_interaction["ts"] = time.time()
                         continue
 
-                    running = execute_intent(engine, intent, arg)
+                    with turn.span("execute_intent"):
+                        running = execute_intent(engine, intent, arg)
                     try:
                         if cfg.get("persona_enabled") and cfg.get("play_completion_chime"):
                             winsound.Beep(900, 70)
@@ -1858,6 +5110,15 @@ def main():
         safe_print(f"Microphone error: {e}")
         safe_print("Make sure a microphone is connected and not in use by another app.")
     finally:
+        # let queued speech (e.g. "Goodbye") finish before stopping the engine
+        wait_speech_idle(engine, timeout=5)
+        end_turn()
+        if daemon_server:
+            try:
+                daemon_server.shutdown()
+                daemon_server.server_close()
+            except Exception:
+                pass
         try:
             engine.stop()
         except Exception:
@@ -1874,4 +5135,43 @@ def main():
 
 
 if __name__ == "__main__":
+    if "--daemon" in sys.argv[1:]:
+        sys.exit(serve_daemon())
+    if "--eval-wake" in sys.argv[1:]:
+        wav_dir = sys.argv[sys.argv.index("--eval-wake") + 1] if len(sys.argv) > sys.argv.index("--eval-wake") + 1 else "."
+        wavs = sorted(os.path.join(wav_dir, f) for f in os.listdir(wav_dir) if f.lower().endswith(".wav"))
+        safe_print(json.dumps(evaluate_wake_detector(wavs, RUNTIME.config), indent=2))
+        sys.exit(0)
+    if "--bench-endpointing" in sys.argv[1:]:
+        wav_dir = sys.argv[sys.argv.index("--bench-endpointing") + 1] if len(sys.argv) > sys.argv.index("--bench-endpointing") + 1 else "."
+        wavs = sorted(os.path.join(wav_dir, f) for f in os.listdir(wav_dir) if f.lower().endswith(".wav"))
+        safe_print(json.dumps(benchmark_endpointing(wavs, RUNTIME.config), indent=2))
+        sys.exit(0)
+    if "--bench-context" in sys.argv[1:]:
+        idx = sys.argv.index("--bench-context")
+        turns = int(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 else 1000
+        report = simulate_conversation_context(RUNTIME.config, turns)
+        safe_print(json.dumps(report, indent=2))
+        sys.exit(0 if report["bounded"] else 1)
+    if "--bench-contacts" in sys.argv[1:]:
+        idx = sys.argv.index("--bench-contacts")
+        count = int(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 else 10000
+        safe_print(json.dumps(benchmark_contact_resolver(count), indent=2))
+        sys.exit(0)
+    if "--bench-daemon" in sys.argv[1:]:
+        idx = sys.argv.index("--bench-daemon")
+        runs = int(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 else 5
+        command = sys.argv[idx + 2] if len(sys.argv) > idx + 2 else "what time is it"
+        report = benchmark_daemon(command, runs)
+        safe_print(json.dumps(report, indent=2))
+        sys.exit(1 if "error" in report else 0)
+    if "--eval-router" in sys.argv[1:]:
+        idx = sys.argv.index("--eval-router")
+        corpus = sys.argv[idx + 1] if len(sys.argv) > idx + 1 else None
+        safe_print(json.dumps(evaluate_local_router(RUNTIME.config, corpus), indent=2))
+        sys.exit(0)
+    if "--import-report" in sys.argv[1:]:
+        for line in import_time_report(load_all=True):
+            safe_print(line)
+        sys.exit(0)
     main()
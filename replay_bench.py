@@ -0,0 +1,357 @@
+"""
+Offline replay benchmark for the Jarvis main loop.
+
+Runs jarvis.main() unchanged against a scripted session instead of a live
+microphone, speakers and Gemini:
+
+- text mode: each line of a script file is what recognize_speech "hears"
+  (optionally after --stt-latency seconds)
+- WAV mode (--wav): the files are played, one after another with silence in
+  between, through a fake sr.Microphone and recognized by the configured
+  stt_backend (use Vosk to stay offline)
+
+Speech goes to a recording stand-in for the pyttsx3 engine, the AI client is a
+fake Gemini model with configurable latency, winsound and keyboard are stubbed,
+and side effects (apps, browser, volume, brightness, input, messages, HTTP)
+are recorded instead of performed. Timings come from the per-turn tracer and
+are printed (or written with --out) as JSON, e.g.
+
+    python replay_bench.py session.txt --ai-latency 0.8 --out bench.json
+    python replay_bench.py --wav fixtures/*.wav --stt-backend vosk
+"""
+import os
+import sys
+import json
+import time
+import wave
+import types
+import argparse
+import tempfile
+import contextlib
+import threading
+from typing import List, Dict, Any
+
+
+def install_platform_stubs():
+    """Windows-only modules jarvis imports at startup; never touch the real ones in a benchmark."""
+    winsound = types.ModuleType("winsound")
+    winsound.Beep = lambda *args, **kwargs: None
+    sys.modules["winsound"] = winsound
+    keyboard = types.ModuleType("keyboard")
+    keyboard.add_hotkey = lambda *args, **kwargs: None
+    keyboard.remove_hotkey = lambda *args, **kwargs: None
+    sys.modules["keyboard"] = keyboard
+
+
+class Recorder:
+    """Stands in for a side-effecting module: calls are recorded, nothing happens."""
+
+    def __init__(self, name: str, log: List[str]):
+        self._name = name
+        self._log = log
+
+    def __getattr__(self, attr):
+        return Recorder(f"{self._name}.{attr}", self._log)
+
+    def __call__(self, *args, **kwargs):
+        self._log.append(self._name)
+        return Recorder(f"{self._name}()", self._log)
+
+
+class RecordingEngine:
+    """pyttsx3 engine stand-in: records what is said; speaking takes len(text) / chars_per_second."""
+
+    def __init__(self, chars_per_second: float = 0.0):
+        self.chars_per_second = chars_per_second
+        self.spoken: List[Dict[str, Any]] = []
+        self._pending: List[str] = []
+        self._stop = threading.Event()
+        self._props = {"rate": 180, "volume": 1.0, "voices": [], "voice": None}
+
+    def say(self, text):
+        self._pending.append(str(text))
+
+    def runAndWait(self):
+        pending, self._pending = self._pending, []
+        self._stop.clear()
+        for text in pending:
+            started = time.perf_counter()
+            if self.chars_per_second > 0:
+                self._stop.wait(len(text) / self.chars_per_second)
+            self.spoken.append({"text": text, "ms": round((time.perf_counter() - started) * 1000.0, 2),
+                                "interrupted": self._stop.is_set()})
+
+    def stop(self):
+        self._stop.set()
+
+    def setProperty(self, name, value):
+        self._props[name] = value
+
+    def getProperty(self, name):
+        return self._props.get(name)
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """generate_content() stand-in. Routing prompts (message lists) get route_reply,
+    questions get answer; streaming yields the answer word by word. A prompt
+    starting with one of answer_prompts (route-or-answer) gets the answer when
+    route_reply routes nowhere. With a max_output_tokens cap (a short spoken
+    answer) only the first sentence is returned.
+    """
+
+    def __init__(self, latency: float = 0.5, answer: str = None, route_reply: str = '{"intent": "none"}',
+                 chunk_delay: float = 0.02, answer_prompts=()):
+        self.latency = latency
+        self.answer = answer or ("This is a benchmark answer. It has a few sentences. "
+                                 "Each one is spoken as soon as it arrives.")
+        self.route_reply = route_reply
+        self.chunk_delay = chunk_delay
+        self.answer_prompts = tuple(answer_prompts)
+        self.calls = 0
+
+    def generate_content(self, contents, stream: bool = False, timeout: float = None, generation_config=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        if isinstance(contents, list):
+            prompt = "".join(str(p) for item in contents for p in item.get("parts", []))
+            routes = (json.loads(self.route_reply).get("intent") or "none") != "none"
+            if routes or not prompt.startswith(self.answer_prompts):
+                return iter([_FakeResponse(self.route_reply)]) if stream else _FakeResponse(self.route_reply)
+        answer = self.answer
+        if (generation_config or {}).get("max_output_tokens"):
+            answer = answer.split(". ")[0].rstrip(".") + "."
+        if not stream:
+            time.sleep(self.chunk_delay * len(answer.split(" ")))
+            return _FakeResponse(answer)
+        return self._stream(answer)
+
+    def _stream(self, answer):
+        for word in answer.split(" "):
+            time.sleep(self.chunk_delay)
+            yield _FakeResponse(word + " ")
+
+
+class _PcmStream:
+    def __init__(self, pcm: bytes, sample_rate: int, realtime: bool):
+        self._pcm = pcm
+        self._pos = 0
+        self._rate = sample_rate
+        self._realtime = realtime
+
+    def read(self, frames: int) -> bytes:
+        if self._pcm is None:
+            return b"\x00\x00" * frames  # text mode: endless silence
+        if self._pos >= len(self._pcm):
+            # End of the script: stop main() the same way Ctrl+C does
+            raise KeyboardInterrupt
+        out = self._pcm[self._pos:self._pos + frames * 2]
+        self._pos += len(out)
+        if self._realtime:
+            time.sleep(len(out) / 2.0 / self._rate)
+        return out
+
+
+def load_pcm(paths: List[str], gap_seconds: float, lead_seconds: float):
+    """Concatenate mono 16-bit WAVs (same sample rate) with silence around each."""
+    rate = None
+    parts = []
+    for path in paths:
+        with wave.open(path, "rb") as w:
+            if w.getnchannels() != 1 or w.getsampwidth() != 2:
+                raise ValueError(f"{path}: expected mono 16-bit audio")
+            if rate is None:
+                rate = w.getframerate()
+                parts.append(b"\x00\x00" * int(lead_seconds * rate))
+            elif w.getframerate() != rate:
+                raise ValueError(f"{path}: sample rate differs from the first file")
+            parts.append(w.readframes(w.getnframes()))
+            parts.append(b"\x00\x00" * int(gap_seconds * rate))
+    return b"".join(parts), rate or 16000
+
+
+def bench_config(base: Dict[str, Any], args) -> Dict[str, Any]:
+    cfg = dict(base)
+    cfg.update({
+        "daemon_enabled": False,
+        "prefetch_enabled": False,
+        "continuous_capture": False,
+        "hotkey": "",
+        "hotkey_read_full": "",
+        "wake_word_enabled": True,
+        "dynamic_energy_threshold": False,
+        "ambient_noise_duration": 0.2,
+        "speak_prompt_on_wake": False,
+        "trace_enabled": True,
+    })
+    if args.stt_backend:
+        cfg["stt_backend"] = args.stt_backend
+    if args.routing == "separate":
+        cfg["ai_route_and_answer"] = False
+    if args.no_local_router:
+        cfg["local_router_enabled"] = False
+    return cfg
+
+
+def summarize(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    from tracing import stage_report
+    stages = {}
+    for row in stage_report(spans):
+        values = [s["ms"] for s in spans if s.get("stage") == row["stage"]]
+        stages[row["stage"]] = {"count": row["count"], "mean": round(sum(values) / len(values), 2),
+                                "p50": row["p50"], "p95": row["p95"], "p99": row["p99"]}
+    return stages
+
+
+class _MemoryWriter:
+    def __init__(self):
+        self.entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def append(self, entry):
+        with self._lock:
+            self.entries.append(entry)
+
+
+def run(args) -> Dict[str, Any]:
+    install_platform_stubs()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import jarvis as core
+    from tracing import Tracer
+
+    workdir = tempfile.mkdtemp(prefix="jarvis-bench-")
+    base = core.RUNTIME.config
+    cfg_path = os.path.join(workdir, "config.json")
+    with open(cfg_path, "w", encoding="utf-8") as f:
+        json.dump(bench_config(base, args), f)
+
+    actions: List[str] = []
+    fake_model = FakeGeminiModel(latency=args.ai_latency, chunk_delay=args.ai_chunk_delay,
+                                 route_reply=args.route_reply, answer_prompts=(core.ROUTE_OR_ANSWER_PROMPT, core.ROUTE_OR_SHORT_ANSWER_PROMPT))
+    engine = RecordingEngine(chars_per_second=args.tts_cps)
+    writer = _MemoryWriter()
+
+    # Isolate state: temp config/reminders/history/cache, fake AI, recorded side effects
+    core.RUNTIME = core.RuntimeState(config_path=cfg_path)
+    # Same deadline/hedging/backoff wrapper the real providers get
+    model = core.AIClient(fake_model, core.RUNTIME.config)
+    core.RUNTIME.ai_model = lambda: model
+    core.init_tts = lambda cfg: engine
+    core.TRACER = Tracer(writer)
+    core.REMINDERS_PATH = os.path.join(workdir, "reminders.json")
+    core.LOG_DIR = workdir
+    core.LOG_FILE = os.path.join(workdir, "jarvis.log")
+    core.CONV_HISTORY_PATH = os.path.join(workdir, "conv-history.jsonl")
+    core.RESPONSE_CACHE = core.ResponseCache(os.path.join(workdir, "responses.json"))
+    core.REMINDER_SCHEDULER = core.ReminderScheduler(
+        lambda message: core.speak(engine, f"Reminder: {message}", priority=core.SPEECH_PRIORITY_ALARM),
+        path=core.REMINDERS_PATH)
+    core.REMINDER_SCHEDULER.start()
+    for name in ("webbrowser", "subprocess", "smtplib", "kit", "pyautogui", "gw", "sbc",
+                 "AudioUtilities", "IAudioEndpointVolume", "CLSCTX_ALL"):
+        setattr(core, name, Recorder(name, actions))
+
+    def offline_http_get(url, *args, **kwargs):
+        actions.append("http_get")
+        raise RuntimeError("offline benchmark")
+    core.http_get = offline_http_get
+
+    if args.wav:
+        pcm, rate = load_pcm(args.wav, args.gap, lead_seconds=0.5)
+        utterances = len(args.wav)
+    else:
+        with open(args.script, "r", encoding="utf-8") as f:
+            lines = [ln.strip() for ln in f if ln.strip() and not ln.strip().startswith("#")]
+        pcm, rate = None, 16000
+        utterances = len(lines)
+        script = iter(lines)
+
+        def scripted_recognize(recognizer, source, cfg, timeout=5, phrase_time_limit=6, endpointing=None):
+            core.LAST_STT.clear()
+            if args.stt_latency:
+                time.sleep(args.stt_latency)
+            try:
+                return next(script).lower()
+            except StopIteration:
+                raise KeyboardInterrupt
+        core.recognize_speech = scripted_recognize
+        core.detect_wake_word = lambda *a, **k: None
+
+    class ScriptedMicrophone(core.sr.AudioSource):
+        def __init__(self, device_index=None):
+            self.SAMPLE_RATE = rate
+            self.SAMPLE_WIDTH = 2
+            self.CHUNK = 1024
+            self.stream = _PcmStream(pcm, rate, args.realtime)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        @staticmethod
+        def list_microphone_names():
+            return ["replay"]
+
+    core.sr.Microphone = ScriptedMicrophone
+
+    started = time.perf_counter()
+    # Keep stdout for the report; the assistant's console output goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        core.main()
+    wall = time.perf_counter() - started
+    core.end_turn()
+
+    spans = list(writer.entries)
+    turns = [s for s in spans if s["stage"] == "turn"]
+    return {
+        "mode": "wav" if args.wav else "text",
+        "utterances": utterances,
+        "turns": len(turns),
+        "wall_seconds": round(wall, 3),
+        "turns_per_minute": round(len(turns) / wall * 60.0, 2) if wall else None,
+        "stages": summarize(spans),
+        "intents": sorted({s.get("intent") for s in turns if s.get("intent")}),
+        "spoken": len(engine.spoken),
+        "ai_calls": fake_model.calls,
+        "ai_client": dict(model.stats),
+        "side_effects": {name: actions.count(name) for name in sorted(set(actions))},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a scripted session through the Jarvis main loop")
+    parser.add_argument("script", nargs="?", help="text file, one utterance per line (# comments allowed)")
+    parser.add_argument("--wav", nargs="+", help="mono 16-bit WAV files to play through the fake microphone")
+    parser.add_argument("--gap", type=float, default=1.5, help="seconds of silence after each WAV")
+    parser.add_argument("--realtime", action="store_true", help="pace WAV playback at real time")
+    parser.add_argument("--stt-backend", default=None, help="override stt_backend for WAV mode (e.g. vosk)")
+    parser.add_argument("--stt-latency", type=float, default=0.0, help="text mode: seconds per recognition")
+    parser.add_argument("--ai-latency", type=float, default=0.5, help="fake Gemini time to first token (s)")
+    parser.add_argument("--ai-chunk-delay", type=float, default=0.02, help="fake Gemini delay per generated word (s)")
+    parser.add_argument("--route-reply", default='{"intent": "none"}', help="fake Gemini reply to routing prompts")
+    parser.add_argument("--routing", choices=("combined", "separate"), default="combined",
+                        help="unknown commands: one route-or-answer call, or routing then answering")
+    parser.add_argument("--no-local-router", action="store_true", help="always ask the AI to route unknown commands")
+    parser.add_argument("--tts-cps", type=float, default=0.0, help="characters spoken per second (0 = instant)")
+    parser.add_argument("--out", default=None, help="write the JSON report here as well")
+    args = parser.parse_args(argv)
+    if not args.script and not args.wav:
+        parser.error("give a script file or --wav files")
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Shared setup: make the repository importable and stub the Windows-only modules."""
+import math
+import os
+import struct
+import sys
+import threading
+import wave
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from replay_bench import install_platform_stubs  # noqa: E402
+
+install_platform_stubs()
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def _write_wav(path, segments, rate=16000):
+    """segments: (seconds, amplitude) pairs; non-zero amplitudes are a 440 Hz tone."""
+    samples = []
+    for seconds, amplitude in segments:
+        for i in range(int(seconds * rate)):
+            samples.append(int(amplitude * math.sin(2 * math.pi * 440 * i / rate)))
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+    return str(path)
+
+
+@pytest.fixture
+def write_wav():
+    """write_wav(path, segments, rate=16000) -> path of a mono 16-bit WAV fixture."""
+    return _write_wav
+
+
+@pytest.fixture
+def http_server():
+    """http_server(handler_class) -> base URL of a local HTTP server on an ephemeral port."""
+    servers = []
+
+    def serve(handler_class):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+import jarvis
+
+
+class StalledStream:
+    """A streamed reply that sends one chunk and then hangs until closed."""
+
+    def __init__(self):
+        self.closed = threading.Event()
+        self.sent = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.sent:
+            self.sent = True
+            return jarvis._AIText("Hello.")
+        self.closed.wait(30)
+        raise ConnectionError("connection closed")
+
+    def close(self):
+        self.closed.set()
+
+
+class FakeProvider:
+    def __init__(self):
+        self.streams = []
+
+    def generate_content(self, contents, stream=False, timeout=None):
+        if stream:
+            self.streams.append(StalledStream())
+            return self.streams[-1]
+        return jarvis._AIText("answer")
+
+
+def client(provider):
+    return jarvis.AIClient(provider, {"ai_deadline_seconds": 0.2, "ai_requests_per_minute": 6000, "ai_burst": 100})
+
+
+def test_stalled_streams_are_closed_and_leave_the_pool_free():
+    provider = FakeProvider()
+    ai = client(provider)
+    for _ in range(jarvis.AI_POOL_WORKERS + 2):
+        chunks = ai.generate_content("q", stream=True)
+        assert next(chunks).text == "Hello."
+        with pytest.raises(jarvis.AIDeadlineError):
+            next(chunks)
+    assert all(s.closed.wait(1) for s in provider.streams)
+    started = time.monotonic()
+    assert ai.generate_content("q").text == "answer"
+    assert time.monotonic() - started < 0.2
+
+
+def test_stream_the_caller_stops_reading_is_closed():
+    provider = FakeProvider()
+    chunks = client(provider).generate_content("q", stream=True)
+    next(chunks)
+    chunks.close()
+    assert provider.streams[0].closed.is_set()
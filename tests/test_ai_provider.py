@@ -0,0 +1,203 @@
+import json
+import logging
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+import jarvis
+from replay_bench import RecordingEngine
+
+ANSWER = ["Paris is the capital ", "of France. It sits ", "on the Seine."]
+
+
+class ChatHandler(BaseHTTPRequestHandler):
+    """Fake /chat/completions endpoint. Each request takes the next step of `plan`:
+    {"delay": s, "status": code, "chunks": [...], "chunk_delay": s, "stall": s}; an empty
+    plan answers "ok" straight away.
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    plan = []
+    bodies = []
+    headers_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        cls = type(self)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls.bodies.append(body)
+        cls.headers_seen.append(dict(self.headers))
+        step = cls.plan.pop(0) if cls.plan else {}
+        time.sleep(step.get("delay", 0))
+        status = step.get("status", 200)
+        chunks = step.get("chunks", ["ok"])
+        if status != 200:
+            self._send(status, b'{"error": {"message": "injected"}}')
+        elif body.get("stream"):
+            self._stream(chunks, step.get("chunk_delay", 0), step.get("stall", 0))
+        else:
+            reply = {"choices": [{"message": {"role": "assistant", "content": "".join(chunks)}}]}
+            self._send(200, json.dumps(reply).encode())
+
+    def _send(self, status, payload):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, chunks, chunk_delay, stall):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for text in chunks:
+                event = {"choices": [{"delta": {"content": text}}]}
+                self._chunk(f"data: {json.dumps(event)}\n\n".encode())
+                time.sleep(chunk_delay)
+            time.sleep(stall)
+            self._chunk(b"data: [DONE]\n\n")
+            self._chunk(b"")
+        except OSError:
+            pass  # the client hung up on a stalled stream
+
+    def _chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+
+@pytest.fixture
+def chat_server(http_server, monkeypatch):
+    handler = type("PlannedChatHandler", (ChatHandler,), {"plan": [], "bodies": [], "headers_seen": []})
+    monkeypatch.setattr(jarvis, "HTTP_SESSION", None)
+    return handler, http_server(handler)
+
+
+def client(url, **cfg):
+    settings = {"ai_deadline_seconds": 2.0, "ai_requests_per_minute": 6000, "ai_burst": 100}
+    settings.update(cfg)
+    return jarvis.AIClient(jarvis.OpenAICompatibleProvider(url, "fake-model", api_key="sk-test"), settings)
+
+
+def test_request_carries_messages_cap_and_key(chat_server):
+    handler, url = chat_server
+    ai = client(url)
+    resp = ai.generate_content([{"role": "user", "parts": ["hi"]}], generation_config={"max_output_tokens": 40})
+    assert resp.text == "ok"
+    assert handler.bodies[0]["messages"] == [{"role": "user", "content": "hi"}]
+    assert handler.bodies[0]["max_tokens"] == 40
+    assert handler.headers_seen[0]["Authorization"] == "Bearer sk-test"
+
+
+def test_stream_yields_chunks_as_they_arrive(chat_server):
+    handler, url = chat_server
+    handler.plan = [{"delay": 0.05, "chunks": ANSWER, "chunk_delay": 0.2}]
+    started = time.perf_counter()
+    arrivals = []
+    for chunk in client(url).generate_content("capital of france?", stream=True):
+        arrivals.append((time.perf_counter() - started, chunk.text))
+    assert [text for _, text in arrivals] == ANSWER
+    assert arrivals[0][0] < arrivals[-1][0] - 0.3
+    assert handler.bodies[0]["stream"] is True
+
+
+def test_stalled_stream_hits_the_deadline(chat_server):
+    handler, url = chat_server
+    handler.plan = [{"chunks": ANSWER[:1], "stall": 3.0}]
+    ai = client(url, ai_deadline_seconds=0.3)
+    chunks = ai.generate_content("q", stream=True)
+    assert next(chunks).text == ANSWER[0]
+    started = time.perf_counter()
+    with pytest.raises(jarvis.AIDeadlineError):
+        next(chunks)
+    assert time.perf_counter() - started < 1.0
+    assert ai.stats["deadline"] == 1
+
+
+def test_hedged_duplicate_wins_over_a_slow_first_request(chat_server):
+    handler, url = chat_server
+    handler.plan = [{"delay": 1.5, "chunks": ["slow"]}, {"chunks": ["fast"]}]
+    ai = client(url, ai_hedge=True, ai_hedge_percentile=95)
+    ai.latencies_ms.extend([50.0] * 10)  # hedge after ~50 ms
+    started = time.perf_counter()
+    assert ai.generate_content("q").text == "fast"
+    assert time.perf_counter() - started < 1.0
+    assert ai.stats["hedged"] == 1
+    assert len(handler.bodies) == 2
+
+
+def test_without_history_there_is_no_hedge(chat_server):
+    handler, url = chat_server
+    handler.plan = [{"delay": 0.3, "chunks": ["only"]}]
+    ai = client(url, ai_hedge=True)
+    assert ai.generate_content("q").text == "only"
+    assert ai.stats["hedged"] == 0
+    assert len(handler.bodies) == 1
+
+
+def test_429_empties_the_bucket_and_halves_the_rate(chat_server):
+    handler, url = chat_server
+    handler.plan = [{"status": 429}]
+    ai = client(url, ai_requests_per_minute=600, ai_burst=5)
+    with pytest.raises(jarvis.AIQuotaError):
+        ai.generate_content("q")
+    assert ai.bucket.rate == pytest.approx(5.0)
+    with pytest.raises(jarvis.AIQuotaError):
+        ai.generate_content("q")  # refused locally, the server is not asked
+    assert len(handler.bodies) == 1
+    assert ai.stats["quota"] == 2
+    time.sleep(0.25)  # 5 tokens/s: one is back
+    assert ai.generate_content("q").text == "ok"
+    assert ai.bucket.rate > 5.0
+
+
+def test_burst_past_the_quota_is_refused_without_a_request(chat_server):
+    handler, url = chat_server
+    ai = client(url, ai_requests_per_minute=6, ai_burst=2)
+    assert ai.generate_content("a").text == "ok"
+    assert ai.generate_content("b").text == "ok"
+    with pytest.raises(jarvis.AIQuotaError):
+        ai.generate_content("c")
+    assert len(handler.bodies) == 2
+
+
+def test_server_error_is_counted_and_raised(chat_server):
+    handler, url = chat_server
+    handler.plan = [{"status": 500}]
+    ai = client(url)
+    with pytest.raises(jarvis.requests.HTTPError):
+        ai.generate_content("q")
+    assert ai.stats["errors"] == 1
+    assert ai.bucket.rate == ai.bucket.max_rate
+
+
+def test_filler_is_spoken_while_a_slow_answer_starts(chat_server):
+    handler, url = chat_server
+    handler.plan = [{"delay": 0.5, "chunks": ANSWER}]
+    engine = RecordingEngine()
+    cfg = {"ai_filler_after_seconds": 0.1, "ai_filler_text": "One moment.", "ai_tts_max_chars": 400}
+    answer = jarvis.stream_ai_answer_to_tts(engine, cfg, client(url), "q", logging.getLogger("test"))
+    assert jarvis.wait_speech_idle(engine, 5)
+    assert answer == "".join(ANSWER)
+    assert [item["text"] for item in engine.spoken] == [
+        "One moment.", "Paris is the capital of France.", "It sits on the Seine."]
+
+
+def test_filler_is_cancelled_when_the_answer_is_quick(chat_server):
+    handler, url = chat_server
+    handler.plan = [{"chunks": ANSWER}]
+    engine = RecordingEngine()
+    cfg = {"ai_filler_after_seconds": 0.5, "ai_tts_max_chars": 400}
+    jarvis.stream_ai_answer_to_tts(engine, cfg, client(url), "q", logging.getLogger("test"))
+    assert jarvis.wait_speech_idle(engine, 5)
+    time.sleep(0.6)
+    assert "One moment." not in [item["text"] for item in engine.spoken]
+
+
+def test_disabled_filler_has_no_timer():
+    assert jarvis.start_ai_filler(RecordingEngine(), {"ai_filler_enabled": False}) is None
+    assert jarvis.start_ai_filler(RecordingEngine(), {"ai_filler_after_seconds": 0}) is None
@@ -0,0 +1,63 @@
+import logging
+import re
+import time
+
+import jarvis
+from replay_bench import FakeGeminiModel, RecordingEngine
+
+ANSWER = ("Paris is the capital of France. It sits on the Seine in the north of the country. "
+          "About two million people live in the city itself.")
+
+
+class TimedEngine(RecordingEngine):
+    """RecordingEngine that also notes when each utterance started."""
+
+    def __init__(self):
+        super().__init__()
+        self.spoken_at = []
+
+    def runAndWait(self):
+        self.spoken_at.extend((time.perf_counter(), text) for text in self._pending)
+        super().runAndWait()
+
+
+class TimedModel(FakeGeminiModel):
+    def _stream(self, answer):
+        yield from super()._stream(answer)
+        self.stream_ended = time.perf_counter()
+
+
+def test_sentences_are_spoken_before_the_stream_ends(caplog):
+    engine = TimedEngine()
+    model = TimedModel(latency=0.05, answer=ANSWER, chunk_delay=0.03)
+    logger = logging.getLogger("test.ai_stream")
+    cfg = {"ai_filler_enabled": False, "ai_tts_max_chars": 400}
+    with caplog.at_level(logging.INFO, logger="test.ai_stream"):
+        answer = jarvis.stream_ai_answer_to_tts(engine, cfg, model, "capital of france?", logger)
+        assert jarvis.wait_speech_idle(engine, 5)
+    assert answer == ANSWER
+    said = [text for _, text in engine.spoken_at]
+    assert said == ["Paris is the capital of France.", "It sits on the Seine in the north of the country.",
+                    "About two million people live in the city itself."]
+    first_at = engine.spoken_at[0][0]
+    assert first_at < model.stream_ended - 0.2  # well before the last word arrived
+    assert model.calls == 1
+
+    first = [r.getMessage() for r in caplog.records if "first speech after" in r.getMessage()]
+    complete = [r.getMessage() for r in caplog.records if "complete after" in r.getMessage()]
+    assert len(first) == 1 and len(complete) == 1
+    first_ms = float(re.search(r"(\d+) ms", first[0]).group(1))
+    complete_ms = float(re.search(r"(\d+) ms", complete[0]).group(1))
+    assert first_ms < complete_ms
+
+
+def test_spoken_budget_still_collects_the_full_answer():
+    engine = TimedEngine()
+    model = TimedModel(latency=0.0, answer=ANSWER, chunk_delay=0.0)
+    cfg = {"ai_filler_enabled": False, "ai_tts_max_chars": 40}
+    answer = jarvis.stream_ai_answer_to_tts(engine, cfg, model, "capital of france?", logging.getLogger("test"))
+    assert jarvis.wait_speech_idle(engine, 5)
+    assert answer == ANSWER
+    said = [text for _, text in engine.spoken_at]
+    assert sum(len(text) for text in said) <= 40
+    assert said[0] == "Paris is the capital of France."
@@ -0,0 +1,39 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+import jarvis
+from replay_bench import FakeGeminiModel, RecordingEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_ai_or_search_makes_one_call_and_returns_the_answer(stream):
+    model = FakeGeminiModel(latency=0, chunk_delay=0)
+    cfg = {"ai_stream_answers": stream, "also_open_web_on_ai_answer": False, "ai_filler_enabled": False}
+    engine = RecordingEngine()
+    result = jarvis.ai_or_search(engine, cfg, model, "why is the sky blue", logging.getLogger("test"))
+    jarvis.wait_speech_idle(engine, 5)
+    assert model.calls == 1
+    assert result["handled"] and result["source"] == "ai"
+    assert result["text"].startswith("This is a benchmark answer.")
+    assert result["ms"] >= 0
+    assert engine.spoken
+
+
+def test_main_loop_makes_one_ai_call_per_question(tmp_path):
+    questions = ["what is the speed of light", "who painted the mona lisa", "how do airplanes fly",
+                 "why do cats purr", "explain the theory of relativity"]
+    script = tmp_path / "session.txt"
+    script.write_text("".join(f"jarvis {q}\n" for q in questions), encoding="utf-8")
+    out = subprocess.run([sys.executable, os.path.join(ROOT, "replay_bench.py"), str(script), "--ai-latency", "0"],
+                         capture_output=True, text=True, cwd=ROOT, timeout=120)
+    assert out.returncode == 0, out.stderr
+    report = json.loads(out.stdout)
+    assert report["turns"] == len(questions)
+    assert report["ai_calls"] == len(questions)
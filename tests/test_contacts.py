@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+import jarvis
+
+CONTACTS = {
+    "dana": {"phone": "+15550001"},
+    "mom": {"phone": "+15550002", "aliases": ["mummy", "mother"]},
+    "venu": {"phone": "+15550003", "email": "venu@example.com"},
+}
+
+
+@pytest.fixture
+def contacts(tmp_path, monkeypatch):
+    path = tmp_path / "contacts.json"
+    path.write_text(json.dumps(CONTACTS), encoding="utf-8")
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"call_handler": "whatsapp"}), encoding="utf-8")
+    monkeypatch.setattr(jarvis, "RUNTIME", jarvis.RuntimeState(config_path=str(config), contacts_path=str(path),
+                                                              custom_cmds_path=str(tmp_path / "custom.json")))
+    spoken, opened = [], []
+    monkeypatch.setattr(jarvis, "speak", lambda engine, text, *a, **k: spoken.append(text))
+    monkeypatch.setattr(jarvis.webbrowser, "open", opened.append)
+    jarvis.PENDING_CONTACT_ACTION.clear()
+    return spoken, opened
+
+
+def test_resolve_reports_fuzzy_matches(contacts):
+    assert jarvis.resolve_contact("dana")[::2] == ("dana", False)
+    assert jarvis.resolve_contact("mummy")[::2] == ("mom", False)
+    assert jarvis.resolve_contact("venu's")[::2] == ("venu", False)
+    assert jarvis.resolve_contact("dina")[::2] == ("dana", True)
+    assert jarvis.resolve_contact("zebediah") == (None, None, False)
+
+
+def test_fuzzy_call_asks_before_dialing(contacts):
+    spoken, opened = contacts
+    intent, arg = jarvis.contact_intent_from_text("please call dina now")
+    assert (intent, arg) == ("call", "dina")
+    jarvis.execute_intent(None, intent, arg)
+    assert opened == []
+    assert spoken == ["Did you mean dana? Say yes to call them."]
+    assert jarvis.contact_confirmation_pending()
+
+    jarvis.run_contact_confirmation(None, *jarvis.take_contact_confirmation("yes please"))
+    assert opened == ["whatsapp://send?phone=+15550001"]
+    assert not jarvis.contact_confirmation_pending()
+
+
+def test_no_or_another_command_drops_the_fuzzy_action(contacts):
+    spoken, opened = contacts
+    jarvis.execute_intent(None, "message", ("dina", "running late"))
+    assert jarvis.take_contact_confirmation("no") == ("cancel", None)
+    jarvis.execute_intent(None, "call", "dina")
+    assert jarvis.take_contact_confirmation("what time is it") is None
+    assert jarvis.take_contact_confirmation("yes") is None
+    assert opened == []
+
+
+def test_exact_and_alias_matches_act_at_once(contacts):
+    spoken, opened = contacts
+    jarvis.execute_intent(None, "call", "mother")
+    assert opened == ["whatsapp://send?phone=+15550002"]
+    assert not jarvis.contact_confirmation_pending()
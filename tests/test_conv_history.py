@@ -0,0 +1,95 @@
+import json
+import time
+
+from conv_history import ConvHistoryWriter, read_tail
+
+
+def test_failed_flush_keeps_lines_in_order(tmp_path, monkeypatch):
+    path = tmp_path / "conv-history.jsonl"
+    writer = ConvHistoryWriter(str(path), flush_interval=3600, batch_size=10 ** 6)
+    writer.append({"ts": "2024-01-01T00:00:00", "input": "one"})
+    writer.append({"ts": "2024-01-01T00:00:01", "input": "two"})
+
+    def disk_full():
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(writer, "_rotate_if_needed", disk_full)
+    writer.flush()
+    assert not path.exists()
+
+    writer.append({"ts": "2024-01-01T00:00:02", "input": "three"})
+    monkeypatch.undo()
+    writer.flush()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["input"] for line in lines] == ["one", "two", "three"]
+    assert [e["input"] for e in read_tail(str(path), 2)] == ["two", "three"]
+
+
+def entry(i, ts="2024-01-01T00:00:00"):
+    return {"ts": ts, "input": f"command {i}"}
+
+
+def test_pending_lines_are_capped_while_the_disk_stays_broken(tmp_path, monkeypatch, caplog):
+    writer = ConvHistoryWriter(str(tmp_path / "h.jsonl"), flush_interval=3600, batch_size=10 ** 6, max_pending=5)
+
+    def disk_full():
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(writer, "_rotate_if_needed", disk_full)
+    for i in range(8):
+        writer.append(entry(i))
+    writer.flush()
+    writer.flush()
+    assert [json.loads(line)["input"] for line in writer._pending] == [f"command {i}" for i in range(3, 8)]
+    assert "dropped 3 oldest" in caplog.text
+
+
+def test_rotates_by_size_and_read_tail_spans_rotated_files(tmp_path):
+    path = tmp_path / "h.jsonl"
+    writer = ConvHistoryWriter(str(path), max_bytes=400, backup_count=2, flush_interval=3600, batch_size=10 ** 6)
+    for i in range(40):
+        writer.append(entry(i))
+        if i % 5 == 4:
+            writer.flush()
+    assert path.exists() and (tmp_path / "h.jsonl.1").exists() and (tmp_path / "h.jsonl.2").exists()
+    assert not (tmp_path / "h.jsonl.3").exists()
+    current = len(path.read_text(encoding="utf-8").splitlines())
+    tail = [e["input"] for e in read_tail(str(path), current + 7)]
+    assert tail == [f"command {i}" for i in range(40 - current - 7, 40)]
+    everything = read_tail(str(path), 1000)
+    assert everything[-1]["input"] == "command 39"
+    assert len(everything) < 40  # the oldest file was dropped
+
+
+def test_rotates_by_age(tmp_path):
+    path = tmp_path / "h.jsonl"
+    path.write_text(json.dumps(entry("old", ts="2000-01-01T00:00:00")) + "\n", encoding="utf-8")
+    writer = ConvHistoryWriter(str(path), max_age_days=1, flush_interval=3600, batch_size=10 ** 6)
+    writer.append(entry("new"))
+    writer.flush()
+    assert [e["input"] for e in read_tail(str(path), 1)] == ["command new"]
+    assert json.loads((tmp_path / "h.jsonl.1").read_text(encoding="utf-8"))["input"] == "command old"
+    assert [e["input"] for e in read_tail(str(path), 5)] == ["command old", "command new"]
+
+
+def test_bench_append_cost_does_not_grow_with_history_size(tmp_path):
+    """Per-append cost (append + its share of the flush) with 10k and 1M entries on disk."""
+    line = (json.dumps(entry(0)) + "\n").encode("utf-8")
+    results = {}
+    for existing in (10_000, 1_000_000):
+        path = tmp_path / f"h{existing}.jsonl"
+        path.write_bytes(line * existing)
+        writer = ConvHistoryWriter(str(path), max_bytes=1 << 40, max_age_days=0,
+                                   flush_interval=3600, batch_size=10 ** 6)
+        writer.flush()  # nothing pending: no I/O yet
+        started = time.perf_counter()
+        for i in range(2000):
+            writer.append(entry(i))
+            if i % 64 == 63:
+                writer.flush()
+        writer.flush()
+        results[existing] = (time.perf_counter() - started) / 2000
+        assert read_tail(str(path), 1)[0]["input"] == "command 1999"
+        path.unlink()
+    assert results[1_000_000] < results[10_000] * 3 + 20e-6
+    assert results[1_000_000] < 200e-6
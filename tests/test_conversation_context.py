@@ -0,0 +1,56 @@
+import jarvis
+
+
+def overhead(ctx, question, now):
+    return len(ctx.prompt(question, now)) - len(question)
+
+
+def test_prompt_stays_bounded_over_1000_turns():
+    ctx = jarvis.ConversationContext(120, budget_chars=600, summary_chars=200)
+    now = 0.0
+    largest = 0
+    for i in range(1000):
+        now += 5
+        question = f"follow-up {i} " + "about the weather " * (i % 7)
+        largest = max(largest, overhead(ctx, question, now))
+        ctx.add(question, " ".join(f"Sentence {j} of answer {i}." for j in range(i % 15 + 1)), now)
+        assert ctx.turn_chars <= ctx.budget and len(ctx.summary) <= ctx.summary_chars
+    assert 0 < largest <= ctx.max_chars()
+    report = jarvis.simulate_conversation_context({"conversation_window_seconds": 60}, 1000)
+    assert report["bounded"] and report["expired_sessions"] > 0
+
+
+def test_old_turns_are_compacted_into_the_summary():
+    ctx = jarvis.ConversationContext(120, budget_chars=120, summary_chars=200)
+    ctx.add("who wrote hamlet", "Shakespeare wrote it. It was around 1600.", now=1)
+    ctx.add("when was he born", "He was born in 1564. In Stratford.", now=2)
+    ctx.add("where did he die", "He died in Stratford too.", now=3)
+    assert [t.split("\n")[0] for t in ctx.turns] == ["User: where did he die"]
+    assert ctx.summary == "who wrote hamlet -> Shakespeare wrote it. | when was he born -> He was born in 1564."
+    prompt = ctx.prompt("and his wife?", now=4)
+    assert prompt.startswith(ctx.HEADER + ctx.SUMMARY_LABEL + ctx.summary + "\n")
+    assert prompt.endswith("User: where did he die\nAssistant: He died in Stratford too.\n"
+                           + ctx.QUESTION_LABEL + "and his wife?")
+
+
+def test_context_resets_after_the_window():
+    ctx = jarvis.ConversationContext(30, budget_chars=500)
+    ctx.add("what's the capital of peru", "Lima.", now=100)
+    assert ctx.prompt("how big is it", now=129) != "how big is it"
+    assert ctx.prompt("how big is it", now=131) == "how big is it"
+    assert not ctx.turns and ctx.summary == ""
+
+
+def test_a_turn_larger_than_the_budget_is_only_summarised():
+    ctx = jarvis.ConversationContext(120, budget_chars=200, summary_chars=100)
+    answer = "First sentence of a long answer. " + "More detail. " * 100
+    ctx.add("tell me everything about rome", answer, now=1)
+    assert not ctx.turns and ctx.turn_chars == 0
+    assert ctx.summary == "tell me everything about rome -> First sentence of a long answer."
+    assert overhead(ctx, "and greece?", now=2) <= ctx.max_chars()
+
+
+def test_disabled_context_leaves_the_question_alone():
+    ctx = jarvis.ConversationContext.from_config({"conversation_window_seconds": 60, "ai_context_enabled": False})
+    ctx.add("q", "a", now=1)
+    assert ctx.prompt("next", now=2) == "next"
@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+import socket
+import stat
+
+import pytest
+
+import cli_command
+import jarvis
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"daemon_port": 0}), encoding="utf-8")
+    monkeypatch.setattr(jarvis, "RUNTIME", jarvis.RuntimeState(config_path=str(config),
+                                                              contacts_path=str(tmp_path / "contacts.json"),
+                                                              custom_cmds_path=str(tmp_path / "custom.json")))
+    token_path = str(tmp_path / "Jarvis" / "daemon.token")
+    monkeypatch.setattr(jarvis, "DAEMON_TOKEN_PATH", token_path)
+    monkeypatch.setattr(cli_command, "DAEMON_TOKEN_PATH", token_path)
+    server = jarvis.start_daemon_server(None, logging.getLogger("test-daemon"))
+    assert server is not None
+    monkeypatch.setattr(cli_command, "daemon_port", lambda: server.server_address[1])
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def raw_request(server, request):
+    with socket.create_connection(server.server_address, timeout=5) as sock:
+        sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline().decode("utf-8"))
+
+
+def test_requests_without_the_token_are_rejected(daemon):
+    assert raw_request(daemon, {"type": "status"}) == {"ok": False, "error": "Unauthorized"}
+    assert raw_request(daemon, {"type": "shutdown", "token": "guess"}) == {"ok": False, "error": "Unauthorized"}
+    assert daemon.jarvis_state["requests"] == 0
+
+
+def test_cli_sends_the_token(daemon):
+    reply = cli_command.daemon_request({"type": "status"}, timeout=5)
+    assert reply["ok"] and reply["pid"] == os.getpid()
+
+
+def test_token_is_new_each_start_and_private(daemon, tmp_path):
+    with open(jarvis.DAEMON_TOKEN_PATH, encoding="utf-8") as f:
+        first = f.read()
+    assert len(first) == 64 and first == daemon.jarvis_state["token"]
+    assert jarvis.write_daemon_token() != first
+    if os.name == "posix":
+        assert stat.S_IMODE(os.stat(jarvis.DAEMON_TOKEN_PATH).st_mode) == 0o600
+
+
+# Makes the no-daemon child process start like the real one, minus Windows, speakers and the repo's logs/
+CHILD_SITECUSTOMIZE = """
+from replay_bench import install_platform_stubs, RecordingEngine
+install_platform_stubs()
+import jarvis
+jarvis.init_tts = lambda cfg: RecordingEngine()
+jarvis.LOG_DIR = {log_dir!r}
+jarvis.LOG_FILE = {log_dir!r} + "/jarvis.log"
+"""
+
+
+def test_bench_round_trip_with_and_without_the_daemon(daemon, tmp_path, monkeypatch):
+    from replay_bench import RecordingEngine
+
+    engine = RecordingEngine()
+    daemon.jarvis_state["engine"] = engine
+    site = tmp_path / "site"
+    site.mkdir()
+    (site / "sitecustomize.py").write_text(CHILD_SITECUSTOMIZE.format(log_dir=str(tmp_path)), encoding="utf-8")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(filter(None, [str(site), root, os.environ.get("PYTHONPATH")])))
+    report = jarvis.benchmark_daemon("what time is it", runs=3)
+    print(json.dumps(report))
+    assert "error" not in report, report
+    assert daemon.jarvis_state["requests"] == 3 + 1  # the status probe found this daemon
+    assert jarvis.wait_speech_idle(engine, 5)
+    assert len(engine.spoken) == 3
+    assert report["with_daemon"]["p50_ms"] < report["without_daemon"]["p50_ms"]
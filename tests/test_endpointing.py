@@ -0,0 +1,48 @@
+import struct
+
+import jarvis
+
+
+def test_wav_source_is_an_audio_source(tmp_path, write_wav):
+    path = write_wav(tmp_path / "phrase.wav", [(0.5, 0), (0.8, 8000), (1.5, 0)])
+    source = jarvis._WavSource(path)
+    try:
+        audio = jarvis.sr.Recognizer().listen(source, timeout=None, phrase_time_limit=None)
+    finally:
+        source.close()
+    assert isinstance(audio, jarvis.sr.AudioData)
+    assert audio.sample_rate == 16000
+
+
+def test_benchmark_endpointing_runs_both_engines(tmp_path, write_wav):
+    paths = [write_wav(tmp_path / f"p{i}.wav", [(0.5, 0), (0.6 + i * 0.2, 8000), (1.5, 0)]) for i in range(2)]
+    report = jarvis.benchmark_endpointing(paths, {"energy_threshold": 300, "dynamic_energy_threshold": False})
+    assert report["files"] == 2
+    for mode in ("energy", "vad"):
+        assert report[mode]["phrases"] == 2
+        assert report[mode]["median_ms"] >= 0
+    assert report["vad"]["median_ms"] < report["energy"]["median_ms"]
+
+
+def frames(vad, rms, seconds):
+    """16-bit square wave with the given RMS, covering `seconds` of whole frames."""
+    n = int(seconds * 1000 / 20) * vad.frame_bytes // 2
+    value = int(rms)
+    return struct.pack(f"<{n}h", *([value, -value] * (n // 2)))
+
+
+def test_vad_floor_recovers_from_noise_that_starts_after_quiet():
+    vad = jarvis.FrameVAD(16000)
+    vad.update(frames(vad, 2, 3.0))  # a very quiet room drags the floor down
+    assert vad.update(frames(vad, 90, 0.2))  # a fan starts: looks like speech at first
+    assert not vad.update(frames(vad, 90, 3.0))  # but not forever
+    assert vad.update(frames(vad, 2000, 0.2))  # and real speech is still heard over it
+
+
+def test_vad_floor_holds_through_speech_with_pauses():
+    vad = jarvis.FrameVAD(16000)
+    vad.update(frames(vad, 40, 1.0))
+    for _ in range(5):  # 5 s of words with short gaps at room level
+        assert vad.update(frames(vad, 1500, 0.8))
+        assert vad.update(frames(vad, 40, 0.2))
+    assert vad.floor < 100
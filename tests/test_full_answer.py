@@ -0,0 +1,99 @@
+import logging
+import time
+from collections import deque
+
+import pytest
+
+import jarvis
+from replay_bench import FakeGeminiModel, RecordingEngine
+
+FULL = ("Rayleigh scattering makes the sky blue. Short wavelengths scatter more than long ones. "
+        "At sunset the light crosses more air, so the reds win.")
+CFG = {"ai_stream_answers": False, "also_open_web_on_ai_answer": False, "ai_filler_enabled": False,
+       "ai_short_answers": True, "ai_tts_max_chars": 400, "ai_full_answer_baseline_tokens": 100}
+
+
+@pytest.fixture(autouse=True)
+def no_full_answers_yet(monkeypatch):
+    monkeypatch.setattr(jarvis, "FULL_ANSWER_STATS", deque(maxlen=20))
+
+
+def said(engine):
+    assert jarvis.wait_speech_idle(engine, 5)
+    return [item["text"] for item in engine.spoken]
+
+
+def test_savings_before_any_full_answer_use_the_configured_baseline():
+    result = {"text": "x" * 100, "ms": 200.0}
+    jarvis.log_answer_savings(result, {"ai_full_answer_baseline_tokens": 100})
+    assert result["saved_tokens"] == 75  # 400 chars against 100
+    assert result["saved_ms"] == 600.0  # 4x the text at the same speed
+
+
+def test_savings_use_recent_full_answers_once_there_are_some():
+    jarvis.FULL_ANSWER_STATS.extend([(800, 1000.0), (1200, 3000.0)])
+    result = {"text": "x" * 200, "ms": 500.0}
+    jarvis.log_answer_savings(result, {"ai_full_answer_baseline_tokens": 100})
+    assert result["saved_tokens"] == 200
+    assert result["saved_ms"] == 1500.0
+
+
+def test_a_short_answer_logs_its_savings_on_the_first_turn(caplog):
+    model = FakeGeminiModel(latency=0, answer=FULL, chunk_delay=0.001)
+    engine = RecordingEngine()
+    with caplog.at_level(logging.INFO, logger="jarvis"):
+        result = jarvis.ai_or_search(engine, CFG, model, "why is the sky blue", logging.getLogger("test"))
+    assert result["short"] and result["text"] == "Rayleigh scattering makes the sky blue."
+    assert result["saved_tokens"] > 0
+    assert any("against a 100-token full answer" in r.getMessage() for r in caplog.records)
+
+
+def test_full_answer_is_fetched_lazily_once_and_cached():
+    model = FakeGeminiModel(latency=0, answer=FULL, chunk_delay=0)
+    engine = RecordingEngine()
+    last_ai = {"text": "", "query": None, "full": None, "pending": None}
+    result = jarvis.ai_or_search(engine, CFG, model, "why is the sky blue", logging.getLogger("test"))
+    jarvis.remember_ai_answer(last_ai, "why is the sky blue", result, CFG, model)
+    assert model.calls == 1  # the short answer only: nothing fetched until asked
+    jarvis.read_full_ai_answer(engine, CFG, last_ai, model)
+    assert model.calls == 2
+    assert last_ai["full"] == FULL
+    assert len(jarvis.FULL_ANSWER_STATS) == 1
+    jarvis.read_full_ai_answer(engine, CFG, last_ai, model)
+    assert model.calls == 2
+    assert said(engine)[-2:] == [FULL, FULL]
+
+
+def test_prefetch_fetches_right_after_the_short_answer():
+    model = FakeGeminiModel(latency=0, answer=FULL, chunk_delay=0)
+    cfg = dict(CFG, ai_full_answer_prefetch=True)
+    engine = RecordingEngine()
+    last_ai = {"text": "", "query": None, "full": None, "pending": None}
+    result = jarvis.ai_or_search(engine, cfg, model, "why is the sky blue", logging.getLogger("test"))
+    jarvis.remember_ai_answer(last_ai, "why is the sky blue", result, cfg, model)
+    assert last_ai["pending"].result(timeout=5) == FULL
+    assert model.calls == 2
+    jarvis.read_full_ai_answer(engine, cfg, last_ai, model)
+    assert model.calls == 2
+    assert said(engine)[-1] == FULL
+
+
+def test_hotkey_returns_at_once_and_presses_share_one_fetch():
+    model = FakeGeminiModel(latency=0.4, answer=FULL, chunk_delay=0)
+    engine = RecordingEngine()
+    last_ai = {"text": "Rayleigh scattering makes the sky blue.", "query": "why is the sky blue",
+               "full": None, "pending": None}
+    started = time.perf_counter()
+    presses = [jarvis.start_read_full_ai_answer(engine, CFG, last_ai, model) for _ in range(2)]
+    assert time.perf_counter() - started < 0.2
+    for thread in presses:
+        thread.join(5)
+    assert model.calls == 1
+    assert said(engine) == [FULL, FULL]
+
+
+def test_hotkey_without_an_answer_says_so():
+    engine = RecordingEngine()
+    jarvis.start_read_full_ai_answer(engine, CFG, {"text": "", "query": None, "full": None, "pending": None},
+                                     None).join(5)
+    assert said(engine) == ["I don't have an answer to read yet"]
@@ -0,0 +1,130 @@
+import socket
+import statistics
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+import jarvis
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Keep-alive handler that plays back `script` (status codes, then 200) and counts what it saw."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    script = []
+    delay = 0.0
+    etag = None
+    connections = 0
+    requests = []
+
+    def setup(self):
+        type(self).connections += 1
+        super().setup()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests.append(dict(self.headers))
+        if cls.delay:
+            time.sleep(cls.delay)
+        status = cls.script.pop(0) if cls.script else 200
+        if status == 200 and cls.etag and self.headers.get("If-None-Match") == cls.etag:
+            status = 304
+        body = b"" if status == 304 else b'{"n": %d}' % len(cls.requests)
+        self.send_response(status)
+        if cls.etag:
+            self.send_header("ETag", cls.etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server(http_server, monkeypatch):
+    handler = type("ScriptedHandler", (Handler,), {"script": [], "requests": [], "connections": 0})
+    monkeypatch.setattr(jarvis, "HTTP_SESSION", None)
+    monkeypatch.setattr(jarvis, "HTTP_VALIDATORS", jarvis.OrderedDict())
+    monkeypatch.setattr(jarvis.random, "random", lambda: 0.0)  # shortest backoff: 0.15 s, 0.3 s, ...
+    return handler, http_server(handler)
+
+
+def test_retries_5xx_and_429_with_backoff(server):
+    handler, url = server
+    handler.script = [503, 429]
+    started = time.perf_counter()
+    r = jarvis.http_get(url + "/flaky", retries=2)
+    elapsed = time.perf_counter() - started
+    assert r.status_code == 200
+    assert len(handler.requests) == 3
+    assert elapsed >= 0.15 + 0.3
+
+
+def test_gives_up_after_retries_and_returns_the_last_response(server):
+    handler, url = server
+    handler.script = [500, 502, 504]
+    r = jarvis.http_get(url + "/down", retries=1)
+    assert r.status_code == 502
+    assert len(handler.requests) == 2
+
+
+def test_client_errors_are_not_retried(server):
+    handler, url = server
+    handler.script = [404]
+    assert jarvis.http_get(url + "/missing").status_code == 404
+    assert len(handler.requests) == 1
+
+
+def test_etag_revalidation_reuses_the_cached_response(server):
+    handler, url = server
+    handler.etag = '"v1"'
+    first = jarvis.http_get(url + "/weather")
+    second = jarvis.http_get(url + "/weather")
+    assert handler.requests[1].get("If-None-Match") == '"v1"'
+    assert second is first
+    assert second.json() == {"n": 1}
+    assert jarvis.http_get(url + "/weather", conditional=False).json() == {"n": 3}
+
+
+def test_read_timeout_is_retried_then_raised(server):
+    handler, url = server
+    handler.delay = 0.5
+    with pytest.raises(jarvis.requests.Timeout):
+        jarvis.http_get(url + "/slow", read_timeout=0.1, retries=1)
+    assert len(handler.requests) == 2
+
+
+def test_connection_refused_is_retried_then_raised(server):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()  # nothing listens here any more
+    started = time.perf_counter()
+    with pytest.raises(jarvis.requests.ConnectionError):
+        jarvis.http_get(f"http://127.0.0.1:{port}/", connect_timeout=0.5, retries=1)
+    assert time.perf_counter() - started >= 0.15
+
+
+def test_bench_pooled_session_reuses_one_connection(server):
+    """Median latency of 30 repeated GETs: pooled keep-alive session vs a fresh connection each time."""
+    handler, url = server
+
+    def median_ms(get):
+        times = []
+        for _ in range(30):
+            started = time.perf_counter()
+            get(url + "/repeat").raise_for_status()
+            times.append((time.perf_counter() - started) * 1000)
+        return statistics.median(times)
+
+    fresh = median_ms(lambda u: jarvis.requests.get(u, headers={"Connection": "close"}, timeout=5))
+    fresh_connections = handler.connections
+    pooled = median_ms(lambda u: jarvis.http_get(u, conditional=False))
+    print(f"fresh {fresh:.2f} ms, pooled {pooled:.2f} ms")
+    assert fresh_connections == 30
+    assert handler.connections - fresh_connections == 1
+    assert pooled < fresh * 1.5
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB_SECONDS = 0.3
+# Optional backends jarvis must not import at startup, as files under a stub directory.
+# requests is left out: speech_recognition imports it on its own.
+HEAVY_STUBS = {
+    "google/__init__.py": "",
+    "google/generativeai/__init__.py": None,
+    "pywhatkit.py": None,
+    "pyautogui.py": None,
+    "pygetwindow.py": None,
+    "vosk.py": "Model = KaldiRecognizer = object\n",
+    "pycaw/__init__.py": "",
+    "pycaw/pycaw.py": "AudioUtilities = IAudioEndpointVolume = object\n",
+    "comtypes.py": "CLSCTX_ALL = 0\n",
+    "screen_brightness_control.py": None,
+    "numpy.py": None,
+}
+
+PROBE = """
+import json, sys, time
+from replay_bench import install_platform_stubs
+install_platform_stubs()
+started = time.perf_counter()
+import jarvis
+elapsed = time.perf_counter() - started
+loaded = sorted(name for name in jarvis.LAZY_BACKENDS
+                if name != "requests" and jarvis.LAZY_BACKENDS[name]._module in sys.modules)
+report = jarvis.import_time_report(load_all=True)
+print(json.dumps({"seconds": elapsed, "loaded": loaded, "report": report}))
+"""
+
+
+def test_import_jarvis_stays_under_budget_with_slow_backends(tmp_path):
+    for rel, body in HEAVY_STUBS.items():
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        slow = "" if rel.endswith("/__init__.py") and body == "" else f"import time\ntime.sleep({STUB_SECONDS})\n"
+        path.write_text(slow + (body or ""), encoding="utf-8")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([str(tmp_path), ROOT] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+    out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, cwd=ROOT, env=env, timeout=60)
+    assert out.returncode == 0, out.stderr
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    assert result["loaded"] == []
+    assert result["seconds"] < 1.0  # any one eager backend import would cost STUB_SECONDS
+    # Once loaded, the report attributes the stubbed cost to each backend module
+    slow = {line.split()[2] for line in result["report"]
+            if not line.startswith("not loaded") and float(line.split()[0]) >= STUB_SECONDS * 900}
+    expected = {"google.generativeai", "pywhatkit", "pyautogui", "pygetwindow", "vosk",
+                "pycaw.pycaw", "comtypes", "screen_brightness_control", "numpy"}
+    assert expected <= slow
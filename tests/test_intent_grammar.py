@@ -0,0 +1,37 @@
+import json
+import os
+import time
+
+import jarvis
+
+GOLDEN = os.path.join(os.path.dirname(__file__), "data", "intent_golden.jsonl")
+
+
+def load_golden():
+    with open(GOLDEN, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_grammar_matches_the_old_if_chain():
+    # intent_golden.jsonl holds the outputs of the if-chain parse_intent it replaced
+    mismatches = []
+    for case in load_golden():
+        got = json.loads(json.dumps(jarvis.parse_intent(case["text"], {})))
+        if got != [case["intent"], case["arg"]]:
+            mismatches.append((case["text"], got, [case["intent"], case["arg"]]))
+    assert mismatches == []
+
+
+def test_custom_commands_take_priority():
+    custom = {"what time is it": {"action": "open_site", "target": "github"}}
+    assert jarvis.parse_intent("What time is it", custom) == ("open_site", "github")
+
+
+def test_parses_per_second():
+    texts = [case["text"] for case in load_golden()] * 5
+    started = time.perf_counter()
+    for text in texts:
+        jarvis.parse_intent(text, {})
+    rate = len(texts) / (time.perf_counter() - started)
+    print(f"{rate:.0f} parses/s over {len(texts)} transcripts")
+    assert rate > 10000
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+import jarvis
+
+CORPUS = os.path.join(os.path.dirname(__file__), "data", "router_corpus.tsv")
+
+pytestmark = pytest.mark.skipif(not jarvis.np, reason="NumPy is not installed")
+
+
+@pytest.fixture(autouse=True)
+def no_history(monkeypatch, tmp_path):
+    monkeypatch.setattr(jarvis, "CONV_HISTORY_PATH", str(tmp_path / "conv-history.jsonl"))
+    monkeypatch.setitem(jarvis.INTENT_CLASSIFIER, "model", None)
+
+
+def test_tuning_corpus_has_no_wrong_actions():
+    report = jarvis.evaluate_local_router({}, CORPUS)
+    assert report["wrong_actions"] == []
+    assert report["command_coverage"] >= 0.7
+
+
+@pytest.mark.parametrize("text", [
+    "quit chrome", "shut down the computer", "goodbye for now", "see you", "goodbye",
+    "turn off the lights", "turn off wifi", "open the pod bay doors", "read more about mars", "stop the timer",
+])
+def test_exit_and_lookalikes_go_to_the_ai(text):
+    assert jarvis.local_route_intent(text, {}) == (None, None, False)
+
+
+def test_routes_known_commands():
+    assert jarvis.local_route_intent("make the music louder", {}) == ("volume", "up", True)
+    assert jarvis.local_route_intent("next track please", {}) == ("media", "next", True)
+
+
+def test_history_skips_rows_the_local_router_decided():
+    rows = [
+        {"input": "stop the timer", "executed_intent": "media", "arg": "play_pause", "routed_by": "local"},
+        {"input": "what is a quasar", "ai_source": "ai", "routed_by": "local"},
+        {"input": "crank it", "executed_intent": "volume", "arg": "up", "routed_by": "ai"},
+        {"input": "open notepad please", "executed_intent": "open_app", "arg": "notepad", "routed_by": "ai"},
+        {"input": "why is grass green", "ai_source": "ai", "routed_by": "ai"},
+    ]
+    assert jarvis.router_examples_from_history(rows) == [
+        ("crank it", "volume:up"), ("open notepad please", "ai"), ("why is grass green", "none")]
+
+
+# Phrasings with a direction word the shared words can outweigh. Not in the tuning
+# corpus: these check the contradiction guard, not the thresholds.
+OPPOSITES = [
+    ("turn the volume down", "volume:up"), ("turn the volume down on the tv", "volume:up"),
+    ("turn the volume down a little", "volume:up"), ("turn down the volume on the speakers", "volume:up"),
+    ("turn the volume up on the tv", "volume:down"), ("make the screen darker please", "brightness:up"),
+    ("turn the brightness up", "brightness:down"), ("skip back a song", "media:next"),
+    ("go back to the previous track", "media:next"), ("play the next song", "media:previous"),
+]
+
+
+@pytest.mark.parametrize("text, never", OPPOSITES)
+def test_never_acts_on_the_opposite_direction(text, never):
+    intent, arg, _ = jarvis.local_route_intent(text, {})
+    assert f"{intent}:{arg}" != never
+
+
+def test_contradicted_label_is_declined_even_when_it_wins():
+    # Without "down" seeds, "turn the volume" makes volume:up the confident winner
+    model = jarvis.IntentClassifier([("turn the volume up", "volume:up"), ("lower the volume", "volume:down"),
+                                     ("what is the capital of france", "none")])
+    label, score, margin = model.predict_margin("turn the volume down")
+    assert label == "volume:up" and score >= 0.5 and margin >= 0.15
+    assert jarvis.local_router_decision(model, "turn the volume down", {}) is None
+
+
+def test_turn_the_volume_down_lowers_it():
+    assert jarvis.local_route_intent("turn the volume down", {}) == ("volume", "down", True)
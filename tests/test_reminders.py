@@ -0,0 +1,97 @@
+import json
+import random
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import jarvis
+
+COUNT = 100_000
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_100k_reminders_memory_order_and_jitter(tmp_path, monkeypatch):
+    writes = []
+    real_write = jarvis.write_json_atomic
+    monkeypatch.setattr(jarvis, "write_json_atomic", lambda path, data: (writes.append(len(data)), real_write(path, data)))
+    clock = FakeClock(datetime(2024, 1, 1, 9, 0))
+    fired = []
+    scheduler = jarvis.ReminderScheduler(lambda message: fired.append((clock.now, message)),
+                                         path=str(tmp_path / "reminders.json"), clock=clock)
+    rng = random.Random(7)
+    due = {}
+    tracemalloc.start()
+    for i in range(COUNT):
+        when = clock.now + timedelta(seconds=rng.uniform(1, 3600))
+        due[f"r{i}"] = when
+        scheduler.add(when, f"r{i}", persist=False)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak / COUNT < 1024  # bytes per pending reminder
+
+    scheduler.persist()
+    scheduler.flush()
+    assert writes == [COUNT]
+
+    step = timedelta(seconds=1)
+    end = clock.now + timedelta(seconds=3601)
+    while clock.now < end:
+        clock.now += step
+        scheduler.run_due()
+    assert len(fired) == COUNT
+    assert sorted(m for _, m in fired) == sorted(due)
+    jitter = [(at - due[m]).total_seconds() for at, m in fired]
+    assert 0 <= min(jitter) and max(jitter) <= step.total_seconds()
+    assert [at for at, _ in fired] == sorted(at for at, _ in fired)
+    assert writes == [COUNT]  # firing only marks the list dirty
+    scheduler.flush()
+    assert json.loads((tmp_path / "reminders.json").read_text(encoding="utf-8")) == []
+
+
+def test_scheduler_thread_fires_on_time_and_batches_writes(tmp_path, monkeypatch):
+    writes = []
+    real_write = jarvis.write_json_atomic
+    monkeypatch.setattr(jarvis, "write_json_atomic", lambda path, data: (writes.append(len(data)), real_write(path, data)))
+    lateness = []
+    done = threading.Event()
+    n = 2000
+
+    def on_fire(message):
+        lateness.append((datetime.now() - due[message]).total_seconds())
+        if len(lateness) == n:
+            done.set()
+
+    scheduler = jarvis.ReminderScheduler(on_fire, path=str(tmp_path / "reminders.json"), persist_delay=0.2)
+    scheduler.start()
+    start = datetime.now() + timedelta(seconds=0.5)
+    due = {f"r{i}": start + timedelta(milliseconds=i % 1000) for i in range(n)}
+    for message, when in due.items():
+        scheduler.add(when, message)
+    assert done.wait(10)
+    scheduler.stop()
+    assert len(writes) < 20  # batched, not one rewrite per add
+    lateness.sort()
+    assert lateness[0] >= 0
+    assert lateness[int(n * 0.99)] < 0.1
+    saved = json.loads((tmp_path / "reminders.json").read_text(encoding="utf-8"))
+    assert saved == []
+
+
+def test_changes_are_saved_within_the_delay(tmp_path):
+    path = tmp_path / "reminders.json"
+    scheduler = jarvis.ReminderScheduler(lambda m: None, path=str(path), persist_delay=0.05)
+    scheduler.start()
+    scheduler.add(datetime.now() + timedelta(hours=1), "stretch")
+    deadline = time.monotonic() + 2
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [r["message"] for r in json.loads(path.read_text(encoding="utf-8"))] == ["stretch"]
+    scheduler.stop()
@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+
+import jarvis
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+        self.refreshed = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls > 1:
+            self.refreshed.set()
+        return self.calls
+
+
+def test_hit_stale_and_miss_counts(monkeypatch, tmp_path):
+    monkeypatch.setitem(jarvis.RESPONSE_TTLS, "test", (0.2, 0.4))
+    cache = jarvis.ResponseCache(str(tmp_path / "responses.json"))
+    fetch = Counter()
+    assert cache.get_or_fetch("test", "x", fetch) == 1  # miss: fetched inline
+    assert cache.get_or_fetch("test", " X ", fetch) == 1  # same key, fresh
+    time.sleep(0.25)
+    assert cache.get_or_fetch("test", "x", fetch) == 1  # stale: old value now...
+    assert fetch.refreshed.wait(2)  # ...refreshed in the background
+    time.sleep(0.05)
+    assert cache.get_or_fetch("test", "x", fetch) == 2
+    time.sleep(0.65)
+    assert cache.get_or_fetch("test", "x", fetch) == 3  # past the stale window: inline again
+    assert cache.stats == {"hits": 2, "stale_hits": 1, "misses": 2, "evictions": 0}
+    assert json.loads((tmp_path / "responses.json").read_text())["test:x"][1] == 3
+
+
+def test_stale_refresh_runs_once_per_key(monkeypatch, tmp_path):
+    monkeypatch.setitem(jarvis.RESPONSE_TTLS, "test", (0.0, 60))
+    cache = jarvis.ResponseCache(str(tmp_path / "responses.json"))
+    cache.put(cache.key("test", "x"), "old")
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        release.wait(2)
+        return "new"
+
+    assert [cache.get_or_fetch("test", "x", slow_fetch) for _ in range(5)] == ["old"] * 5
+    release.set()
+    time.sleep(0.1)
+    assert len(calls) == 1
+    assert cache.stats["stale_hits"] == 5
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = jarvis.ResponseCache(str(tmp_path / "responses.json"), max_entries=2)
+    cache.get_or_fetch("wiki", "a", lambda: "A")
+    cache.get_or_fetch("wiki", "b", lambda: "B")
+    cache.get_or_fetch("wiki", "a", lambda: "unused")  # a is now the most recent
+    cache.get_or_fetch("wiki", "c", lambda: "C")
+    assert cache.stats["evictions"] == 1
+    assert cache.get_or_fetch("wiki", "a", lambda: "refetched") == "A"
+    assert cache.get_or_fetch("wiki", "b", lambda: "refetched") == "refetched"
+
+
+def test_bare_weather_uses_the_prefetched_default_location(monkeypatch, tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"default_location": "London"}), encoding="utf-8")
+    monkeypatch.setattr(jarvis, "RUNTIME", jarvis.RuntimeState(config_path=str(config),
+                                                               contacts_path=str(tmp_path / "contacts.json"),
+                                                               custom_cmds_path=str(tmp_path / "custom.json")))
+    cache = jarvis.ResponseCache(str(tmp_path / "responses.json"))
+    monkeypatch.setattr(jarvis, "RESPONSE_CACHE", cache)
+    fetched = []
+
+    def fetch_weather(loc):
+        fetched.append(loc)
+        return {"temp_c": 12, "feels_c": 10, "desc": "cloudy"}
+
+    monkeypatch.setattr(jarvis, "fetch_weather", fetch_weather)
+    monkeypatch.setattr(jarvis, "fetch_news", lambda topic: ["headline"])
+    said = []
+    monkeypatch.setattr(jarvis, "speak", lambda engine, text, *a, **k: said.append(text))
+    jarvis.start_prefetcher({"prefetch_enabled": True}, jarvis.logging.getLogger("test"))
+    for _ in range(100):
+        if cache.key("news", "") in cache._entries:
+            break
+        time.sleep(0.02)
+    jarvis.execute_intent(None, "weather", None)
+    assert fetched == ["London"]  # only the prefetch went to the network
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 0
+    assert said == ["Weather in London: 12 degrees, feels like 10, cloudy"]
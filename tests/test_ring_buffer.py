@@ -0,0 +1,94 @@
+import threading
+
+import jarvis
+
+
+class ListStream:
+    """Microphone stand-in that hands out prepared frames, then ends."""
+
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def read(self, size):
+        return self.frames.pop(0) if self.frames else b""
+
+
+def test_read_wraps_around_the_end_of_the_ring():
+    ring = jarvis.AudioRingBuffer(10)
+    ring.write(b"abcdef")
+    ring.write(b"ghijkl")
+    pos, views = ring.read(6, 6, timeout=0)
+    assert pos == 6
+    assert len(views) == 2
+    assert b"".join(views) == b"ghijkl"
+
+
+def test_lapped_reader_jumps_to_the_oldest_byte():
+    ring = jarvis.AudioRingBuffer(10)
+    ring.write(b"0123456789")
+    ring.write(b"abcde")
+    pos, views = ring.read(0, 4, timeout=0)
+    assert pos == ring.oldest_pos() == 5
+    assert b"".join(views) == b"5678"
+
+
+def test_read_times_out_and_ends_when_closed():
+    ring = jarvis.AudioRingBuffer(10)
+    ring.write(b"abc")
+    assert ring.read(0, 5, timeout=0.01) == (0, [])
+    ring.close()
+    assert ring.read(0, 5, timeout=1) == (0, [])
+
+
+def test_read_waits_for_the_writer():
+    ring = jarvis.AudioRingBuffer(16)
+    threading.Timer(0.05, ring.write, args=(b"hello",)).start()
+    pos, views = ring.read(0, 5, timeout=2)
+    assert b"".join(views) == b"hello"
+
+
+def test_ring_stream_hands_out_views_unless_the_read_wraps():
+    capture = jarvis.AudioCapture(ListStream([]), 100, 2, 1, seconds=0.05)  # 10-byte ring
+    source = jarvis.RingBufferSource(capture)
+    capture.ring.write(b"aabbccdd")
+    first = source.stream.read(2)
+    assert isinstance(first, memoryview)
+    assert first.obj is capture.ring._buf
+    assert bytes(first) == b"aabb"
+    capture.ring.write(b"eeffgg")
+    source.stream.read(2)
+    wrapped = source.stream.read(2)  # bytes 8..11 straddle the end of the ring
+    assert isinstance(wrapped, bytes)
+    assert wrapped == b"eeff"
+    assert source.cursor == 12
+
+
+def test_capture_thread_fills_the_ring_and_closes_it():
+    frames = [bytes([i]) * 4 for i in range(5)]
+    capture = jarvis.AudioCapture(ListStream(frames), 100, 2, 2, seconds=1.0)
+    source = jarvis.RingBufferSource(capture)
+    capture.start()
+    got = []
+    while True:
+        buf = source.stream.read(2)
+        if not buf:
+            break
+        got.append(bytes(buf))
+    capture.join(1.0)
+    assert b"".join(got) == b"".join(frames)
+    assert capture.ring.closed
+
+
+def test_skip_to_keeps_preroll_and_never_moves_back():
+    capture = jarvis.AudioCapture(ListStream([]), 100, 2, 2, seconds=10.0)  # 200 bytes/s
+    source = jarvis.RingBufferSource(capture)
+    capture.ring.write(bytes(1000))
+    capture.ring.write_time = 100.0
+    source.skip_to(99.0, preroll=0.5)  # 1 s back is byte 800, half a second of preroll more
+    assert source.cursor == 700
+    source.skip_to(97.0)
+    assert source.cursor == 700
+    capture.ring.write(bytes(2000))  # laps the reader, which never caught up
+    capture.ring.write_time = 110.0
+    source.skip_to(50.0)
+    assert source.cursor == capture.ring.oldest_pos() == 1000
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+import jarvis
+from replay_bench import FakeGeminiModel, RecordingEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ANSWER_PROMPTS = (jarvis.ROUTE_OR_ANSWER_PROMPT, jarvis.ROUTE_OR_SHORT_ANSWER_PROMPT)
+CFG = {"ai_filler_enabled": False, "also_open_web_on_ai_answer": False}
+
+
+class ScriptedModel:
+    """Replies to every prompt with a fixed text, in one streamed chunk."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = 0
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        self.calls += 1
+        response = type("Response", (), {"text": self.reply})()
+        return iter([response]) if stream else response
+
+
+def route_or_answer(model, text, **cfg):
+    engine = RecordingEngine()
+    result = jarvis.ai_route_or_answer(engine, dict(CFG, **cfg), model, text, logging.getLogger("test"))
+    jarvis.wait_speech_idle(engine, 5)
+    return result, [item["text"] for item in engine.spoken]
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_question_is_answered_in_one_call(stream):
+    model = FakeGeminiModel(latency=0, chunk_delay=0, answer_prompts=ANSWER_PROMPTS)
+    result, said = route_or_answer(model, "why is the sky blue", ai_stream_answers=stream)
+    assert model.calls == 1
+    assert result["handled"] and result["source"] == "ai" and result["intent"] is None
+    assert said == ["This is a benchmark answer."]  # short answers: capped to the first sentence
+
+
+@pytest.mark.parametrize("reply", ['{"intent": "volume", "args": {"direction": "up"}}',
+                                   '```json\n{"intent": "volume", "args": {"direction": "up"}}\n```'])
+def test_command_is_routed_from_json(reply):
+    model = ScriptedModel(reply)
+    result, said = route_or_answer(model, "crank it")
+    assert model.calls == 1
+    assert (result["intent"], result["arg"]) == ("volume", "up")
+    assert result["handled"] and said == []
+
+
+def test_invalid_json_is_not_acted_on_or_spoken(caplog):
+    model = ScriptedModel('{"intent": "volume", "args": ')
+    with caplog.at_level(logging.INFO, logger="test"):
+        result, said = route_or_answer(model, "crank it")
+    assert model.calls == 1
+    assert not result["handled"] and result["intent"] is None and said == []
+    assert "invalid JSON" in caplog.text
+
+
+def test_none_route_leaves_the_answer_to_the_fallback():
+    model = ScriptedModel('{"intent": "none", "args": {}}')
+    result, said = route_or_answer(model, "what's up with that")
+    assert not result["handled"] and result["intent"] is None and said == []
+
+
+def replay(tmp_path, lines, *flags):
+    script = tmp_path / "session.txt"
+    script.write_text("".join(f"jarvis {line}\n" for line in lines), encoding="utf-8")
+    out = subprocess.run([sys.executable, os.path.join(ROOT, "replay_bench.py"), str(script), "--ai-latency", "0",
+                          "--ai-chunk-delay", "0", "--no-local-router", *flags],
+                         capture_output=True, text=True, cwd=ROOT, timeout=120)
+    assert out.returncode == 0, out.stderr
+    return json.loads(out.stdout)
+
+
+QUESTIONS = ["why is the sea salty", "who painted the mona lisa", "why do cats purr"]
+
+
+def test_main_loop_questions_take_one_call_combined_and_two_separate(tmp_path):
+    # Requests made by the AI client; the rate limiter may refuse one of a burst before the model sees it
+    assert replay(tmp_path, QUESTIONS)["ai_client"]["calls"] == len(QUESTIONS)
+    assert replay(tmp_path, QUESTIONS, "--routing", "separate")["ai_client"]["calls"] == 2 * len(QUESTIONS)
+
+
+def test_main_loop_routes_a_command_in_one_call(tmp_path):
+    report = replay(tmp_path, ["crank it"], "--route-reply", '{"intent": "volume", "args": {"direction": "up"}}')
+    assert report["ai_calls"] == 1
+    assert "volume" in report["intents"]
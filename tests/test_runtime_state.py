@@ -0,0 +1,91 @@
+import builtins
+import json
+import os
+
+import pytest
+
+import jarvis
+
+
+@pytest.fixture
+def runtime(tmp_path, monkeypatch):
+    files = {
+        "config": {"call_handler": "whatsapp", "default_message_channel": "whatsapp",
+                   "ai_provider": "openai", "openai_api_key": "test-key"},
+        "contacts": {"mom": {"phone": "+15550002", "aliases": ["mother"]}},
+        "custom": {"my repos": {"action": "open_site", "target": "github"}},
+    }
+    paths = {}
+    for name, data in files.items():
+        paths[name] = tmp_path / f"{name}.json"
+        paths[name].write_text(json.dumps(data), encoding="utf-8")
+    state = jarvis.RuntimeState(config_path=str(paths["config"]), contacts_path=str(paths["contacts"]),
+                                custom_cmds_path=str(paths["custom"]))
+    monkeypatch.setattr(jarvis, "RUNTIME", state)
+    monkeypatch.setattr(jarvis, "speak", lambda *a, **k: None)
+    monkeypatch.setattr(jarvis.webbrowser, "open", lambda url: None)
+    opened = []
+    real_open = builtins.open
+
+    def counting_open(file, *args, **kwargs):
+        opened.append(str(file))
+        return real_open(file, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", counting_open)
+    return state, paths, opened
+
+
+def run_commands(state):
+    for text in ("call mom", "message mother: running late", "call my mother please", "my repos"):
+        intent, arg = jarvis.parse_intent(text, state.custom_cmds)
+        if intent == "unknown":
+            intent, arg = jarvis.contact_intent_from_text(text)
+        jarvis.execute_intent(None, intent, arg)
+        state.ai_model()
+
+
+def test_no_file_opens_after_warm_up(runtime):
+    state, paths, opened = runtime
+    run_commands(state)
+    assert opened  # the warm-up read each file once
+    model = state.ai_model()
+    del opened[:]
+    for _ in range(3):
+        run_commands(state)
+    assert opened == []
+    assert state.ai_model() is model
+
+
+def test_edited_file_is_read_again_once(runtime):
+    state, paths, opened = runtime
+    run_commands(state)
+    data = {"mom": {"phone": "+15550002"}, "dad": {"phone": "+15550003"}}
+    paths["contacts"].write_text(json.dumps(data), encoding="utf-8")
+    stat = os.stat(paths["contacts"])
+    os.utime(paths["contacts"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    del opened[:]
+    assert "dad" in state.contacts
+    run_commands(state)
+    assert opened == [str(paths["contacts"])]
+
+
+def test_known_phrases_follow_a_custom_commands_reload(runtime):
+    state, paths, opened = runtime
+    assert "my repos" in jarvis.known_command_phrases(state.custom_cmds)
+    paths["custom"].write_text(json.dumps({"my blog": {"action": "open_site", "target": "example.com"}}),
+                               encoding="utf-8")
+    stat = os.stat(paths["custom"])
+    os.utime(paths["custom"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    phrases = jarvis.known_command_phrases(state.custom_cmds)
+    assert "my blog" in phrases and "my repos" not in phrases
+
+
+def test_known_phrases_cache_holds_the_dict_it_was_built_from():
+    first = {"old phrase": {"action": "open_site", "target": "github"}}
+    assert "old phrase" in jarvis.known_command_phrases(first)
+    # The cache holds the dict, so it stays alive and no new dict can reuse its id
+    assert jarvis._KNOWN_PHRASES["custom_cmds"] is first
+    second = {"new phrase": {"action": "open_site", "target": "github"}}
+    assert id(second) != id(first)
+    phrases = jarvis.known_command_phrases(second)
+    assert "new phrase" in phrases and "old phrase" not in phrases
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import jarvis
+from replay_bench import RecordingEngine
+
+
+class SlowEngine(RecordingEngine):
+    """RecordingEngine whose utterances take time; `speaking` is set while one is playing."""
+
+    def __init__(self):
+        super().__init__(chars_per_second=40.0)
+        self.speaking = threading.Event()
+
+    def runAndWait(self):
+        self.speaking.set()
+        try:
+            super().runAndWait()
+        finally:
+            self.speaking.clear()
+
+
+def said(engine):
+    return [(item["text"], item["interrupted"]) for item in engine.spoken]
+
+
+def test_alarms_jump_ahead_of_queued_chatter():
+    engine = SlowEngine()
+    first = jarvis.speak(engine, "first sentence")
+    assert engine.speaking.wait(2)
+    jarvis.speak(engine, "chatter")
+    jarvis.speak(engine, "Reminder: stretch", priority=jarvis.SPEECH_PRIORITY_ALARM)
+    assert jarvis.wait_speech_idle(engine, 5)
+    assert first.result() is True
+    assert [text for text, _ in said(engine)] == ["first sentence", "Reminder: stretch", "chatter"]
+
+
+def test_cancel_interrupts_and_drops_chatter_but_keeps_alarms():
+    engine = SlowEngine()
+    current = jarvis.speak(engine, "a long answer that is still being read out")
+    assert engine.speaking.wait(2)
+    queued = jarvis.speak(engine, "more of the answer")
+    alarm = jarvis.speak(engine, "Reminder: call mom", priority=jarvis.SPEECH_PRIORITY_ALARM)
+    assert jarvis.cancel_speech(engine) == 1
+    assert queued.cancelled()
+    assert alarm.result(timeout=5) is True
+    assert current.done() and not current.cancelled()
+    assert said(engine) == [("a long answer that is still being read out", True), ("Reminder: call mom", False)]
+
+
+def test_speak_wait_blocks_until_spoken():
+    engine = SlowEngine()
+    started = time.perf_counter()
+    fut = jarvis.speak(engine, "ten chars.", wait=True)
+    assert fut.done() and time.perf_counter() - started >= 0.2
+    assert said(engine) == [("ten chars.", False)]
+
+
+def test_wake_word_in_own_speech_is_an_echo():
+    engine = SlowEngine()
+    jarvis.speak(engine, "Jarvis online. Say my name or use the hotkey.")
+    assert engine.speaking.wait(2)
+    assert jarvis.wake_word_is_echo(engine, "jarvis")
+    assert jarvis.wake_word_is_echo(engine, "Jarvis online, say my name")
+    assert not jarvis.wake_word_is_echo(engine, "jarvis what time is it")  # the user barging in
+    jarvis.cancel_speech(engine)
+    jarvis.speak(engine, "The weather is sunny", wait=True)
+    assert not jarvis.wake_word_is_echo(engine, "jarvis")
+    time.sleep(0.6)
+    assert jarvis.get_speech_worker(engine).saying() is None
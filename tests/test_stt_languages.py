@@ -0,0 +1,123 @@
+"""recognize_google_languages against a local stand-in for the Google speech endpoint.
+Requests are redirected with a urllib opener, so the real recognize_google code path
+(FLAC upload, response parsing, socket timeout) is exercised over HTTP.
+"""
+import json
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import jarvis
+
+
+class FakeSpeechServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeSpeechHandler)
+        self.replies = {}  # lang -> (delay seconds, transcript or None, confidence)
+        self.requested = []
+
+
+class FakeSpeechHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        lang = parse_qs(urlsplit(self.path).query)["lang"][0]
+        self.server.requested.append(lang)
+        delay, text, confidence = self.server.replies[lang]
+        time.sleep(delay)
+        lines = [{"result": []}]
+        if text:
+            lines.append({"result": [{"alternative": [{"transcript": text, "confidence": confidence}],
+                                      "final": True}], "result_index": 0})
+        body = "\n".join(json.dumps(line) for line in lines).encode("utf-8")
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass  # the client gave up at its deadline
+
+    def log_message(self, *args):
+        pass
+
+
+class _ToLocal(urllib.request.BaseHandler):
+    def __init__(self, port):
+        self.port = port
+
+    def http_request(self, req):
+        url = urlsplit(req.full_url)
+        req.full_url = f"http://127.0.0.1:{self.port}{url.path}?{url.query}"
+        return req
+
+
+@pytest.fixture
+def server(monkeypatch):
+    srv = FakeSpeechServer()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    urllib.request.install_opener(urllib.request.build_opener(urllib.request.ProxyHandler({}),
+                                                              _ToLocal(srv.server_address[1])))
+    monkeypatch.setattr(jarvis, "STT_POOL", None)
+    yield srv
+    if jarvis.STT_POOL is not None:
+        jarvis.STT_POOL.shutdown(wait=False, cancel_futures=True)
+    urllib.request.install_opener(None)
+    srv.shutdown()
+    srv.server_close()
+
+
+AUDIO = jarvis.sr.AudioData(b"\x00\x10" * 8000, 16000, 2)
+
+
+def recognize(languages, cfg=None):
+    started = time.perf_counter()
+    text = jarvis.recognize_google_languages(jarvis.sr.Recognizer(), AUDIO, languages, "en-US", cfg or {})
+    return text, time.perf_counter() - started
+
+
+def test_most_confident_language_wins(server):
+    server.replies = {"en-US": (0.05, "kya haal hai", 0.3), "hi-IN": (0.2, "क्या हाल है", 0.9)}
+    text, _ = recognize(["en-US", "hi-IN"])
+    assert text == "क्या हाल है"
+
+
+def test_primary_bonus_breaks_near_ties(server):
+    server.replies = {"en-US": (0.2, "Open Notepad", 0.6), "hi-IN": (0.05, "ओपन नोटपैड", 0.65)}
+    text, _ = recognize(["en-US", "hi-IN"], {"stt_primary_bonus": 0.1})
+    assert text == "open notepad"
+
+
+def test_confident_primary_returns_without_waiting(server):
+    server.replies = {"en-US": (0.05, "what time is it", 0.9), "hi-IN": (2.0, "वॉट टाइम", 0.95)}
+    text, seconds = recognize(["en-US", "hi-IN"])
+    assert text == "what time is it"
+    assert seconds < 1.0
+
+
+def test_deadline_drops_slow_languages(server):
+    server.replies = {"en-US": (3.0, "too late", 0.99), "hi-IN": (0.05, "नमस्ते", 0.6)}
+    text, seconds = recognize(["en-US", "hi-IN"], {"stt_language_deadline": 0.5})
+    assert text == "नमस्ते"
+    assert seconds < 1.5
+
+
+def test_queued_languages_are_cancelled_once_a_winner_is_clear(server):
+    server.replies = {lang: (0.1, f"text {lang}", 0.9) for lang in ("en-US", "fr-FR", "de-DE")}
+    text, _ = recognize(["en-US", "fr-FR", "de-DE"], {"stt_language_workers": 1})
+    assert text == "text en-us"
+    time.sleep(0.3)
+    # The lone worker may already have picked up fr-FR; de-DE was still queued
+    assert server.requested[0] == "en-US"
+    assert "de-DE" not in server.requested
+
+
+def test_no_transcript_in_any_language(server):
+    server.replies = {"en-US": (0.05, None, 0), "hi-IN": (0.05, None, 0)}
+    assert recognize(["en-US", "hi-IN"])[0] == ""
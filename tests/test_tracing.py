@@ -0,0 +1,76 @@
+import json
+import time
+from datetime import datetime, timedelta
+
+import tracing
+from conv_history import ConvHistoryWriter
+
+
+class ListWriter:
+    def __init__(self):
+        self.entries = []
+
+    def append(self, entry):
+        self.entries.append(entry)
+
+
+def test_span_overhead_is_within_budget(tmp_path):
+    assert min(tracing.measure_overhead(20000) for _ in range(3)) <= tracing.SPAN_BUDGET_US
+    # Same loop into the real history writer Jarvis uses for logs/trace.jsonl
+    writer = ConvHistoryWriter(str(tmp_path / "trace.jsonl"), flush_interval=3600, batch_size=10 ** 6)
+    turn = tracing.Tracer(writer).new_turn(intent="bench")
+    started = time.perf_counter()
+    for _ in range(20000):
+        with turn.span("bench"):
+            pass
+    turn.finish()
+    assert (time.perf_counter() - started) * 1e6 / 20000 <= tracing.SPAN_BUDGET_US
+
+
+def test_stage_report_percentiles_from_known_durations():
+    spans = [{"stage": "ai_answer", "ms": float(ms), "intent": "unknown"} for ms in range(1, 101)]
+    spans += [{"stage": "parse_intent", "ms": 0.5, "intent": "time"}, {"stage": "parse_intent", "ms": 1.5, "intent": "date"},
+              {"stage": "broken"}]
+    assert tracing.stage_report(spans) == [
+        {"stage": "ai_answer", "all": None, "count": 100, "p50": 50.0, "p95": 95.0, "p99": 99.0},
+        {"stage": "parse_intent", "all": None, "count": 2, "p50": 0.5, "p95": 1.5, "p99": 1.5},
+    ]
+    by_intent = tracing.stage_report(spans, by="intent")
+    assert [(r["stage"], r["intent"], r["count"]) for r in by_intent] == [
+        ("ai_answer", "unknown", 100), ("parse_intent", "date", 1), ("parse_intent", "time", 1)]
+
+
+def test_turn_spans_carry_turn_tags_and_late_spans_are_written_on_end():
+    writer = ListWriter()
+    turn = tracing.Tracer(writer).new_turn(backend="google")
+    turn.add("parse_intent", 1.0, 1.002)
+    turn.tag(intent="time", routed_by=None)
+    turn.finish()
+    turn.add("speak", 2.0, 2.5)  # speech that finished after the turn
+    assert [(e["stage"], e["intent"], e["backend"]) for e in writer.entries] == [
+        ("parse_intent", "time", "google"), ("turn", "time", "google"), ("speak", "time", "google")]
+    assert writer.entries[0]["ms"] == 2.0 and writer.entries[2]["ms"] == 500.0
+    assert "routed_by" not in writer.entries[0]
+
+
+def test_disabled_tracer_writes_nothing():
+    writer = ListWriter()
+    turn = tracing.Tracer(writer, enabled=False).new_turn()
+    with turn.span("parse_intent"):
+        pass
+    turn.finish()
+    assert writer.entries == []
+
+
+def test_report_reads_rotated_files_within_the_window(tmp_path, capsys):
+    path = tmp_path / "trace.jsonl"
+    now = datetime.now()
+    old = {"ts": (now - timedelta(days=3)).isoformat(), "stage": "ai_answer", "ms": 9000.0}
+    rows = [{"ts": (now - timedelta(minutes=m)).isoformat(), "stage": "ai_answer", "ms": float(m)} for m in (1, 2, 3)]
+    (tmp_path / "trace.jsonl.1").write_text(json.dumps(old) + "\n" + json.dumps(rows[0]) + "\n", encoding="utf-8")
+    path.write_text("".join(json.dumps(r) + "\n" for r in rows[1:]) + "not json\n", encoding="utf-8")
+    assert len(tracing.read_spans(str(path))) == 4
+    assert tracing.main(["--path", str(path), "--window", "24h", "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["stages"] == [{"stage": "ai_answer", "all": None, "count": 3, "p50": 2.0, "p95": 3.0, "p99": 3.0}]
+    assert report["budget_us_per_span"] == tracing.SPAN_BUDGET_US
@@ -0,0 +1,139 @@
+import json
+import time
+
+import pytest
+
+import jarvis
+
+
+class FakeVosk:
+    """Counting stand-ins for vosk.Model and vosk.KaldiRecognizer. load_seconds and
+    decode_factor (decode time per second of audio) give them a real model's costs.
+    """
+
+    def __init__(self, source=None):
+        self.models = 0
+        self.recognizers = []
+        self.source = source
+        self.load_seconds = 0.0
+        self.decode_factor = 0.0
+
+    def Model(self, path):
+        self.models += 1
+        time.sleep(self.load_seconds)
+        return ("model", path)
+
+    def KaldiRecognizer(self, model, rate, grammar=None):
+        fake = self
+
+        class Rec:
+            def __init__(self):
+                self.fed = []  # source position (seconds) at each AcceptWaveform
+                self.resets = 0
+
+            def AcceptWaveform(self, data):
+                time.sleep(len(data) / 32000.0 * fake.decode_factor)
+                self.fed.append(fake.source.position() if fake.source else len(data))
+                return False
+
+            def FinalResult(self):
+                return json.dumps({"text": " hello there "})
+
+            def Reset(self):
+                self.resets += 1
+
+        rec = Rec()
+        self.recognizers.append(rec)
+        return rec
+
+
+@pytest.fixture
+def vosk(monkeypatch, tmp_path):
+    fake = FakeVosk()
+    monkeypatch.setattr(jarvis, "Model", fake.Model)
+    monkeypatch.setattr(jarvis, "KaldiRecognizer", fake.KaldiRecognizer)
+    monkeypatch.setattr(jarvis, "VOSK_MODELS", {})
+    monkeypatch.setattr(jarvis, "VOSK_REC_POOL", {})
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    fake.path = str(model_dir)
+    return fake
+
+
+def test_model_loads_once_and_recognizers_are_recycled(vosk):
+    assert jarvis.get_vosk_model(vosk.path) is jarvis.get_vosk_model(vosk.path)
+    for _ in range(5):
+        rec = jarvis.acquire_vosk_recognizer(vosk.path, 16000)
+        jarvis.release_vosk_recognizer(vosk.path, 16000, rec)
+    assert vosk.models == 1
+    assert len(vosk.recognizers) == 1
+    assert vosk.recognizers[0].resets == 5
+
+
+def test_pool_is_keyed_by_rate_and_grammar(vosk):
+    plain = jarvis.acquire_vosk_recognizer(vosk.path, 16000)
+    wake = jarvis.acquire_vosk_recognizer(vosk.path, 16000, jarvis.WAKE_GRAMMAR)
+    jarvis.release_vosk_recognizer(vosk.path, 16000, plain)
+    jarvis.release_vosk_recognizer(vosk.path, 16000, wake, jarvis.WAKE_GRAMMAR)
+    assert jarvis.acquire_vosk_recognizer(vosk.path, 16000) is plain
+    assert jarvis.acquire_vosk_recognizer(vosk.path, 16000, jarvis.WAKE_GRAMMAR) is wake
+    assert jarvis.acquire_vosk_recognizer(vosk.path, 8000) not in (plain, wake)
+    assert vosk.models == 1
+
+
+def test_streaming_decodes_while_the_user_is_still_speaking(vosk, tmp_path, write_wav):
+    # 0.3 s lead-in, speech until 1.3 s, then a long silence
+    path = write_wav(tmp_path / "phrase.wav", [(0.3, 0), (1.0, 8000), (3.0, 0)])
+    recognizer = jarvis.sr.Recognizer()
+    recognizer.energy_threshold = 300
+    recognizer.dynamic_energy_threshold = False
+    cfg = {"stt_backend": "vosk", "vosk_model_path": vosk.path, "endpointing": "energy"}
+    with jarvis._WavSource(path) as source:
+        vosk.source = source
+        text = jarvis.recognize_speech(recognizer, source, cfg, timeout=5, phrase_time_limit=6)
+        seconds = source.seconds
+    assert text == "hello there"
+    (rec,) = vosk.recognizers
+    assert len(rec.fed) > 10
+    assert rec.fed[0] < 1.3  # first chunk went to Vosk before speech ended
+    assert rec.fed[-1] < seconds  # and the phrase closed without reading the whole file
+    assert rec.resets == 1  # handed back to the pool
+
+
+class TimedWav(jarvis._WavSource):
+    """_WavSource that notes when the last non-empty frame was read."""
+
+    def read(self, size):
+        data = super().read(size)
+        if data:
+            self.last_read = time.perf_counter()
+        return data
+
+
+def test_bench_latency_after_speech_cold_batch_vs_cached_streaming(vosk, tmp_path, write_wav):
+    """WAV replay: time from the last frame read to the transcript, for the old path
+    (model loaded per utterance, whole phrase decoded after listening) and the new one.
+    """
+    vosk.load_seconds = 0.2
+    vosk.decode_factor = 0.1
+    path = write_wav(tmp_path / "phrase.wav", [(0.3, 0), (1.5, 8000), (1.5, 0)])
+    recognizer = jarvis.sr.Recognizer()
+    recognizer.energy_threshold = 300
+    recognizer.dynamic_energy_threshold = False
+
+    def replay(streaming):
+        cfg = {"stt_backend": "vosk", "vosk_model_path": vosk.path, "vosk_streaming": streaming}
+        latencies = []
+        for _ in range(3):
+            if not streaming:
+                jarvis.VOSK_MODELS.clear()  # the old code loaded the model every time
+                jarvis.VOSK_REC_POOL.clear()
+            with TimedWav(path) as source:
+                assert jarvis.recognize_speech(recognizer, source, cfg) == "hello there"
+                latencies.append(time.perf_counter() - source.last_read)
+        return sorted(latencies)[1]
+
+    before = replay(streaming=False)
+    after = replay(streaming=True)
+    assert before >= 0.2
+    assert after < before / 4
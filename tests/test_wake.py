@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+import jarvis
+
+RATE = 16000
+
+
+class FakeWakeVosk:
+    """Vosk stand-in. The wake-grammar recognizer spots "jarvis" after 0.3 s of
+    voiced audio; a plain recognizer transcribes "what time is it" from 0.5 s of it.
+    """
+
+    def __init__(self):
+        self.models = 0
+
+    def Model(self, path):
+        self.models += 1
+        return ("model", path)
+
+    def KaldiRecognizer(self, model, rate, grammar=None):
+        return _FakeRec(rate, wake=grammar is not None)
+
+
+class _FakeRec:
+    def __init__(self, rate, wake):
+        self.rate = rate
+        self.wake = wake
+        self.voiced = 0.0
+
+    def AcceptWaveform(self, data):
+        if jarvis.audioop.rms(data, 2) > 1000:
+            self.voiced += len(data) / 2.0 / self.rate
+        return False
+
+    def PartialResult(self):
+        return json.dumps({"partial": "jarvis" if self.wake and self.voiced >= 0.3 else "[unk]"})
+
+    def FinalResult(self):
+        return json.dumps({"text": "what time is it" if self.voiced >= 0.5 else ""})
+
+    def Reset(self):
+        self.voiced = 0.0
+
+
+@pytest.fixture
+def cfg(monkeypatch, tmp_path):
+    fake = FakeWakeVosk()
+    monkeypatch.setattr(jarvis, "Model", fake.Model)
+    monkeypatch.setattr(jarvis, "KaldiRecognizer", fake.KaldiRecognizer)
+    monkeypatch.setattr(jarvis, "VOSK_MODELS", {})
+    monkeypatch.setattr(jarvis, "VOSK_REC_POOL", {})
+    (tmp_path / "model").mkdir()
+    return {"wake_detector": "vosk", "stt_backend": "vosk", "vosk_model_path": str(tmp_path / "model"),
+            "energy_threshold": 300, "dynamic_energy_threshold": False}
+
+
+def wake(cfg, path, timeout=5):
+    with jarvis._WavSource(path) as source:
+        return jarvis.listen_wake_phrase(jarvis.build_recognizer(cfg), source, cfg, timeout=timeout)
+
+
+def test_command_in_the_same_breath_is_kept(cfg, tmp_path, write_wav):
+    path = write_wav(tmp_path / "same_breath.wav", [(0.2, 0), (2.0, 8000), (1.5, 0)])
+    assert wake(cfg, path) == ("jarvis what time is it", True)
+
+
+def test_wake_word_then_a_pause_is_just_the_wake_word(cfg, tmp_path, write_wav):
+    path = write_wav(tmp_path / "wake_only.wav", [(0.2, 0), (0.35, 8000), (2.0, 0)])
+    assert wake(cfg, path) == ("jarvis", True)
+
+
+def test_no_wake_word(cfg, tmp_path, write_wav):
+    path = write_wav(tmp_path / "silence.wav", [(2.0, 0)])
+    assert wake(cfg, path, timeout=1) == ("", False)
+
+
+def test_full_stt_fallback_returns_the_whole_phrase(cfg, tmp_path, write_wav):
+    path = write_wav(tmp_path / "phrase.wav", [(0.2, 0), (1.0, 8000), (1.5, 0)])
+    assert wake(dict(cfg, wake_detector="stt"), path) == ("what time is it", None)
+
+
+def test_eval_harness_counts_false_accepts_and_rejects(cfg, tmp_path, write_wav):
+    paths = [
+        write_wav(tmp_path / "wake_1.wav", [(0.2, 0), (0.6, 8000), (0.5, 0)]),
+        write_wav(tmp_path / "wake_2.wav", [(0.2, 0), (1.0, 8000), (0.5, 0)]),
+        write_wav(tmp_path / "wake_too_quiet.wav", [(0.2, 0), (0.6, 200), (0.5, 0)]),
+        write_wav(tmp_path / "room_noise.wav", [(1.0, 100)]),
+        write_wav(tmp_path / "tv_talking.wav", [(0.2, 0), (0.8, 8000), (0.5, 0)]),
+    ]
+    report = jarvis.evaluate_wake_detector(paths, dict(cfg, wake_detector="stt"))
+    assert report["files"] == 5 and report["positives"] == 3 and report["negatives"] == 2
+    assert report["false_rejects"] == [paths[2]]
+    assert report["false_accepts"] == [paths[4]]
+    assert report["audio_seconds"] == pytest.approx(1.3 + 1.7 + 1.3 + 1.0 + 1.5)
+    assert report["cpu_seconds_per_audio_hour"] >= 0
+
+
+def test_eval_harness_needs_the_offline_detector(tmp_path, write_wav):
+    path = write_wav(tmp_path / "wake_1.wav", [(0.5, 0)])
+    with pytest.raises(RuntimeError):
+        jarvis.evaluate_wake_detector([path], {"vosk_model_path": str(tmp_path / "missing")})
@@ -0,0 +1,221 @@
+"""
+Per-turn latency tracing (JSON Lines) and a percentile report.
+
+Jarvis opens a Turn for every command and times its stages (wait_for_speech,
+capture, recognize_speech, parse_intent, local_route, ai_route_or_answer,
+ai_route_intent, ai_answer, execute_intent, speak) as spans. When the turn finishes each span is written
+as one JSON line to logs/trace.jsonl, tagged with the turn's intent and
+backend; spans that end later (speech still playing) are written as they end.
+
+Report p50/p95/p99 per stage over a time window:
+
+    python -m tracing --window 24h
+    python -m tracing --window 7d --by intent
+
+Standard library only, so the report runs without loading the assistant.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import List, Dict, Any
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+TRACE_PATH = os.path.join(BASE, "logs", "trace.jsonl")
+# Bookkeeping budget per span (timing, tagging, queueing for the writer)
+SPAN_BUDGET_US = 50.0
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100) of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, int(-(-pct * len(ordered) // 100)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class _Span:
+    __slots__ = ("turn", "stage", "tags", "start")
+
+    def __init__(self, turn, stage, tags):
+        self.turn = turn
+        self.stage = stage
+        self.tags = tags
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.turn.add(self.stage, self.start, time.perf_counter(), **self.tags)
+        return False
+
+
+class Turn:
+    """Spans of one command turn. Tags set with tag() apply to every span."""
+
+    def __init__(self, tracer, turn_id: int, started: float = None, **tags):
+        self.tracer = tracer
+        self.id = turn_id
+        self.tags = tags
+        self.started = started if started is not None else time.perf_counter()
+        self._spans: List[tuple] = []
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def span(self, stage: str, **tags) -> _Span:
+        return _Span(self, stage, tags)
+
+    def add(self, stage: str, start: float, end: float, **tags):
+        """Record a span from perf_counter() timestamps."""
+        with self._lock:
+            if not self._finished:
+                self._spans.append((stage, start, end, tags))
+                return
+        self.tracer.emit(self, stage, start, end, tags)
+
+    def tag(self, **tags):
+        self.tags.update({k: v for k, v in tags.items() if v is not None})
+
+    def finish(self):
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            spans, self._spans = self._spans, []
+        for stage, start, end, tags in spans:
+            self.tracer.emit(self, stage, start, end, tags)
+        self.tracer.emit(self, "turn", self.started, time.perf_counter(), {})
+
+
+class Tracer:
+    """Hands out Turns and writes their spans through a JSON Lines writer
+    (anything with append(dict), e.g. conv_history.ConvHistoryWriter).
+    """
+
+    def __init__(self, writer=None, enabled: bool = True):
+        self.writer = writer
+        self.enabled = enabled and writer is not None
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def new_turn(self, started: float = None, **tags) -> Turn:
+        """started: perf_counter() time the turn began, if earlier than now."""
+        with self._lock:
+            self._seq += 1
+            turn_id = self._seq
+        return Turn(self, turn_id, started, **tags)
+
+    def emit(self, turn: Turn, stage: str, start: float, end: float, tags: Dict[str, Any]):
+        if not self.enabled:
+            return
+        entry = {"ts": datetime.now().isoformat(timespec="milliseconds"), "turn": turn.id,
+                 "stage": stage, "ms": round((end - start) * 1000.0, 2)}
+        entry.update(turn.tags)
+        entry.update(tags)
+        try:
+            self.writer.append(entry)
+        except Exception:
+            pass
+
+
+class _NullWriter:
+    def append(self, entry):
+        json.dumps(entry)
+
+
+def measure_overhead(spans: int = 20000) -> float:
+    """Average bookkeeping cost of one span in microseconds (writer serialization included)."""
+    tracer = Tracer(_NullWriter())
+    turn = tracer.new_turn(intent="bench", backend="bench")
+    started = time.perf_counter()
+    for _ in range(spans):
+        with turn.span("bench"):
+            pass
+    turn.finish()
+    return (time.perf_counter() - started) * 1e6 / spans
+
+
+def parse_window(text: str) -> timedelta:
+    """'90s', '30m', '24h', '7d' -> timedelta."""
+    units = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+    text = (text or "").strip().lower()
+    if text and text[-1] in units:
+        return timedelta(**{units[text[-1]]: float(text[:-1])})
+    return timedelta(hours=float(text))
+
+
+def read_spans(path: str, since: datetime = None) -> List[Dict[str, Any]]:
+    """Spans from path and its rotated backups (path.1, path.2, ...), oldest first."""
+    files = []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        files.append(f"{path}.{i}")
+        i += 1
+    files = list(reversed(files)) + [path]
+    out = []
+    for name in files:
+        try:
+            with open(name, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        if since is not None and datetime.fromisoformat(entry["ts"]) < since:
+                            continue
+                    except Exception:
+                        continue
+                    out.append(entry)
+        except OSError:
+            continue
+    return out
+
+
+def stage_report(spans: List[Dict[str, Any]], by: str = None) -> List[Dict[str, Any]]:
+    """p50/p95/p99 per stage (optionally per stage and tag value)."""
+    groups: Dict[tuple, List[float]] = {}
+    for entry in spans:
+        try:
+            key = (entry["stage"], entry.get(by) if by else None)
+            ms = float(entry["ms"])
+        except Exception:
+            continue
+        groups.setdefault(key, []).append(ms)
+    rows = []
+    for (stage, value), values in sorted(groups.items(), key=lambda kv: (kv[0][0], str(kv[0][1]))):
+        rows.append({"stage": stage, by or "all": value, "count": len(values),
+                     "p50": percentile(values, 50), "p95": percentile(values, 95), "p99": percentile(values, 99)})
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tracing", description="Per-stage latency report for Jarvis turns")
+    parser.add_argument("--path", default=TRACE_PATH)
+    parser.add_argument("--window", default="24h", help="how far back to look, e.g. 30m, 24h, 7d")
+    parser.add_argument("--by", default=None, help="also group by a tag, e.g. intent or backend")
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    since = datetime.now() - parse_window(args.window)
+    rows = stage_report(read_spans(args.path, since), args.by)
+    overhead = measure_overhead()
+    if args.json:
+        print(json.dumps({"window": args.window, "stages": rows, "overhead_us_per_span": round(overhead, 2),
+                          "budget_us_per_span": SPAN_BUDGET_US}, indent=2))
+        return 0
+    if not rows:
+        print(f"No spans in {args.path} for the last {args.window}")
+    else:
+        label = args.by or ""
+        print(f"{'stage':<18} {label:<16} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for row in rows:
+            value = "" if not args.by else str(row[args.by])
+            print(f"{row['stage']:<18} {value[:16]:<16} {row['count']:>6} {row['p50']:>9.1f} {row['p95']:>9.1f} {row['p99']:>9.1f}")
+    status = "ok" if overhead <= SPAN_BUDGET_US else "OVER BUDGET"
+    print(f"tracing overhead: {overhead:.1f} us/span (budget {SPAN_BUDGET_US:.0f} us, {status})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())